@@ -0,0 +1,79 @@
+"""
+Generation of the long repetitive trace (the same few texts over and over) into every DSL
+with the memoized escaping of the texts vs. escaping every text every time.
+
+    python -m benchmarks.escaping [number of calls]
+"""
+
+import gc
+import sys
+import time
+import typing
+from contextlib import contextmanager
+
+from umlcharter import SequenceDiagram, Mermaid, PlantUML, D2, SequenceDiagramOrg
+from umlcharter.generators import escaping
+from umlcharter.generators.d2.sequence_diagram import D2SequenceDiagram
+from umlcharter.generators.mermaid.sequence_diagram import MermaidSequenceDiagram
+from umlcharter.generators.plantuml.sequence_diagram import PlantUMLSequenceDiagram
+from umlcharter.generators.sequencediagramorg.sequence_diagram import (
+    SequenceDiagramOrgSequenceDiagram,
+)
+
+RENDERERS = (
+    MermaidSequenceDiagram,
+    PlantUMLSequenceDiagram,
+    D2SequenceDiagram,
+    SequenceDiagramOrgSequenceDiagram,
+)
+
+
+@contextmanager
+def unmemoized() -> typing.Iterator[None]:
+    replaced = []
+    for renderer in RENDERERS:
+        for name in ("_line_break", "_remove_line_breaks", "_label", "_quoted"):
+            transform = renderer.__dict__.get(name)
+            if transform is not None:
+                replaced.append((renderer, name, transform))
+                setattr(renderer, name, staticmethod(transform.__func__.__wrapped__))
+    try:
+        yield
+    finally:
+        for renderer, name, transform in replaced:
+            setattr(renderer, name, transform)
+
+
+def build(number_of_calls: int) -> SequenceDiagram:
+    sd = SequenceDiagram("Escaping", Mermaid, columnar=True)
+    client = sd.participant("Client")
+    server = sd.participant("Server: API")
+    for _ in range(number_of_calls):
+        client.go_to(server, "GET /items\n{page}").return_to(client, "200 OK")
+    return sd
+
+
+def measure(sd: SequenceDiagram) -> float:
+    timings = []
+    for _ in range(3):
+        gc.collect()  # do not pay for the garbage of the previous runs
+        escaping.cache_clear()
+        started = time.perf_counter()
+        sd._BaseChart__generated.clear()  # noqa
+        sd.generate_all((Mermaid, PlantUML, D2, SequenceDiagramOrg))
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def main(number_of_calls: int = 100_000) -> None:
+    sd = build(number_of_calls)
+    with unmemoized():
+        every_time = measure(sd)
+    memoized = measure(sd)
+    print(f"calls:             {number_of_calls}")
+    print(f"escaped each time: {every_time * 1000:.1f} ms")
+    print(f"memoized:          {memoized * 1000:.1f} ms ({every_time / memoized:.2f}x)")
+
+
+if __name__ == "__main__":
+    main(*(int(_) for _ in sys.argv[1:2]))
@@ -0,0 +1,58 @@
+"""
+Construction of the big flat graph: one node / link at a time vs. all of them at once,
+and its restoration from the pickled one.
+
+    python -m benchmarks.graph_construction [number of edges]
+"""
+
+import gc
+import pickle
+import sys
+import time
+import typing
+
+from umlcharter import GraphDiagram, Mermaid
+
+
+def workflow(
+    number_of_edges: int,
+) -> typing.Tuple[typing.List[str], typing.List[typing.Tuple[str, str, str]]]:
+    titles = [f"State {_}" for _ in range(number_of_edges // 2)]
+    edges = [(titles[_], titles[_ + 1], "Next") for _ in range(len(titles) - 1)]
+    edges += [(titles[_ + 1], titles[_], "Back") for _ in range(len(titles) - 1)]
+    return titles, edges
+
+
+def one_by_one(titles: typing.List[str], edges: typing.List[tuple]) -> GraphDiagram:
+    gd = GraphDiagram("Workflow", Mermaid)
+    nodes = {title: gd.node(title) for title in titles}
+    for from_, to_, text in edges:
+        nodes[from_].go_to(nodes[to_], text)
+    return gd
+
+
+def at_once(titles: typing.List[str], edges: typing.List[tuple]) -> GraphDiagram:
+    return GraphDiagram.from_edges("Workflow", Mermaid, titles, edges)
+
+
+def measure(build: typing.Callable[..., GraphDiagram], *args) -> float:
+    timings = []
+    for _ in range(3):
+        gc.collect()  # do not pay for the garbage of the previous runs
+        started = time.perf_counter()
+        build(*args)
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def main(number_of_edges: int = 50_000) -> None:
+    titles, edges = workflow(number_of_edges)
+    print(f"nodes / edges:   {len(titles)} / {len(edges)}")
+    print(f"one by one:      {measure(one_by_one, titles, edges) * 1000:.1f} ms")
+    print(f"from_edges:      {measure(at_once, titles, edges) * 1000:.1f} ms")
+    pickled = pickle.dumps(at_once(titles, edges))
+    print(f"pickle.loads:    {measure(pickle.loads, pickled) * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main(*(int(_) for _ in sys.argv[1:2]))
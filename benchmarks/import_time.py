@@ -0,0 +1,36 @@
+"""
+The time of the import of the package in the fresh interpreter: of the package alone,
+of everything needed for a single generator and of all the exports at once.
+
+    python -m benchmarks.import_time [number of runs]
+"""
+
+import subprocess
+import sys
+import time
+
+IMPORTS = {
+    "nothing": "pass",
+    "package": "import umlcharter",
+    "one generator": "from umlcharter import SequenceDiagram, Mermaid",
+    "everything": "from umlcharter import *",
+}
+
+
+def measure(code: str, runs: int) -> float:
+    """The best wall time of the interpreter running the code, including the startup of the interpreter itself"""
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        subprocess.run([sys.executable, "-c", code], check=True)
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def main(runs: int = 10) -> None:
+    for name, code in IMPORTS.items():
+        print(f"{name + ':':<16} {measure(code, runs) * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main(*(int(_) for _ in sys.argv[1:2]))
@@ -0,0 +1,77 @@
+"""
+Construction and generation of the big graph with the nodes hashed by their identity vs. by the string
+made of their identity (how they used to be hashed, allocating the new string on every lookup).
+
+    python -m benchmarks.node_hashing [number of nodes]
+"""
+
+import gc
+import sys
+import time
+import typing
+from contextlib import contextmanager
+
+from umlcharter import GraphDiagram, Mermaid, PlantUML, Graphviz
+from umlcharter.charts.graph_diagram import (
+    Condition,
+    Finish,
+    Fork,
+    Join,
+    Node,
+    Start,
+)
+
+NODE_CLASSES = (Node, Start, Finish, Fork, Join, Condition)
+
+
+@contextmanager
+def string_hashing() -> typing.Iterator[None]:
+    def string_hash(self):
+        return hash(f"{id(self)}")
+
+    for node_cls in NODE_CLASSES:
+        node_cls.__hash__ = string_hash
+    try:
+        yield
+    finally:
+        for node_cls in NODE_CLASSES:
+            node_cls.__hash__ = object.__hash__
+
+
+def build_and_generate(number_of_nodes: int) -> None:
+    gd = GraphDiagram("Hashing", Mermaid)
+    previous = gd.start
+    for group_index in range(number_of_nodes // 100):
+        group = gd.node(f"Group {group_index}")
+        inner_previous = group.start
+        for node_index in range(99):
+            inner_previous = inner_previous.go_to(group.node(f"Node {node_index}"))
+        inner_previous.go_to(group.finish)
+        previous = previous.go_to(group)
+    previous.go_to(gd.finish)
+    gd.generate_all((Mermaid, PlantUML, Graphviz))
+
+
+def measure(number_of_nodes: int) -> float:
+    timings = []
+    for _ in range(3):
+        gc.collect()  # do not pay for the garbage of the previous runs
+        started = time.perf_counter()
+        build_and_generate(number_of_nodes)
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def main(number_of_nodes: int = 50_000) -> None:
+    with string_hashing():
+        by_string = measure(number_of_nodes)
+    by_identity = measure(number_of_nodes)
+    print(f"nodes:              {number_of_nodes}")
+    print(f"hashed by string:   {by_string * 1000:.1f} ms")
+    print(
+        f"hashed by identity: {by_identity * 1000:.1f} ms ({by_string / by_identity:.2f}x)"
+    )
+
+
+if __name__ == "__main__":
+    main(*(int(_) for _ in sys.argv[1:2]))
@@ -0,0 +1,69 @@
+"""
+Generation of many sequence diagrams: the plain loop over `generate_all` vs. `render_many`
+with a single process and with the worker processes, for the steps stored in the list and column-wise.
+
+    python -m benchmarks.rendering [number of diagrams] [steps per diagram] [workers]
+"""
+
+import gc
+import os
+import sys
+import time
+import typing
+
+from umlcharter import Mermaid, PlantUML, SequenceDiagram, render_many
+
+from benchmarks.suite import build_sequence_diagram
+
+GENERATORS = (Mermaid, PlantUML)
+
+
+def build(
+    number_of_diagrams: int, steps: int, columnar: bool
+) -> typing.List[SequenceDiagram]:
+    diagram = build_sequence_diagram(steps)
+    if columnar:
+        packed = list(diagram.pack())
+        packed[3] = True
+        diagram = SequenceDiagram.unpack(tuple(packed))
+    # nb: the copies are not generated yet, so nothing is reused between them
+    return [SequenceDiagram.unpack(diagram.pack()) for _ in range(number_of_diagrams)]
+
+
+def serial(diagrams: typing.List[SequenceDiagram]) -> None:
+    for diagram in diagrams:
+        diagram.generate_all(GENERATORS)
+
+
+def measure(
+    render: typing.Callable[[typing.List[SequenceDiagram]], typing.Any],
+    number_of_diagrams: int,
+    steps: int,
+    columnar: bool,
+) -> float:
+    timings = []
+    for _ in range(3):
+        diagrams = build(number_of_diagrams, steps, columnar)
+        gc.collect()  # do not pay for the garbage of the previous runs
+        started = time.perf_counter()
+        render(diagrams)
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def main(number_of_diagrams: int = 200, steps: int = 5_000, workers: int = 0) -> None:
+    workers = workers or os.cpu_count() or 1
+    print(f"diagrams x steps:  {number_of_diagrams} x {steps}, {workers} workers")
+    for columnar in (False, True):
+        print("column-wise steps" if columnar else "steps in the list")
+        for name, render in (
+            ("  generate_all:   ", serial),
+            ("  1 process:      ", lambda _: list(render_many(_, GENERATORS, 1))),
+            ("  workers:        ", lambda _: list(render_many(_, GENERATORS, workers))),
+        ):
+            timing = measure(render, number_of_diagrams, steps, columnar)
+            print(f"{name}{timing * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main(*(int(_) for _ in sys.argv[1:4]))
@@ -0,0 +1,97 @@
+"""
+Memory footprint of the steps of the sequence diagram.
+
+Compares the slotted steps sharing the interned colors with the same steps stored as regular dataclasses
+with the per-instance `__dict__` and own `Color` object per step (how they used to be stored),
+and with the steps stored column-wise (`SequenceDiagram(..., columnar=True)`).
+
+    python -m benchmarks.step_memory [number of steps]
+"""
+
+import sys
+import tracemalloc
+import typing
+from dataclasses import dataclass, field
+
+from umlcharter import SequenceDiagram, Mermaid
+from umlcharter.charts.common import Color
+from umlcharter.charts.sequence_diagram import ForwardStep, NoteStep, ReturnStep
+from umlcharter.charts.step_storage import ColumnarSteps
+
+
+@dataclass
+class DictForwardStep:
+    text: str
+    from_participant: typing.Any
+    to_participant: typing.Any
+
+
+@dataclass
+class DictReturnStep:
+    text: str
+    from_participant: typing.Any
+    to_participant: typing.Any
+
+
+@dataclass
+class DictNoteStep:
+    _color: typing.Optional[str]
+    text: str
+    color: typing.Optional[Color] = field(init=False)
+
+    def __post_init__(self):
+        self.color = Color(self._color) if self._color else None
+
+
+def measure(build: typing.Callable[[], typing.Sequence]) -> int:
+    tracemalloc.start()
+    try:
+        steps = build()  # noqa: F841 (the steps must be alive while measuring)
+        current, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return current
+
+
+def build_steps(
+    forward_cls: typing.Type,
+    return_cls: typing.Type,
+    note_cls: typing.Type,
+    number_of_steps: int,
+    storage_cls: typing.Type = list,
+) -> typing.Callable[[], typing.Sequence]:
+    sd = SequenceDiagram("Memory", Mermaid)
+    first = sd.participant("First")
+    second = sd.participant("Second")
+
+    def build() -> typing.Sequence:
+        steps = storage_cls()
+        for _ in range(number_of_steps // 3):
+            steps.append(forward_cls("Request", first, second))
+            steps.append(return_cls("200 OK", second, first))
+            steps.append(note_cls(_color="66B266", text="Note"))
+        return steps
+
+    return build
+
+
+def main(number_of_steps: int = 300_000) -> None:
+    slotted = measure(build_steps(ForwardStep, ReturnStep, NoteStep, number_of_steps))
+    regular = measure(
+        build_steps(DictForwardStep, DictReturnStep, DictNoteStep, number_of_steps)
+    )
+    columnar = measure(
+        build_steps(ForwardStep, ReturnStep, NoteStep, number_of_steps, ColumnarSteps)
+    )
+    print(f"steps:                        {number_of_steps}")
+    print(f"dataclasses with __dict__:    {regular / number_of_steps:.1f} bytes / step")
+    print(f"slotted, interned colors:     {slotted / number_of_steps:.1f} bytes / step")
+    print(f"saved:                        {100 * (1 - slotted / regular):.1f}%")
+    print(
+        f"columnar:                     {columnar / number_of_steps:.1f} bytes / step"
+    )
+    print(f"saved:                        {100 * (1 - columnar / regular):.1f}%")
+
+
+if __name__ == "__main__":
+    main(*(int(_) for _ in sys.argv[1:2]))
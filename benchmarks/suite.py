@@ -0,0 +1,251 @@
+"""
+The benchmark suite: builds the synthetic diagrams of the different sizes and generates them with every generator,
+measuring the time of the construction, the time of the generation per generator and the peak memory.
+
+    python -m benchmarks.suite [--sizes 1000,10000,100000,1000000] [--diagrams sequence,graph] [--repeat 3]
+        [--output results.json] [--baseline previous-results.json]
+
+The results are printed as a table and (optionally) saved as JSON, so they can be tracked across the releases:
+
+    {
+        "umlcharter": "1.1.6",
+        "python": "3.12.1",
+        "platform": "Linux-6.5.0-x86_64",
+        "results": [
+            {
+                "diagram": "sequence",
+                "size": 1000,
+                "build_seconds": 0.01,
+                "generate_seconds": {"Mermaid": 0.002, ...},
+                "peak_memory_bytes": 1234567
+            },
+            ...
+        ]
+    }
+"""
+
+import argparse
+import gc
+import json
+import platform
+import time
+import tracemalloc
+import typing
+
+import umlcharter
+from umlcharter import (
+    SequenceDiagram,
+    GraphDiagram,
+    Mermaid,
+    PlantUML,
+    D2,
+    SequenceDiagramOrg,
+    Graphviz,
+)
+from umlcharter.generators.base import IChartGenerator
+
+PARTICIPANTS = 10
+NODES_PER_GROUP = 100
+
+
+def build_sequence_diagram(size: int) -> SequenceDiagram:
+    """The sequence of about `size` steps: the calls between the participants in the loops, groups and conditions"""
+    sd = SequenceDiagram("Benchmark", Mermaid)
+    participants = [sd.participant(f"Participant {_}") for _ in range(PARTICIPANTS)]
+    sd.group_participants("Backend", *participants[PARTICIPANTS // 2 :])
+
+    steps = 0
+    while steps < size:
+        client, server, database = (
+            participants[steps % PARTICIPANTS],
+            participants[(steps + 1) % PARTICIPANTS],
+            participants[(steps + 2) % PARTICIPANTS],
+        )
+        with sd.loop("3 times"), sd.group("Request"):
+            client.go_to(server, "Request").go_to(database, "Query")
+            with sd.condition():
+                with sd.case("Found"):
+                    database.return_to(server, "Rows")
+                with sd.case("Not found"):
+                    sd.note("Nothing")
+            sd.return_("Response")
+        steps += 21  # including the controls and the activations
+    return sd
+
+
+def build_graph_diagram(size: int) -> GraphDiagram:
+    """The graph of about `size` nodes: the chains of the nodes inside the groups, linked one to another"""
+    gd = GraphDiagram("Benchmark", Mermaid)
+    previous = gd.start
+    for group_index in range(max(size // NODES_PER_GROUP, 1)):
+        group = gd.node(f"Group {group_index}")
+        inner_previous = group.start
+        for node_index in range(NODES_PER_GROUP - 1):
+            node = group.node(f"Node {node_index}")
+            inner_previous = inner_previous.go_to(node, "Next")
+        inner_previous.go_to(group.finish)
+        previous = previous.go_to(group)
+    previous.go_to(gd.finish)
+    return gd
+
+
+DIAGRAMS: typing.Dict[
+    str,
+    typing.Tuple[
+        typing.Callable[[int], typing.Any],
+        typing.Tuple[typing.Type[IChartGenerator], ...],
+    ],
+] = {
+    "sequence": (
+        build_sequence_diagram,
+        (Mermaid, PlantUML, D2, SequenceDiagramOrg),
+    ),
+    "graph": (build_graph_diagram, (Mermaid, PlantUML, Graphviz)),
+}
+
+
+def generate(chart: typing.Any, generator_cls: typing.Type[IChartGenerator]) -> str:
+    generator = generator_cls(chart)
+    if isinstance(chart, GraphDiagram):
+        return generator.generate_graph_diagram()
+    return generator.generate_sequence_diagram()
+
+
+def timed(
+    function: typing.Callable[[], typing.Any], repeat: int
+) -> typing.Tuple[typing.Any, float]:
+    """The result of the function and the best time out of `repeat` runs"""
+    timings = []
+    for _ in range(repeat):
+        gc.collect()  # do not pay for the garbage of the previous measurements
+        started = time.perf_counter()
+        result = function()
+        timings.append(time.perf_counter() - started)
+    return result, min(timings)
+
+
+def peak_memory(function: typing.Callable[[], typing.Any]) -> int:
+    gc.collect()
+    tracemalloc.start()
+    try:
+        function()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak
+
+
+def run(diagram: str, size: int, repeat: int = 3) -> typing.Dict[str, typing.Any]:
+    build, generator_classes = DIAGRAMS[diagram]
+
+    chart, build_seconds = timed(lambda: build(size), repeat)
+    generate_seconds = {
+        # NB: every generator renders the diagram from scratch, the generated texts are not cached across them
+        generator_cls.__name__: timed(lambda: generate(chart, generator_cls), repeat)[1]
+        for generator_cls in generator_classes
+    }
+    chart = None
+
+    # the memory is measured separately, the tracing slows down everything it traces
+    def build_and_generate():
+        chart = build(size)
+        chart.generate_all(generator_classes)
+
+    return {
+        "diagram": diagram,
+        "size": size,
+        "build_seconds": build_seconds,
+        "generate_seconds": generate_seconds,
+        "peak_memory_bytes": peak_memory(build_and_generate),
+    }
+
+
+def compare(
+    previous: typing.Dict[str, typing.Any], current: typing.Dict[str, typing.Any]
+) -> str:
+    """The relative changes of all the measurements, e.g. "build +3.1%, Mermaid -10.0%, ..." """
+
+    def change(before: float, after: float) -> str:
+        return f"{(after / before - 1) * 100:+.1f}%" if before else "n/a"
+
+    changes = [f"build {change(previous['build_seconds'], current['build_seconds'])}"]
+    for name, seconds in current["generate_seconds"].items():
+        if name in previous["generate_seconds"]:
+            changes.append(
+                f"{name} {change(previous['generate_seconds'][name], seconds)}"
+            )
+    changes.append(
+        f"peak memory {change(previous['peak_memory_bytes'], current['peak_memory_bytes'])}"
+    )
+    return ", ".join(changes)
+
+
+def main(argv: typing.Optional[typing.Sequence[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--sizes",
+        default="1000,10000,100000",
+        help="the comma-separated numbers of the steps / nodes of the diagrams",
+    )
+    parser.add_argument(
+        "--diagrams",
+        default=",".join(DIAGRAMS),
+        help=f"the comma-separated kinds of the diagrams, out of: {', '.join(DIAGRAMS)}",
+    )
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=3,
+        help="the number of the runs of every measurement, the best time is taken",
+    )
+    parser.add_argument(
+        "--output", help="the path of the JSON file to save the results to"
+    )
+    parser.add_argument(
+        "--baseline",
+        help="the path of the JSON file with the previous results to compare the current ones to",
+    )
+    args = parser.parse_args(argv)
+
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline) as file:
+            baseline = {
+                (result["diagram"], result["size"]): result
+                for result in json.load(file)["results"]
+            }
+
+    results = []
+    for diagram in args.diagrams.split(","):
+        for size in (int(_) for _ in args.sizes.split(",")):
+            result = run(diagram, size, args.repeat)
+            results.append(result)
+            generation = ", ".join(
+                f"{name} {seconds * 1000:.1f} ms"
+                for name, seconds in result["generate_seconds"].items()
+            )
+            print(
+                f"{diagram:<10} {size:>9}: build {result['build_seconds'] * 1000:.1f} ms, "
+                f"generate: {generation}, peak memory {result['peak_memory_bytes'] / 2**20:.1f} MiB"
+            )
+            if (diagram, size) in baseline:
+                print(
+                    f"{'':<21}vs. baseline: {compare(baseline[diagram, size], result)}"
+                )
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(
+                {
+                    "umlcharter": umlcharter.__version__,
+                    "python": platform.python_version(),
+                    "platform": platform.platform(),
+                    "results": results,
+                },
+                file,
+                indent=4,
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -17,6 +17,7 @@ setuptools.setup(
     long_description_content_type="text/markdown",
     url="https://github.com/mikalaiyurkin/charter",
     packages=setuptools.find_packages(exclude=("tests",)),
+    entry_points={"console_scripts": ["umlcharter = umlcharter.cli:main"]},
     extras_require={"dev": ["pytest", "pytest-cov", "pre-commit"]},
     python_requires=">=3.9",
     classifiers=[
@@ -0,0 +1,180 @@
+import os
+import time
+
+import pytest
+
+from umlcharter import SequenceDiagram, GraphDiagram, Mermaid, PlantUML, Graphviz
+from umlcharter import cache
+from umlcharter.charts.common import ChartingException
+
+
+@pytest.fixture
+def disk_cache(tmp_path):
+    try:
+        yield cache.enable(cache.DiskCache(tmp_path / "cache"))
+    finally:
+        cache.disable()
+
+
+def build_sequence(title="Sequence", generator_cls=Mermaid, auto_activation=True):
+    sd = SequenceDiagram(title, generator_cls, auto_activation=auto_activation)
+    client = sd.participant("Client", color="769D8F")
+    server = sd.participant("Server")
+    with sd.loop("Forever"):
+        client.go_to(server, "Request").return_to(client, "Response")
+    return sd
+
+
+def build_graph(title="Graph", generator_cls=Mermaid, is_vertical=True):
+    gd = GraphDiagram(title, generator_cls, is_vertical=is_vertical)
+    group = gd.node("Group", color="769D8F")
+    group.start.go_to(group.node("Nested")).go_to(group.finish)
+    gd.start.go_to(group, "Go").go_to(gd.finish)
+    group.note("Note")
+    return gd
+
+
+@pytest.mark.parametrize(
+    "build, changed",
+    (
+        (build_sequence, build_sequence(title="Other")),
+        (build_sequence, build_sequence(auto_activation=False)),
+        (build_graph, build_graph(title="Other")),
+        (build_graph, build_graph(is_vertical=False)),
+    ),
+)
+def test_structural_hash(build, changed):
+    digest = cache.structural_hash(build()).hexdigest()
+    # the same diagram built again, even for the other generator, has the same hash
+    assert cache.structural_hash(build()).hexdigest() == digest
+    assert cache.structural_hash(build(generator_cls=PlantUML)).hexdigest() == digest
+    assert cache.structural_hash(changed).hexdigest() != digest
+
+
+def test_structural_hash_of_columnar_steps():
+    sd = build_sequence()
+    sd.columnar = True
+    columnar = SequenceDiagram.unpack(sd.pack())
+    digest = cache.structural_hash(columnar).hexdigest()
+    assert (
+        cache.structural_hash(SequenceDiagram.unpack(sd.pack())).hexdigest() == digest
+    )
+    columnar.note("Note")
+    assert cache.structural_hash(columnar).hexdigest() != digest
+
+
+def test_running_hash():
+    changes = [
+        ("link", index, index + 1, "")
+        for index in range(cache.RunningHash.BATCH * 2 + 1)
+    ]
+    whole = cache.RunningHash()
+    for change in changes:
+        whole.add(change)
+    # the digest taken in the middle does not change the batches, so neither the final digest
+    taken = cache.RunningHash()
+    for index, change in enumerate(changes):
+        taken.add(change)
+        if index % 700 == 0:
+            taken.digest()
+    digest = whole.digest().hexdigest()
+    assert taken.digest().hexdigest() == digest
+
+    whole.feed("Restored")
+    assert whole.digest().hexdigest() != digest
+
+
+@pytest.mark.parametrize(
+    "build, generator_classes",
+    (
+        (build_sequence, (Mermaid, PlantUML)),
+        (build_graph, (Mermaid, PlantUML, Graphviz)),
+    ),
+)
+def test_generate(disk_cache, build, generator_classes):
+    generated = build().generate_all(generator_classes)
+    assert disk_cache.stats == cache.CacheStats(
+        misses=len(generator_classes), writes=len(generator_classes)
+    )
+    assert len(disk_cache) == len(generator_classes)
+
+    # the same diagram built once again is not generated, but read from the cache
+    diagram = build()
+    diagram.to_ir = None  # the diagram is not even normalized
+    assert diagram.generate_all(generator_classes) == generated
+    assert disk_cache.stats.hits == len(generator_classes)
+    # ...and then by the diagram itself, as the generated one
+    assert diagram.generate() is diagram.generate()
+    assert disk_cache.stats.hits == len(generator_classes)
+
+    # the other instance of the cache, e.g. in another process, shares the texts
+    other = cache.enable(cache.DiskCache(disk_cache.directory))
+    assert len(other) == len(generator_classes)
+    assert str(build(generator_cls=PlantUML)) == generated[PlantUML]
+    assert other.stats == cache.CacheStats(hits=1)
+
+
+def test_changed_diagram_is_generated_again(disk_cache):
+    sd = build_sequence()
+    generated = sd.generate()
+    sd.note("Changed")
+    assert sd.generate() != generated
+    assert disk_cache.stats == cache.CacheStats(misses=2, writes=2)
+
+
+@pytest.mark.parametrize("columnar", (False, True))
+def test_hit_is_faster_than_generation(disk_cache, columnar):
+    def build():
+        sd = SequenceDiagram("Long", PlantUML, columnar=columnar)
+        client = sd.participant("Client")
+        server = sd.participant("Server")
+        for index in range(5_000):
+            client.go_to(server, f"Request {index}").return_to(client, "Response")
+        return sd
+
+    sd = build()
+    started = time.perf_counter()
+    generated = sd.generate()
+    generation = time.perf_counter() - started
+
+    sd = build()
+    started = time.perf_counter()
+    assert sd.generate() == generated
+    hit = time.perf_counter() - started
+    assert disk_cache.stats.hits == 1
+    assert hit < generation
+
+
+def test_eviction(tmp_path):
+    disk_cache = cache.DiskCache(tmp_path, max_bytes=10)
+    for index, key in enumerate("abc"):
+        disk_cache.put(key, "1234")
+        # the usage times are ordered even if the clock is coarse
+        os.utime(tmp_path / f"{key}.txt", ns=(index, index))
+    assert len(disk_cache) == 2
+    assert disk_cache.size_bytes == 8
+    assert disk_cache.stats.evictions == 1
+    assert disk_cache.get("a") is None
+
+    # the recently used texts are evicted last
+    assert disk_cache.get("b") == "1234"
+    disk_cache.put("d", "12345")
+    assert sorted(os.listdir(tmp_path)) == ["b.txt", "d.txt"]
+    assert disk_cache.stats == cache.CacheStats(hits=1, misses=1, writes=4, evictions=2)
+
+    # the texts removed by another process are not a problem
+    os.remove(tmp_path / "b.txt")
+    disk_cache.put("e", "12345")
+    assert sorted(os.listdir(tmp_path)) == ["d.txt", "e.txt"]
+    assert disk_cache.get("b") is None
+
+    disk_cache.put("f", "1")
+    os.remove(tmp_path / "f.txt")
+    disk_cache.clear()
+    assert os.listdir(tmp_path) == []
+    assert len(disk_cache) == 0
+
+
+def test_invalid_size_limit(tmp_path):
+    with pytest.raises(ChartingException):
+        cache.DiskCache(tmp_path, max_bytes=0)
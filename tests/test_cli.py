@@ -0,0 +1,134 @@
+import pytest
+
+from umlcharter import SequenceDiagram, GraphDiagram, Mermaid, PlantUML, Graphviz
+from umlcharter.cli import main, watch
+
+MODULE = """
+from umlcharter import SequenceDiagram, GraphDiagram, Mermaid, PlantUML
+
+sequence = SequenceDiagram("Sequence", PlantUML)
+sequence.participant("Client").go_to(sequence.participant("Server"), "{text}")
+
+graph = GraphDiagram("Graph", Mermaid)
+graph.start.go_to(graph.node("Node")).go_to(graph.finish)
+
+_private = SequenceDiagram("Private", Mermaid)
+
+if __name__ == "__main__":
+    raise RuntimeError("The module must not be run as a script")
+"""
+
+
+def write_module(path, text="Request"):
+    path.write_text(MODULE.format(text=text))
+
+
+def build_sequence(text="Request"):
+    sd = SequenceDiagram("Sequence", PlantUML)
+    sd.participant("Client").go_to(sd.participant("Server"), text)
+    return sd
+
+
+def build_graph():
+    gd = GraphDiagram("Graph", Mermaid)
+    gd.start.go_to(gd.node("Node")).go_to(gd.finish)
+    return gd
+
+
+def test_render_module(tmp_path, capsys):
+    write_module(tmp_path / "diagrams.py")
+
+    assert main([str(tmp_path / "diagrams.py"), "-j", "1"]) == 0
+    assert sorted(_.name for _ in tmp_path.iterdir()) == [
+        "diagrams.graph.mmd",
+        "diagrams.py",
+        "diagrams.sequence.puml",
+    ]
+    assert (tmp_path / "diagrams.sequence.puml").read_text() == str(build_sequence())
+    assert (tmp_path / "diagrams.graph.mmd").read_text() == str(build_graph())
+    assert capsys.readouterr().out.endswith("2 written, 0 unchanged\n")
+
+    # the outputs with the same content are not rewritten
+    modified = (tmp_path / "diagrams.graph.mmd").stat().st_mtime_ns
+    assert main([str(tmp_path / "diagrams.py")]) == 0
+    assert capsys.readouterr().out == "0 written, 2 unchanged\n"
+    assert (tmp_path / "diagrams.graph.mmd").stat().st_mtime_ns == modified
+
+
+def test_render_with_generators(tmp_path):
+    write_module(tmp_path / "diagrams.py")
+    build_sequence("Saved").save(tmp_path / "saved.umlc")
+
+    main(
+        [
+            *(str(tmp_path / _) for _ in ("diagrams.py", "saved.umlc")),
+            *("-g", "plantuml", "-g", "graphviz"),
+            *("-o", str(tmp_path / "out" / "nested"), "-j", "2"),
+        ]
+    )
+    out = tmp_path / "out" / "nested"
+    # the generators not supporting the kind of the diagram are skipped
+    assert sorted(_.name for _ in out.iterdir()) == [
+        "diagrams.graph.dot",
+        "diagrams.graph.puml",
+        "diagrams.sequence.puml",
+        "saved.puml",
+    ]
+    assert (out / "saved.puml").read_text() == str(build_sequence("Saved"))
+    assert (out / "diagrams.graph.dot").read_text() == Graphviz(
+        build_graph()
+    ).generate_graph_diagram()
+
+
+def test_missing_source(tmp_path, capsys):
+    with pytest.raises(SystemExit):
+        main([str(tmp_path / "missing.py")])
+    assert "does not exist" in capsys.readouterr().err
+
+
+def test_watch(tmp_path, monkeypatch, capsys):
+    source = tmp_path / "diagrams.py"
+    write_module(source)
+    other = tmp_path / "other.py"
+    write_module(other)
+
+    changes = iter(
+        (
+            lambda: None,
+            lambda: write_module(source, "Changed"),
+            lambda: source.write_text("raise ValueError('Broken')"),
+            lambda: source.unlink(),
+            lambda: write_module(source, "Fixed"),
+        )
+    )
+
+    def sleep(interval):
+        assert interval == 0.5
+        try:
+            next(changes)()
+        except StopIteration:
+            raise KeyboardInterrupt
+
+    monkeypatch.setattr("umlcharter.cli.time.sleep", sleep)
+    assert main([str(source), str(other), "-j", "1", "-w", "--interval", "0.5"]) == 0
+
+    captured = capsys.readouterr()
+    assert "Failed to render" in captured.err and "Broken" in captured.err
+    assert (tmp_path / "diagrams.sequence.puml").read_text() == str(
+        build_sequence("Fixed")
+    )
+    # only the diagrams of the changed sources have been rendered again
+    assert captured.out.count("other.sequence.puml") == 1
+    assert captured.out.count("diagrams.sequence.puml") == 3
+    assert captured.out.count("diagrams.graph.mmd") == 1
+
+
+def test_watch_polls(tmp_path, monkeypatch):
+    source = tmp_path / "diagrams.py"
+    write_module(source)
+    sleeps = []
+    monkeypatch.setattr("umlcharter.cli.time.sleep", sleeps.append)
+
+    watch([source], [], None, 1, {}, interval=2.0, polls=3)
+    assert sleeps == [2.0, 2.0, 2.0]
+    assert not (tmp_path / "diagrams.graph.mmd").exists()
@@ -0,0 +1,88 @@
+import pytest
+
+from umlcharter import (
+    SequenceDiagram,
+    GraphDiagram,
+    Mermaid,
+    PlantUML,
+    D2,
+    SequenceDiagramOrg,
+    Graphviz,
+)
+from umlcharter.generators import escaping
+
+
+@pytest.mark.parametrize(
+    "transform,string,escaped",
+    (
+        (escaping.mermaid_line_break, "Two\nlines", "Two<br/>lines"),
+        (escaping.mermaid_single_line, "Two\nlines", "Two lines"),
+        (escaping.mermaid_state_label, "Route:\nhere", "Route here"),
+        (
+            escaping.mermaid_quoted,
+            'The "quoted"\nstate',
+            "The #quot;quoted#quot; state",
+        ),
+        (escaping.plantuml_line_break, "Two\nlines", "Two\\nlines"),
+        (
+            escaping.plantuml_quoted,
+            'The "quoted"\nstate',
+            "The &#34;quoted&#34;\\nstate",
+        ),
+        (escaping.d2_label, "Plain\ntext", "Plain\\ntext"),
+        (escaping.d2_label, "", "''"),
+        (escaping.d2_label, "200: OK", '"200: OK"'),
+        (escaping.d2_label, '{"a": "b\\c"}', '"{\\"a\\": \\"b\\\\c\\"}"'),
+        (escaping.d2_line_break, "", "''"),
+        (escaping.d2_quoted, 'The "note"\nhere', 'The \\"note\\"\\nhere'),
+        (escaping.d2_quoted, "C:\\", "C:\\\\"),
+        (escaping.sequencediagramorg_line_break, "Two\nlines", "Two\\nlines"),
+        (escaping.sequencediagramorg_single_line, "Two\nlines", "Two lines"),
+        (escaping.graphviz_quoted, 'The "label"\nhere', 'The \\"label\\"\\nhere'),
+        (escaping.graphviz_quoted, "", "''"),
+        (escaping.graphviz_quoted, "C:\\", "C:\\\\"),
+        (escaping.graphviz_quoted, 'C:\\"dir"\n', 'C:\\\\\\"dir\\"\\n'),
+    ),
+)
+def test_transforms(transform, string, escaped):
+    assert transform(string) == escaped
+
+
+def test_repeated_texts_are_escaped_once():
+    escaping.cache_clear()
+    for _ in range(3):
+        assert escaping.mermaid_line_break("200\nOK") == "200<br/>OK"
+    info = escaping.mermaid_line_break.cache_info()
+    assert (info.hits, info.misses) == (2, 1)
+
+    escaping.cache_clear()
+    assert escaping.mermaid_line_break.cache_info().currsize == 0
+
+
+@pytest.mark.parametrize(
+    "generator_cls,expected",
+    (
+        (Mermaid, 'participant p1 as Client "A"\n'),
+        (PlantUML, 'participant "Client &#34;A&#34;" as p1'),
+        (D2, 'p1: "Client \\"A\\"" \n'),
+        (SequenceDiagramOrg, 'participant "Client "A"" as p1'),
+    ),
+)
+def test_quoted_participants(generator_cls, expected):
+    sd = SequenceDiagram("Quotes", generator_cls)
+    sd.participant('Client "A"').go_to(sd.participant("Server"), "Request")
+    assert expected in sd.generate()
+
+
+@pytest.mark.parametrize(
+    "generator_cls,expected",
+    (
+        (Mermaid, 'state "The #quot;quoted#quot; node" as n2\n'),
+        (PlantUML, 'state "The &#34;quoted&#34; node" as n2\n'),
+        (Graphviz, 'label = "The \\"quoted\\" node"'),
+    ),
+)
+def test_quoted_nodes(generator_cls, expected):
+    gd = GraphDiagram("Quotes", generator_cls)
+    gd.node('The "quoted" node')
+    assert expected in gd.generate()
@@ -1,8 +1,14 @@
+import copy
+import gc
+import io
+import pickle
+import sys
 from unittest.mock import Mock
 
 import pytest
 
-from umlcharter import GraphDiagram, Mermaid, PlantUML, Graphviz
+from umlcharter import profiling
+from umlcharter import SequenceDiagram, GraphDiagram, Mermaid, PlantUML, Graphviz
 from umlcharter.charts.common import ChartingException
 
 
@@ -205,16 +211,16 @@ title: Diagram Nested Groups
 ---
 stateDiagram-v2
 state "Group #1" as n2 {
-  state "Nested Group #1" as n5 {
-    state "Nested Node #1" as n8
+  state "Nested Group #1" as n6 {
+    state "Nested Node #1" as n9
   }
-  [*] --> n5 : Go deeper!
-  n5 --> [*] : It was deep, indeed
+  [*] --> n6 : Go deeper!
+  n6 --> [*] : It was deep, indeed
 }
 classDef cd_n2 fill:#769D8F
 class n2 cd_n2
-state "Group #2" as n9
-n2 --> n9 : Inter-group route
+state "Group #2" as n3
+n2 --> n3 : Inter-group route
 """,
             ),
             (
@@ -223,14 +229,14 @@ n2 --> n9 : Inter-group route
 title Diagram Nested Groups
 hide empty description
 state "Group #1" as n2 #769D8F {
-  state "Nested Group #1" as n5 #769D8F {
-    state "Nested\\nNode #1" as n8 #769D8F
+  state "Nested Group #1" as n6 #769D8F {
+    state "Nested\\nNode #1" as n9 #769D8F
   }
-  [*] --> n5 : Go deeper!
-  n5 --> [*] : It was deep, indeed
+  [*] --> n6 : Go deeper!
+  n6 --> [*] : It was deep, indeed
 }
-state "Group #2" as n9
-n2 --> n9 : Inter-group\\nroute
+state "Group #2" as n3
+n2 --> n3 : Inter-group\\nroute
 @enduml
 """,
             ),
@@ -247,19 +253,19 @@ n2 --> n9 : Inter-group\\nroute
         label = "Group #1"
         style = "filled"
         fillcolor = "#769D8F"
-        n3 [shape = "circle", style = "filled", fillcolor = "black", label = "", fixedsize = true, height = 0.2]
-        n4 [shape = "doublecircle", style = "filled", fillcolor = "black", label = "", fixedsize = true, height = 0.2]
-        subgraph cluster_n5 {
+        n4 [shape = "circle", style = "filled", fillcolor = "black", label = "", fixedsize = true, height = 0.2]
+        n5 [shape = "doublecircle", style = "filled", fillcolor = "black", label = "", fixedsize = true, height = 0.2]
+        subgraph cluster_n6 {
             label = "Nested Group #1"
             style = "filled"
             fillcolor = "#769D8F"
-            n8 [style = "rounded,filled", shape = "box", label = "Nested\\nNode #1", fillcolor = "#769D8F"]
+            n9 [style = "rounded,filled", shape = "box", label = "Nested\\nNode #1", fillcolor = "#769D8F"]
         }
-        n3 -> cluster_n5 [label = "Go deeper!"]
-        cluster_n5 -> n4 [label = "It was deep, indeed"]
+        n4 -> cluster_n6 [label = "Go deeper!"]
+        cluster_n6 -> n5 [label = "It was deep, indeed"]
     }
-    n9 [style = "rounded,filled", shape = "box", label = "Group #2", fillcolor = "lightgrey"]
-    cluster_n2 -> n9 [label = "Inter-group\\nroute"]
+    n3 [style = "rounded,filled", shape = "box", label = "Group #2", fillcolor = "lightgrey"]
+    cluster_n2 -> n3 [label = "Inter-group\\nroute"]
 }
 """,
             ),
@@ -709,6 +715,255 @@ n5 -> n2 : We are rolling: yay!
         n4.go_to(n1, "We are rolling: yay!")
         assert str(gd) == output
 
+    @pytest.mark.parametrize("generator_cls", (Mermaid, PlantUML, Graphviz))
+    def test_streaming_generation(self, generator_cls):
+        gd = GraphDiagram("Streaming", generator_cls=generator_cls)
+        group = gd.node("Group")
+        gd.start.go_to(group)
+        group.start.go_to(group.node("Inner")).go_to(group.finish)
+
+        stream = io.StringIO()
+        gd.generate_to(stream)
+        assert stream.getvalue() == "".join(gd.iter_generate()) == str(gd)
+
+    def test_generated_text_is_reused_until_changed(self):
+        gd = GraphDiagram("Cached", generator_cls=PlantUML)
+        group = gd.node("Group")
+        generated = gd.generate()
+        assert str(gd) is generated
+
+        changes = (
+            lambda: group.node("Nested"),
+            lambda: group.start.go_to(group.find("Nested")),
+            lambda: group.find("Nested").go_to_many([group.finish], ["Done"]),
+            lambda: group.note("Note"),
+            lambda: group.fork().note("Fork note"),
+            lambda: group.join().note("Join note"),
+            lambda: gd.condition().note("Condition note"),
+            lambda: setattr(gd, "is_vertical", False),
+        )
+        for change in changes:
+            change()
+            assert gd.generate() != generated
+            generated = gd.generate()
+            assert gd.generate() is generated
+
+    def test_generate_all(self):
+        def build(generator_cls):
+            gd = GraphDiagram("All DSLs", generator_cls=generator_cls)
+            group = gd.node("Group", color="769D8F")
+            group.start.go_to(group.node("Nested")).go_to(group.finish)
+            gd.start.go_to(group).go_to(gd.fork()).go_to(gd.finish, "Done")
+            group.note("Note")
+            return gd
+
+        generator_classes = (Mermaid, PlantUML, Graphviz)
+        gd = build(Graphviz)
+        generated = gd.generate_all(generator_classes)
+        assert generated == {
+            generator_cls: str(build(generator_cls))
+            for generator_cls in generator_classes
+        }
+        # the diagram has not been changed, so the same texts are returned
+        for generator_cls, text in gd.generate_all(generator_classes).items():
+            assert text is generated[generator_cls]
+        assert str(gd) is generated[Graphviz]
+
+    def test_profiling(self):
+        gd = GraphDiagram("Profiled", Mermaid)
+        group = gd.node("Group")
+        group.start.go_to(group.node("Nested")).go_to(group.finish)
+        gd.start.go_to(group).go_to(gd.finish)
+
+        with profiling.profile() as collected:
+            generated = gd.generate_all((Mermaid, PlantUML, Graphviz))
+        gd.generate_all((Mermaid, PlantUML, Graphviz))
+
+        assert [_.generator for _ in collected] == ["Mermaid", "PlantUML", "Graphviz"]
+        for stats, text in zip(collected, generated.values()):
+            assert stats.title == "Profiled"
+            assert stats.counts == {
+                "start": 2,
+                "finish": 2,
+                "group": 1,
+                "node": 1,
+                "level_end": 2,
+            }
+            assert stats.output_bytes == len(text.encode())
+            assert set(stats.phases) >= {"header", "entries"}
+
+    def test_pack(self):
+        gd = GraphDiagram("Packed", Mermaid, is_vertical=False)
+        group = gd.node("Group", color="769D8F")
+        nested = group.node("Nested")
+        group.start.go_to(nested).go_to(group.finish)
+        nested.note("Nested note")
+        fork, join, condition = gd.fork(), gd.join(), gd.condition()
+        gd.start.go_to(group).go_to(fork).go_to_many([gd.node("A"), gd.node("B")])
+        gd.find("A").go_to(join)
+        gd.find("B").go_to(join, "B is done").go_to(condition).go_to(gd.finish, "Done")
+        condition.note("Condition note")
+
+        packed = gd.pack()
+        restored = GraphDiagram.unpack(packed)
+        assert restored.pack() == packed
+        assert restored.generate_all((Mermaid, PlantUML, Graphviz)) == gd.generate_all(
+            (Mermaid, PlantUML, Graphviz)
+        )
+        # the restored diagram is a regular one and can be changed further
+        restored_group = restored.find("Group")
+        restored_group.node("Another").go_to(restored_group.finish)
+        with pytest.raises(ChartingException):
+            restored_group.find("Nested").go_to(restored_group.finish)
+
+    def test_pickle(self):
+        gd = GraphDiagram("Pickled", Graphviz)
+        group = gd.node("Group", color="769D8F")
+        group.start.go_to(group.node("Nested")).go_to(group.finish)
+        gd.start.go_to(group).go_to(gd.condition()).go_to(gd.finish, "Done")
+
+        for restored in (pickle.loads(pickle.dumps(gd)), copy.deepcopy(gd)):
+            assert restored is not gd
+            assert restored.pack() == gd.pack()
+            assert restored.generate() == gd.generate()
+
+        # the restored diagram is as good as the built one: the nodes are found, the links are counted
+        # and checked, and the new nodes get the next ids
+        restored = pickle.loads(pickle.dumps(gd))
+        restored_group = restored.find("Group")
+        assert restored_group._incoming == 1
+        assert restored._GraphDiagram__base_node.contains_groups()  # noqa
+        with pytest.raises(ChartingException):
+            restored_group.node("Nested")
+        with pytest.raises(ChartingException):
+            restored.start.go_to(restored_group)
+        # nb: every packed node but the most top level one has the id
+        assert restored.node("Another")._id == len(gd.pack()[3]) - 1
+        assert restored.generate() != gd.generate()
+
+    @pytest.mark.parametrize("mmap", (False, True))
+    def test_save_and_load(self, tmp_path, mmap):
+        gd = GraphDiagram("Saved", PlantUML, is_vertical=False)
+        group = gd.node("Group", color="769D8F")
+        group.start.go_to(group.node("Nested")).go_to(group.finish)
+        group.note("Group note")
+        gd.start.go_to(group).go_to(gd.join()).go_to(gd.finish, "Done")
+
+        gd.save(tmp_path / "diagram.umlc")
+        restored = GraphDiagram.load(tmp_path / "diagram.umlc", mmap=mmap)
+        assert restored.pack() == gd.pack()
+        assert restored.generate() == gd.generate()
+        with pytest.raises(ChartingException):
+            SequenceDiagram.load(tmp_path / "diagram.umlc")
+
+    def test_from_edges(self):
+        gd = GraphDiagram("Edges", Mermaid)
+        idle, busy, broken = (
+            gd.node("Idle"),
+            gd.node("Busy", color="769D8F"),
+            gd.node("Broken"),
+        )
+        gd.start.go_to(idle).go_to(busy, "Task").go_to(idle, "Done")
+        busy.go_to(broken, "Failure").go_to(gd.finish)
+
+        from_edges = GraphDiagram.from_edges(
+            "Edges",
+            Mermaid,
+            nodes=("Idle", "Busy", "Broken"),
+            colors=(None, "769D8F", None),
+            edges=(
+                (None, "Idle", ""),
+                ("Idle", "Busy", "Task"),
+                ("Busy", "Idle", "Done"),
+                ("Busy", "Broken", "Failure"),
+                ("Broken", None, ""),
+            ),
+        )
+        assert from_edges.generate() == gd.generate()
+
+        group = from_edges.find("Broken")
+        repairing, repaired = group.add_nodes(["Repairing", "Repaired"])
+        group.add_edges(
+            [
+                (None, repairing, "Repair"),
+                (repairing, "Repaired", ""),
+                (repaired, None, ""),
+            ]
+        )
+        assert group.is_group()
+
+        # the garbage collector of the whole interpreter is left alone, even while the edges are consumed
+        def edges():
+            assert gc.isenabled()
+            yield "A", "B", ""
+
+        GraphDiagram.from_edges("Edges", Mermaid, ["A", "B"], edges())
+
+    def test_incoming_links_and_groups_are_tracked(self):
+        gd = GraphDiagram("Tracked", Mock)
+        first, second = gd.add_nodes(["First", "Second"])
+        condition = gd.condition()
+        gd.start.go_to(first).go_to(condition).go_to_many([second, gd.finish])
+        gd.add_edges([(second, None, "")])
+        assert [_._incoming for _ in (gd.start, first, second, condition)] == [
+            0,
+            1,
+            1,
+            1,
+        ]
+        assert gd.finish._incoming == 2
+        assert not gd._GraphDiagram__base_node.contains_groups()  # noqa
+
+        nested = first.node("Nested")
+        assert gd._GraphDiagram__base_node.contains_groups()  # noqa
+        assert not first.contains_groups()
+        nested.fork()
+        assert first.contains_groups() and not nested.contains_groups()
+
+        restored = copy.deepcopy(gd)
+        assert restored.find("First").contains_groups()
+        assert restored.find("Second")._incoming == 1
+        assert restored.finish._incoming == 2
+
+    @pytest.mark.parametrize(
+        "edges",
+        (
+            [
+                ("Idle", "Busy", ""),
+                ("Idle", "Busy", "Again"),
+            ],  # duplicate within the batch
+            [
+                ("Busy", "Idle", ""),
+                (None, "Idle", ""),
+            ],  # duplicate of the existing link
+            [("Idle", "Busy", ""), (None, None, "")],  # from start to finish
+            [("Idle", "Unknown", "")],
+            [("Idle", "Nested", "")],  # to the node of another level
+        ),
+    )
+    def test_add_edges_is_validated_as_whole(self, edges):
+        gd = GraphDiagram.from_edges(
+            "Edges",
+            Mock,
+            nodes=["Idle", "Busy"],
+            edges=[(None, "Idle", ""), ("Busy", "Idle", "")],
+        )
+        nested = gd.find("Busy").node("Nested")
+        edges = [
+            (from_, nested if to_ == "Nested" else to_, text)
+            for from_, to_, text in edges
+        ]
+        with pytest.raises(ChartingException):
+            gd.add_edges(edges)
+        assert gd.find("Idle")._BaseNode__targets == set()  # noqa
+        with pytest.raises(ChartingException):
+            gd.add_nodes(["New", "Idle"])
+        with pytest.raises(ChartingException):
+            gd.add_nodes(["New", "New"])
+        with pytest.raises(ChartingException):
+            gd.add_nodes(["New"], colors=[])
+        assert gd.find("New") is None
+
     def test_invalid_color_string(self):
         gd = GraphDiagram("Invalid color", Mock)
         with pytest.raises(ChartingException):
@@ -720,6 +975,20 @@ n5 -> n2 : We are rolling: yay!
         with pytest.raises(ChartingException):
             gd.node("Title")
 
+    def test_find(self):
+        gd = GraphDiagram("Lookup nodes", Mock)
+        outer_node = gd.node("Outer")
+        group = gd.node("Group")
+        nested_node = group.node("Nested")
+
+        assert gd.find("Outer") is outer_node
+        assert gd.find("Group") is group
+        assert group.find("Nested") is nested_node
+        # the lookup is limited to the same level / group
+        assert gd.find("Nested") is None
+        assert group.find("Outer") is None
+        assert not nested_node.is_top_level()
+
     def test_cannot_interact_between_levels(self):
         gd = GraphDiagram("Different levels", Mock)
         outer_node = gd.node("Outer")
@@ -735,6 +1004,50 @@ n5 -> n2 : We are rolling: yay!
         with pytest.raises(ChartingException):
             n1.go_to(n2)
 
+    def test_go_to_many(self):
+        gd = GraphDiagram("Fan-out", Mermaid)
+        condition = gd.condition()
+        n1 = gd.node("Node #1")
+        n2 = gd.node("Node #2")
+        gd.start.go_to(condition)
+        assert condition.go_to_many([n1, n2], ["Yes", "No"]) == [n1, n2]
+        assert gd.finish.go_to_many([]) == []
+        n1.go_to_many([gd.finish])
+        assert str(gd) == (
+            "---\ntitle: Fan-out\n---\nstateDiagram-v2\n"
+            "state n2 <<choice>>\n"
+            'state "Node #1" as n3\n'
+            'state "Node #2" as n4\n'
+            "[*] --> n2 : \n"
+            "n2 --> n3 : Yes\n"
+            "n2 --> n4 : No\n"
+            "n3 --> [*] : \n"
+        )
+
+    @pytest.mark.parametrize(
+        "targets,texts",
+        (
+            (("n1", "n1"), None),  # duplicated link within the batch
+            (("n2",), None),  # already established link
+            (("n1", "n3"), ("Only one text",)),  # the number of texts mismatch
+            (("n1", "start"), None),  # one of the links is not allowed
+        ),
+    )
+    def test_go_to_many_is_validated_as_whole(self, targets, texts):
+        gd = GraphDiagram("Invalid fan-out", Mock)
+        condition = gd.condition()
+        nodes = {
+            "n1": gd.node("Node #1"),
+            "n2": gd.node("Node #2"),
+            "n3": gd.node("Node #3"),
+            "start": gd.start,
+        }
+        condition.go_to(nodes["n2"])
+        with pytest.raises(ChartingException):
+            condition.go_to_many([nodes[_] for _ in targets], texts)
+        # nothing from the invalid batch must be linked
+        condition.go_to_many([nodes["n1"], nodes["n3"]])
+
     def test_cannot_go_to_abstract_start(self):
         gd = GraphDiagram("Start is not a destination", Mock)
         n1 = gd.node("Node #1")
@@ -752,6 +1065,23 @@ n5 -> n2 : We are rolling: yay!
         with pytest.raises(ChartingException):
             gd.start.go_to(gd.finish)
 
+    @pytest.mark.parametrize("generator_cls", (Mermaid, PlantUML, Graphviz))
+    def test_deep_nesting(self, generator_cls):
+        # deeper than the recursion limit allows to walk recursively
+        depth = sys.getrecursionlimit() + 100
+        gd = GraphDiagram("Deep", generator_cls)
+        group = gd.node("Level 0")
+        gd.start.go_to(group).go_to(gd.finish)
+        for level in range(1, depth):
+            nested = group.node(f"Level {level}")
+            group.start.go_to(nested).go_to(group.finish)
+            group = nested
+
+        generated = gd.generate()
+        assert generated.count("Level") == depth
+        restored = copy.deepcopy(gd)
+        assert restored.generate() == generated
+
     @pytest.mark.parametrize("generator_cls", (Mermaid, PlantUML, Graphviz))
     def test_no_cyclic_ref_count(self, generator_cls):
         gd = GraphDiagram(
@@ -762,7 +1092,7 @@ n5 -> n2 : We are rolling: yay!
         fork = gd.fork()
         join = gd.join()
         condition = gd.condition()
-        generator = gd._GraphDiagram__generator  # noqa
+        generator = gd._BaseChart__generator  # noqa
 
         for internal_node in (node, fork, join, condition):
             assert internal_node._graph_ref
@@ -785,3 +1115,30 @@ n5 -> n2 : We are rolling: yay!
             ReferenceError, match="weakly-referenced object no longer exists"
         ):
             assert generator.ref
+
+    def test_stable_aliases(self):
+        gd = GraphDiagram("Stable aliases", Mermaid)
+        first = gd.node("First")
+        second = gd.node("Second")
+        first.go_to(second)
+        assert [gd.start._id, gd.finish._id, first._id, second._id] == [0, 1, 2, 3]
+        assert "n2 --> n3" in gd.generate()
+
+        # turning the node into the group does not change the aliases of the existing nodes
+        nested = first.node("Nested")
+        generated = gd.generate()
+        assert "n2 --> n3" in generated
+        assert [first.start._id, first.finish._id, nested._id] == [4, 5, 6]
+        assert 'state "Nested" as n6' in generated
+
+        # the nodes added at once get the same ids as the ones added one by one
+        assert second.find("A") is None
+        bulk = second.add_nodes(["A", "B"])
+        assert second.find("A") is bulk[0]
+        generated = gd.generate()
+        assert [second.start._id, second.finish._id] == [7, 8]
+        assert [_._id for _ in bulk] == [9, 10]
+        assert 'state "B" as n10' in generated
+
+        for restored in (pickle.loads(pickle.dumps(gd)), copy.deepcopy(gd)):
+            assert restored.generate() == generated
@@ -0,0 +1,45 @@
+import subprocess
+import sys
+
+import pytest
+
+import umlcharter
+
+
+def loaded_modules(code: str) -> set:
+    """The modules of the package loaded by the code, run in the fresh interpreter"""
+    output = subprocess.check_output(
+        [
+            sys.executable,
+            "-c",
+            f"import sys\n{code}\n"
+            "print(*(_ for _ in sys.modules if _.startswith('umlcharter')))",
+        ],
+        text=True,
+    )
+    return set(output.split())
+
+
+def test_import_is_lazy():
+    assert loaded_modules("import umlcharter") == {"umlcharter"}
+
+    loaded = loaded_modules("from umlcharter import SequenceDiagram, Mermaid")
+    assert "umlcharter.generators.mermaid.mermaid" in loaded
+    for generator in ("plantuml", "d2", "sequencediagramorg", "graphviz"):
+        assert f"umlcharter.generators.{generator}" not in loaded
+    assert "umlcharter.rendering" not in loaded
+
+
+@pytest.mark.parametrize("name", umlcharter.__all__)
+def test_exports(name):
+    assert name in dir(umlcharter)
+    exported = getattr(umlcharter, name)
+    assert exported.__name__ == name
+    assert umlcharter.__dict__[name] is exported
+
+
+def test_unknown_export():
+    with pytest.raises(AttributeError, match="has no attribute 'Unknown'"):
+        umlcharter.Unknown  # noqa
+    with pytest.raises(ImportError):
+        from umlcharter import Unknown  # noqa
@@ -0,0 +1,66 @@
+import pytest
+
+from umlcharter import (
+    SequenceDiagram,
+    GraphDiagram,
+    Mermaid,
+    PlantUML,
+    Graphviz,
+    render_many,
+)
+from umlcharter.rendering import _render_packed
+
+
+def build_diagrams():
+    diagrams = []
+    for index in range(10):
+        sd = SequenceDiagram(f"Sequence {index}", Mermaid)
+        client = sd.participant("Client")
+        server = sd.participant("Server")
+        client.go_to(server, f"Request {index}").return_to(client, "Done")
+        diagrams.append(sd)
+
+        gd = GraphDiagram(f"Graph {index}", Mermaid)
+        gd.start.go_to(gd.node(f"Node {index}")).go_to(gd.finish)
+        diagrams.append(gd)
+    return diagrams
+
+
+@pytest.mark.parametrize("workers", (1, 2))
+def test_render_many(workers):
+    diagrams = build_diagrams()
+    rendered = list(
+        render_many(diagrams, (Mermaid, PlantUML), workers=workers, chunksize=3)
+    )
+    assert rendered == [
+        diagram.generate_all((Mermaid, PlantUML)) for diagram in diagrams
+    ]
+
+
+def test_render_many_unsupported_generator():
+    with pytest.raises(NotImplementedError):
+        list(render_many(build_diagrams(), (Graphviz,), workers=1))
+
+
+def test_render_many_takes_diagrams_lazily():
+    diagrams = build_diagrams()
+    taken = []
+
+    def given():
+        for diagram in diagrams:
+            taken.append(diagram)
+            yield diagram
+
+    rendered = render_many(given(), (Mermaid,), workers=2, chunksize=1)
+    assert next(rendered) == diagrams[0].generate_all((Mermaid,))
+    # no more than two chunks per worker are packed ahead of the results
+    assert len(taken) <= 5
+    assert len(list(rendered)) == len(diagrams) - 1
+
+
+def test_render_packed():
+    diagrams = build_diagrams()
+    tasks = [(type(diagram), diagram.pack()) for diagram in diagrams]
+    assert _render_packed(tasks, (Mermaid,)) == [
+        diagram.generate_all((Mermaid,)) for diagram in diagrams
+    ]
@@ -1,8 +1,19 @@
+import copy
+import io
+import pickle
 from unittest.mock import Mock
 
 import pytest
 
-from umlcharter import SequenceDiagram, Mermaid, PlantUML, D2, SequenceDiagramOrg
+from umlcharter import profiling
+from umlcharter import (
+    SequenceDiagram,
+    GraphDiagram,
+    Mermaid,
+    PlantUML,
+    D2,
+    SequenceDiagramOrg,
+)
 from umlcharter.charts.common import ChartingException
 
 
@@ -979,7 +990,7 @@ p2: Bandit
 p1."Batman is throwing\\na batarang at the bandit"
 p1.0 -> p2.1: Pheeeeeeu!
 p2.1."Batman has missed!"
-p2.1 -> p1.0: A bad day\\nfor the Gotham :( {style.stroke-dash: 3}
+p2.1 -> p1.0: "A bad day\\nfor the Gotham :(" {style.stroke-dash: 3}
 p1."Batman is sad now"
 }
 """,
@@ -1026,22 +1037,22 @@ note right of p1: Batman is sad now
                 """sequenceDiagram
 Title: Diagram Participants Grouping
 participant p1 as Participant 1
-participant p2 as Participant 4
+participant p4 as Participant 4
 box A first group
-participant p3 as Participant 2
-participant p4 as Participant 3
+participant p2 as Participant 2
+participant p3 as Participant 3
 end
 box A second group
 participant p5 as Participant 5
 end
 activate p1
-p1->>p3: Pass a message
+p1->>p2: Pass a message
+activate p2
+p2->>p3: Pass a message
 activate p3
 p3->>p4: Pass a message
 activate p4
-p4->>p2: Pass a message
-activate p2
-p2->>p5: Message!
+p4->>p5: Message!
 activate p5
 """,
             ),
@@ -1050,22 +1061,22 @@ activate p5
                 """@startuml
 title: Diagram Participants Grouping
 participant "Participant 1" as p1 
-participant "Participant 4" as p2 
+participant "Participant 4" as p4 
 box "A first\\ngroup" 
-participant "Participant 2" as p3 
-participant "Participant 3" as p4 
+participant "Participant 2" as p2 
+participant "Participant 3" as p3 
 end box
 box "A second\\ngroup" 
 participant "Participant 5" as p5 
 end box
 activate p1 
-p1->p3: Pass a message
+p1->p2: Pass a message
+activate p2 
+p2->p3: Pass a message
 activate p3 
 p3->p4: Pass a message
 activate p4 
-p4->p2: Pass a message
-activate p2 
-p2->p5: Message!
+p4->p5: Message!
 activate p5 
 @enduml
 """,
@@ -1075,14 +1086,14 @@ activate p5
                 """title: Diagram Participants Grouping {
 shape: sequence_diagram
 p1: Participant 1 
-p2: Participant 4 
-p3: Participant 2 
-p4: Participant 3 
+p4: Participant 4 
+p2: Participant 2 
+p3: Participant 3 
 p5: Participant 5 
-p1.0 -> p3.1: Pass a message
-p3.1 -> p4.2: Pass a message
-p4.2 -> p2.3: Pass a message
-p2.3 -> p5.4: Message!
+p1.0 -> p2.1: Pass a message
+p2.1 -> p3.2: Pass a message
+p3.2 -> p4.3: Pass a message
+p4.3 -> p5.4: Message!
 }
 """,
             ),
@@ -1090,22 +1101,22 @@ p2.3 -> p5.4: Message!
                 SequenceDiagramOrg,
                 """title Diagram Participants Grouping
 participant "Participant 1" as p1
-participant "Participant 4" as p2
+participant "Participant 4" as p4
 participantgroup **A first\\ngroup**
-participant "Participant 2" as p3
-participant "Participant 3" as p4
+participant "Participant 2" as p2
+participant "Participant 3" as p3
 end
 participantgroup **A second\\ngroup**
 participant "Participant 5" as p5
 end
 activate p1
-p1->p3: Pass a message
+p1->p2: Pass a message
+activate p2
+p2->p3: Pass a message
 activate p3
 p3->p4: Pass a message
 activate p4
-p4->p2: Pass a message
-activate p2
-p2->p5: Message!
+p4->p5: Message!
 activate p5
 """,
             ),
@@ -1443,6 +1454,444 @@ deactivate p1
         )
         assert str(sd) == output
 
+    @pytest.mark.parametrize(
+        "generator_cls", (Mermaid, PlantUML, D2, SequenceDiagramOrg)
+    )
+    def test_streaming_generation(self, generator_cls):
+        sd = SequenceDiagram("Streaming", generator_cls=generator_cls)
+        first = sd.participant("First")
+        second = sd.participant("Second")
+        first.go_to(second, "Do something").return_to(first, "Done")
+        sd.note("Note")
+
+        stream = io.StringIO()
+        sd.generate_to(stream)
+        assert stream.getvalue() == "".join(sd.iter_generate()) == str(sd)
+
+    def test_generated_text_is_reused_until_changed(self):
+        sd = SequenceDiagram("Cached", generator_cls=PlantUML)
+        first = sd.participant("First")
+        generated = sd.generate()
+        assert str(sd) is generated
+
+        changes = (
+            lambda: sd.participant("Second"),
+            lambda: first.as_actor(),
+            lambda: sd.group_participants("Group", sd.get_participant("Second")),
+            lambda: first.go_to(sd.get_participant("Second"), "Do something"),
+            lambda: sd.note("Note"),
+            lambda: setattr(sd, "title", "Renamed"),
+        )
+        for change in changes:
+            change()
+            assert sd.generate() != generated
+            generated = sd.generate()
+            assert sd.generate() is generated
+
+    def test_generate_all(self):
+        def build(generator_cls):
+            sd = SequenceDiagram("All DSLs", generator_cls=generator_cls)
+            first = sd.participant("First")
+            second = sd.participant("Second", color="769D8F")
+            sd.group_participants("Group", second)
+            with sd.loop("Forever"):
+                first.go_to(second, "Do something").return_to(first, "Done")
+            return sd
+
+        generator_classes = (Mermaid, PlantUML, D2, SequenceDiagramOrg)
+        sd = build(PlantUML)
+        generated = sd.generate_all(generator_classes)
+        assert generated == {
+            generator_cls: str(build(generator_cls))
+            for generator_cls in generator_classes
+        }
+        # the diagram has not been changed, so the same texts are returned
+        for generator_cls, text in sd.generate_all(generator_classes).items():
+            assert text is generated[generator_cls]
+        assert str(sd) is generated[PlantUML]
+
+    def test_generator_without_shared_representation(self):
+        class Legacy(Mermaid):
+            def generate_sequence_diagram(self):
+                return f"legacy {self.ref.title}"
+
+        sd = SequenceDiagram("Old-style generator", Legacy)
+        sd.participant("First")
+        assert sd.generate() == "legacy Old-style generator"
+        assert sd.generate_all((Legacy, PlantUML))[Legacy] == sd.generate()
+
+    def test_profiling(self):
+        sd = SequenceDiagram("Profiled", Mermaid)
+        first = sd.participant("First")
+        second = sd.participant("Second")
+        first.go_to(second, "Do something").return_to(first, "Done")
+        sd.note("Note")
+
+        # nothing is tracked as long as nobody listens
+        with profiling.generation(Mermaid, sd.title) as stats:
+            assert stats is None
+            with profiling.phase("steps"):
+                pass
+
+        hook = Mock()
+        profiling.add_hook(hook)
+        try:
+            with profiling.profile() as collected:
+                generated = sd.generate_all((Mermaid, PlantUML, D2, SequenceDiagramOrg))
+                # the cached texts are not generated again, so there is nothing to report
+                sd.generate_all((Mermaid,))
+        finally:
+            profiling.remove_hook(hook)
+        sd.generate_all((Mermaid,))
+
+        assert [_.generator for _ in collected] == [
+            "Mermaid",
+            "PlantUML",
+            "D2",
+            "SequenceDiagramOrg",
+        ]
+        assert hook.call_args_list == [((stats,),) for stats in collected]
+        for stats, text in zip(collected, generated.values()):
+            assert stats.title == "Profiled"
+            assert stats.counts == {
+                "ForwardStep": 1,
+                "ReturnStep": 1,
+                "NoteStep": 1,
+                "ParticipantActivationControl": 4,
+            }
+            assert stats.output_bytes == len(text.encode())
+            assert set(stats.phases) >= {"header", "steps"}
+            assert stats.total_seconds == sum(stats.phases.values()) > 0
+        # the diagram is normalized only once for all the generators
+        assert [("ir" in stats.phases) for stats in collected] == [
+            True,
+            False,
+            False,
+            False,
+        ]
+
+    def test_steps_are_compact(self):
+        sd = SequenceDiagram("Compact steps", Mock, auto_activation=False)
+        first = sd.participant("First")
+        second = sd.participant("Second")
+        with first.activate(color="66B266"):
+            first.go_to(second, "Do something").return_to(first, "Done")
+        sd.note("Note", color="66B266")
+        with sd.condition(color="66B266"):
+            with sd.case("Case"):
+                pass
+        with sd.loop("Forever"), sd.group("Group"):
+            pass
+
+        steps = sd._SequenceDiagram__sequence  # noqa
+        for step in steps:
+            assert not hasattr(step, "__dict__")
+        # all the colored steps share the same color instance, the rest have no color at all
+        assert len({id(getattr(step, "color", None)) for step in steps}) == 2
+
+    def test_columnar_steps(self):
+        def build(columnar: bool) -> SequenceDiagram:
+            sd = SequenceDiagram("Columnar steps", Mermaid, columnar=columnar)
+            first = sd.participant("First", color="66B266")
+            second = sd.participant("Second")
+            with first.activate(color="66B266"):
+                first.go_to(second, "Do something").return_to(first, "Done")
+            sd.note("Note", color="66B266")
+            with sd.condition():
+                with sd.case("Case"):
+                    second.go_to(second, "Myself").return_to(second, "Done")
+            with sd.loop("Forever"), sd.group("Group"):
+                first.go_to(second, "Do something").return_to(first, "Done")
+            return sd
+
+        regular, columnar = build(columnar=False), build(columnar=True)
+        steps = columnar._SequenceDiagram__sequence  # noqa
+        assert list(map(repr, steps)) == list(
+            map(repr, regular._SequenceDiagram__sequence)  # noqa
+        )
+        assert steps[-1] == steps[len(steps) - 1]
+        assert steps[:2] == list(steps)[:2]
+        # the texts and the colors are stored only once
+        assert sorted(steps.strings) == sorted(
+            {
+                "66B266",
+                "Do something",
+                "Done",
+                "Note",
+                "Case",
+                "Myself",
+                "Forever",
+                "Group",
+            }
+        )
+        assert regular.generate_all([Mermaid, PlantUML, D2, SequenceDiagramOrg]) == (
+            columnar.generate_all([Mermaid, PlantUML, D2, SequenceDiagramOrg])
+        )
+
+    @pytest.mark.parametrize("columnar", (False, True))
+    def test_pack(self, columnar):
+        sd = SequenceDiagram("Packed", Mermaid, columnar=columnar)
+        first = sd.participant("First", color="66B266").as_actor()
+        second = sd.participant("Second").as_boundary()
+        third = sd.participant("Third")
+        sd.group_participants("Group", second, color="769D8F")
+        with sd.loop("Forever"), sd.group("Group"):
+            first.go_to(second, "Do something").return_to(first, "Done")
+        sd.note("Note", color="66B266")
+        first.go_to(second, "Do something else").go_to(third)
+
+        packed = sd.pack()
+        restored = SequenceDiagram.unpack(packed)
+        assert restored.pack() == packed
+        assert [_.title for _ in restored.active_participants] == [
+            _.title for _ in sd.active_participants
+        ]
+        # the restored diagram continues exactly where the original one has stopped
+        for diagram in (sd, restored):
+            diagram.get_participant("Third").return_to(
+                diagram.get_participant("Second"), "Done"
+            ).return_to(diagram.get_participant("First"), "Done")
+        generators = (Mermaid, PlantUML, D2, SequenceDiagramOrg)
+        assert restored.generate_all(generators) == sd.generate_all(generators)
+        with pytest.raises(ChartingException):
+            restored.group_participants("Group", restored.get_participant("Third"))
+
+    def test_pickle(self):
+        sd = SequenceDiagram("Pickled", PlantUML)
+        first = sd.participant("First", color="66B266")
+        second = sd.participant("Second")
+        sd.group_participants("Group", second)
+        with sd.condition():
+            with sd.case("Case"):
+                first.go_to(second, "Do something").return_to(first, "Done")
+
+        for restored in (pickle.loads(pickle.dumps(sd)), copy.deepcopy(sd)):
+            assert restored is not sd
+            assert restored.pack() == sd.pack()
+            assert restored.generate() == sd.generate()
+
+    @pytest.mark.parametrize("columnar", (False, True))
+    @pytest.mark.parametrize("mmap", (False, True))
+    def test_save_and_load(self, tmp_path, columnar, mmap):
+        sd = SequenceDiagram("Saved", D2, columnar=columnar)
+        first = sd.participant("First", color="66B266").as_control()
+        second = sd.participant("Second")
+        sd.group_participants("Group", second, color="769D8F")
+        with sd.loop("Forever", color="66B266"):
+            first.go_to(second, "Do something").return_to(first, "Done")
+        first.go_to(second, "Do something else")
+
+        sd.save(tmp_path / "diagram.umlc")
+        restored = SequenceDiagram.load(tmp_path / "diagram.umlc", mmap=mmap)
+        assert restored.pack()[4:] == sd.pack()[4:]
+        assert restored.generate() == sd.generate()
+
+        # the loaded diagram can be changed further, the memory-mapped steps are copied to memory then
+        for diagram in (sd, restored):
+            diagram.get_participant("Second").return_to(
+                diagram.get_participant("First"), "Done"
+            )
+        assert restored.generate() == sd.generate()
+
+    def test_save_over_loaded_file(self, tmp_path):
+        path = tmp_path / "diagram.umlc"
+        sd = SequenceDiagram("Saved", Mermaid)
+        first = sd.participant("First")
+        second = sd.participant("Second")
+        for _ in range(10_000):
+            first.go_to(second, "Request").return_to(first, "Response")
+        sd.save(path)
+        loaded = SequenceDiagram.load(path, mmap=True)
+
+        small = SequenceDiagram("Small", Mermaid)
+        small.participant("Other")
+        small.save(path)
+        # the loaded diagram keeps reading its own steps, the file has been replaced, not truncated
+        assert loaded.generate() == sd.generate()
+        assert SequenceDiagram.load(path).generate() == small.generate()
+        assert [_.name for _ in tmp_path.iterdir()] == ["diagram.umlc"]
+
+    def test_load_custom_generator(self, tmp_path):
+        class CustomMermaid(Mermaid):
+            pass
+
+        path = tmp_path / "diagram.umlc"
+        sd = SequenceDiagram("Saved", CustomMermaid)
+        sd.participant("First")
+        sd.save(path)
+        assert SequenceDiagram.load(path).generator_cls is CustomMermaid
+
+    def test_load_unknown_generator(self, tmp_path, monkeypatch):
+        from umlcharter.charts import binary
+
+        path = tmp_path / "diagram.umlc"
+        sd = SequenceDiagram("Saved", Mermaid)
+        sd.participant("First")
+        printed = Mock()
+        monkeypatch.setattr("builtins.print", printed)
+        for generator_path in ("builtins:print", "os:system", "umlcharter:nothing"):
+            with monkeypatch.context() as patch:
+                patch.setattr(binary, "_generator_path", lambda _: generator_path)
+                sd.save(path)
+            with pytest.raises(ChartingException, match="is unknown"):
+                SequenceDiagram.load(path)
+        printed.assert_not_called()
+
+    def test_load_invalid_file(self, tmp_path):
+        path = tmp_path / "diagram.umlc"
+        sd = SequenceDiagram("Saved", Mermaid)
+        sd.participant("First")
+        sd.save(path)
+        saved = path.read_bytes()
+
+        for content in (
+            b"NOPE" + saved[4:],
+            saved[:4] + b"\xff" + saved[5:],
+            saved[:-2],
+        ):
+            path.write_bytes(content)
+            with pytest.raises(ChartingException):
+                SequenceDiagram.load(path)
+
+        path.write_bytes(saved)
+        with pytest.raises(ChartingException):
+            GraphDiagram.load(path)
+
+    def test_from_events(self):
+        sd = SequenceDiagram("Events", PlantUML)
+        client = sd.participant("Client")
+        server = sd.participant("Server")
+        database = sd.participant("Database")
+        with client.activate(color="66B266"):
+            client.go_to(server, "Request")
+        with sd.condition(color="66B266"):
+            with sd.case("Cached"):
+                sd.note("From cache")
+            with sd.case("Not cached"):
+                with sd.loop("Retry 3 times"), sd.group("Query"):
+                    server.go_to(database, "SELECT").return_to(server, "Rows")
+        server.return_to(client, "Response")
+
+        def events():
+            yield "activate", "Client", None, None, "66B266"
+            yield "forward", "Client", "Server", "Request", None
+            yield "deactivate", "Client", None, None, "66B266"
+            yield "condition", None, None, None, "66B266"
+            yield "case", None, None, "Cached", None
+            yield "note", None, None, "From cache", None
+            yield "end_case", None, None, None, None
+            yield "case", None, None, "Not cached", None
+            yield "loop", None, None, "Retry 3 times", None
+            yield "group", None, None, "Query", None
+            yield "forward", "Server", "Database", "SELECT", None
+            yield "return", "Database", "Server", "Rows", None
+            yield "end_group", None, None, None, None
+            yield "end_loop", None, None, None, None
+            yield "end_case", None, None, None, None
+            yield "end_condition", None, None, None, None
+            yield "return", "Server", "Client", "Response", None
+
+        from_events = SequenceDiagram.from_events("Events", PlantUML, events())
+        assert from_events.generate() == sd.generate()
+        from_events.extend(
+            [("forward", from_events.get_participant("Server"), "Cache", "Store", None)]
+        )
+        assert from_events.get_participant("Cache")
+
+        # the same checks as for the steps added one by one
+        with pytest.raises(ChartingException):
+            from_events.extend([("case", None, None, "Outside", None)])
+        with pytest.raises(ChartingException):
+            from_events.extend([("jump", "Client", "Server", None, None)])
+        with pytest.raises(ChartingException):
+            from_events.extend([("forward", client, "Server", None, None)])
+        from_events.get_participant("Client").as_actor()
+        from_events.get_participant("Database").as_entity()
+        with pytest.raises(ChartingException):
+            from_events.extend([("forward", "Client", "Database", "Hack", None)])
+
+    @pytest.mark.parametrize(
+        "events,match",
+        (
+            ([("end_condition", None, None, None, None)], "closes no opened block"),
+            (
+                [
+                    ("loop", None, None, "Forever", None),
+                    ("end_group", None, None, None, None),
+                ],
+                "does not close the last opened block 'loop'",
+            ),
+            (
+                [
+                    ("loop", None, None, "Forever", None),
+                    ("group", None, None, "Inner", None),
+                    ("end_loop", None, None, None, None),
+                ],
+                "does not close the last opened block 'group'",
+            ),
+            (
+                [
+                    ("group", None, None, "Outer", None),
+                    ("loop", None, None, "Forever", None),
+                    ("end_loop", None, None, None, None),
+                ],
+                "block 'group' is not closed",
+            ),
+        ),
+    )
+    def test_unbalanced_events(self, events, match):
+        sd = SequenceDiagram("Events", PlantUML)
+        with pytest.raises(ChartingException, match=match):
+            sd.extend(events)
+
+    @pytest.mark.parametrize(
+        "event",
+        (
+            ("activate", None, None, None, None),
+            ("deactivate", None, None, None, None),
+            ("forward", None, "Server", "Request", None),
+            ("return", "Server", None, "Response", None),
+        ),
+    )
+    def test_events_without_participant(self, event):
+        sd = SequenceDiagram("Events", Mermaid)
+        with pytest.raises(ChartingException, match="requires the participant"):
+            sd.extend([event])
+        with pytest.raises(ChartingException):
+            sd.get_participant("None")
+
+    @pytest.mark.parametrize(
+        "generator_cls", (Mermaid, PlantUML, D2, SequenceDiagramOrg)
+    )
+    def test_events_without_text(self, generator_cls):
+        sd = SequenceDiagram("Events", generator_cls)
+        client = sd.participant("Client")
+        server = sd.participant("Server")
+        with sd.loop(""), sd.group(""):
+            sd.note("")
+            with sd.condition():
+                with sd.case(""):
+                    client.go_to(server, "")
+
+        from_events = SequenceDiagram.from_events(
+            "Events",
+            generator_cls,
+            [
+                ("loop", None, None, None, None),
+                ("group", None, None, None, None),
+                ("note", None, None, None, None),
+                ("condition", None, None, None, None),
+                ("case", None, None, None, None),
+                ("forward", "Client", "Server", None, None),
+                ("end_case", None, None, None, None),
+                ("end_condition", None, None, None, None),
+                ("end_group", None, None, None, None),
+                ("end_loop", None, None, None, None),
+            ],
+        )
+        assert from_events.pack() == sd.pack()
+        assert from_events.generate() == sd.generate()
+
     def test_invalid_color_string(self):
         sd = SequenceDiagram("Invalid color", Mock)
         with pytest.raises(ChartingException):
@@ -1457,6 +1906,54 @@ deactivate p1
                 "Same"
             )  # it is forbidden to have multiple participants with the same label
 
+    def test_get_participant(self):
+        sd = SequenceDiagram("Lookup participants", Mock)
+
+        first = sd.participant("First")
+        second = sd.participant("Second")
+        sd.group_participants("Group", second)
+
+        assert sd.get_participant("First") is first
+        assert sd.get_participant("Second") is second
+        with pytest.raises(ChartingException):
+            sd.get_participant("Third")
+
+    def test_active_participants(self):
+        sd = SequenceDiagram("Active participants", Mock)
+
+        first = sd.participant("First")
+        second = sd.participant("Second")
+        assert sd.active_participants == ()
+
+        first.go_to(second, "Call")
+        assert sd.active_participants == (first, second)
+
+        with second.activate():
+            second.go_to(second, "Self call")
+            assert sd.active_participants == (first, second)
+        assert sd.active_participants == (first, second)
+
+        second.return_to(first, "Return")
+        assert sd.active_participants == ()
+
+    @pytest.mark.parametrize("columnar", (False, True))
+    def test_active_participants_keep_signed_balance(self, columnar):
+        sd = SequenceDiagram("Active participants", Mock, columnar=columnar)
+        first = sd.participant("First")
+
+        # the deactivation before the activation leaves the balance at zero, not active
+        sd.extend(
+            [
+                ("deactivate", first, None, None, None),
+                ("activate", first, None, None, None),
+            ]
+        )
+        assert sd.active_participants == ()
+        assert pickle.loads(pickle.dumps(sd)).active_participants == ()
+
+        sd.extend([("activate", first, None, None, None)])
+        assert sd.active_participants == (first,)
+
     def test_forbid_return_when_not_auto_activated(self):
         sd = SequenceDiagram(
             "Return without auto-activation", Mock, auto_activation=False
@@ -1585,6 +2082,14 @@ deactivate p1
         with pytest.raises(ChartingException):
             sd.group_participants(group_title_2, first)
 
+    def test_cannot_group_participant_of_another_diagram(self):
+        sd = SequenceDiagram("Participants of one diagram", Mock)
+        other_sd = SequenceDiagram("Participants of another diagram", Mock)
+        sd.participant("First")
+        foreign = other_sd.participant("First")
+        with pytest.raises(ChartingException):
+            sd.group_participants("Group", foreign)
+
     @pytest.mark.parametrize(
         "generator_cls", (Mermaid, PlantUML, D2, SequenceDiagramOrg)
     )
@@ -1594,7 +2099,7 @@ deactivate p1
             generator_cls=generator_cls,
         )
         participant = sd.participant("Participant")
-        generator = sd._SequenceDiagram__generator  # noqa
+        generator = sd._BaseChart__generator  # noqa
 
         assert participant._sequence_ref
         assert generator.ref
@@ -1614,3 +2119,25 @@ deactivate p1
             ReferenceError, match="weakly-referenced object no longer exists"
         ):
             assert generator.ref
+
+    def test_stable_aliases(self):
+        sd = SequenceDiagram("Stable aliases", Mermaid)
+        first = sd.participant("First")
+        second = sd.participant("Second")
+        first.go_to(second, "Hello")
+        assert [first._id, second._id] == [0, 1]
+        assert "p1->>p2: Hello" in sd.generate()
+
+        # neither grouping the participants nor adding the new ones changes the aliases of the existing ones
+        third = sd.participant("Third")
+        sd.group_participants("Group", second, third)
+        generated = sd.generate()
+        assert "p1->>p2: Hello" in generated
+        assert "participant p3 as Third" in generated
+
+        restored = pickle.loads(pickle.dumps(sd))
+        assert [
+            restored.get_participant(title)._id
+            for title in ("First", "Second", "Third")
+        ] == [0, 1, 2]
+        assert restored.generate() == generated
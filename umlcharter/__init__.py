@@ -1,10 +1,15 @@
-from .charts.sequence_diagram import SequenceDiagram
-from .charts.graph_diagram import GraphDiagram
-from .generators.mermaid.mermaid import Mermaid
-from .generators.plantuml.plantuml import PlantUML
-from .generators.d2.d2 import D2
-from .generators.sequencediagramorg.sequencediagramorg import SequenceDiagramOrg
-from .generators.graphviz.graphviz import Graphviz
+import importlib
+import typing
+
+if typing.TYPE_CHECKING:  # pragma: nocover
+    from .charts.sequence_diagram import SequenceDiagram
+    from .charts.graph_diagram import GraphDiagram
+    from .generators.mermaid.mermaid import Mermaid
+    from .generators.plantuml.plantuml import PlantUML
+    from .generators.d2.d2 import D2
+    from .generators.sequencediagramorg.sequencediagramorg import SequenceDiagramOrg
+    from .generators.graphviz.graphviz import Graphviz
+    from .rendering import render_many
 
 __version__ = "1.1.6"
 
@@ -18,4 +23,33 @@ __all__ = (
     "D2",
     "SequenceDiagramOrg",
     "Graphviz",
+    # rendering
+    "render_many",
 )
+
+# NB: the exports are imported only once they are accessed, so e.g. the script using just one generator
+#  does not pay for importing all the others
+_EXPORTS = {
+    "SequenceDiagram": ".charts.sequence_diagram",
+    "GraphDiagram": ".charts.graph_diagram",
+    "Mermaid": ".generators.mermaid.mermaid",
+    "PlantUML": ".generators.plantuml.plantuml",
+    "D2": ".generators.d2.d2",
+    "SequenceDiagramOrg": ".generators.sequencediagramorg.sequencediagramorg",
+    "Graphviz": ".generators.graphviz.graphviz",
+    "render_many": ".rendering",
+}
+
+
+def __getattr__(name: str) -> typing.Any:
+    try:
+        module = _EXPORTS[name]
+    except KeyError:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}") from None
+    value = getattr(importlib.import_module(module, __name__), name)
+    globals()[name] = value  # the next access does not go through this function anymore
+    return value
+
+
+def __dir__() -> typing.List[str]:
+    return sorted({*globals(), *__all__})
@@ -0,0 +1,236 @@
+"""
+The optional disk cache of the generated diagrams, shared by all the processes using the same directory
+(e.g. the subsequent CI jobs regenerating the same diagrams over and over).
+
+    cache.enable(cache.DiskCache(".umlcharter-cache", max_bytes=64 * 2**20))
+    diagram.generate()  # generated once, read from the cache afterward, even by another process
+
+The generated texts are keyed by the structural hash of the diagram (see `structural_hash`),
+the generator and the version of the package, so the cache never has to be invalidated manually.
+Once the cache grows over its size limit, the least recently used texts are evicted.
+"""
+
+import hashlib
+import marshal
+import os
+import typing
+from dataclasses import dataclass
+
+from umlcharter.charts.common import ChartingException
+
+if typing.TYPE_CHECKING:  # pragma: nocover
+    from umlcharter.charts.graph_diagram import GraphDiagram
+    from umlcharter.charts.sequence_diagram import SequenceDiagram
+    from umlcharter.generators.base import IChartGenerator
+
+_SUFFIX = ".txt"
+
+
+def _feed(digest: "hashlib._Hash", value: typing.Any) -> None:
+    """Feed the plain value to the hash as its repr, prefixed by its length"""
+    value = repr(value).encode()
+    digest.update(b"%d:" % len(value))
+    digest.update(value)
+
+
+class RunningHash:
+    """
+    The hash of the changes of the diagram fed as the diagram is being built, so the diagram does not have to be
+    walked through (and encoded) once again every time it is hashed, see `structural_hash`.
+
+    The changes are collected and hashed in batches, turned to the plain values by `encode` first (if it is given).
+    NB: the batches are always of the same size, so the same changes give the same hash no matter when
+    the hash is taken in between.
+    """
+
+    BATCH = 1024
+
+    def __init__(
+        self, encode: typing.Optional[typing.Callable[[typing.Any], typing.Any]] = None
+    ):
+        self.__digest = hashlib.sha256()
+        self.__pending: typing.List[typing.Any] = []
+        self.__encode = encode
+
+    def __dump(self) -> bytes:
+        encode = self.__encode
+        pending = (
+            self.__pending if encode is None else list(map(encode, self.__pending))
+        )
+        # nb: the version 2 of the format is the latest one that does not depend on the identities
+        #  of the values (the references to the same objects, the interned strings)
+        return marshal.dumps(pending, 2)
+
+    def add(self, change: typing.Any) -> None:
+        pending = self.__pending
+        pending.append(change)
+        if len(pending) == self.BATCH:
+            self.__digest.update(self.__dump())
+            pending.clear()
+
+    def feed(self, value: typing.Any) -> None:
+        """Hash the plain value at once, e.g. all the changes of the restored diagram"""
+        if self.__pending:
+            self.__digest.update(self.__dump())
+            self.__pending.clear()
+        self.__digest.update(marshal.dumps(value, 2))
+
+    def digest(self) -> "hashlib._Hash":
+        """The hash of all the changes so far, the running hash can be fed further"""
+        digest = self.__digest.copy()
+        if self.__pending:
+            digest.update(self.__dump())
+        return digest
+
+
+def structural_hash(
+    diagram: typing.Union["SequenceDiagram", "GraphDiagram"],
+) -> "hashlib._Hash":
+    """
+    The hash of everything defining the diagram: the title, the participants and the groups, the steps,
+    the nodes and the routes, the colors and the flags like `auto_activation` / `is_vertical`.
+    The same diagram built once again gets the same hash, in any process.
+
+    The steps, the nodes and the routes are not walked through, they have been hashed as they were added
+    (see `RunningHash`), so taking the hash costs next to nothing however big the diagram is.
+
+    The generator of the diagram itself is not the part of it, the text generated by the generator depends only
+    on the structure of the diagram.
+    """
+    changes, values = diagram._structure()  # noqa
+    digest = changes.digest()
+    _feed(digest, (type(diagram).__name__, values))
+    return digest
+
+
+@dataclass
+class CacheStats:
+    """
+    :hits: The number of the texts found in the cache
+    :misses: The number of the texts not found in the cache (and generated)
+    :writes: The number of the texts written to the cache
+    :evictions: The number of the texts evicted from the cache to keep it within its size limit
+    """
+
+    hits: int = 0
+    misses: int = 0
+    writes: int = 0
+    evictions: int = 0
+
+
+class DiskCache:
+    """
+    The generated texts, one file per text, stored in the directory.
+
+    The modification time of the file is the time it has been used the last time,
+    so all the processes sharing the directory share the same LRU order of the texts.
+    """
+
+    def __init__(
+        self, directory: typing.Union[str, os.PathLike], max_bytes: int = 256 * 2**20
+    ):
+        if max_bytes <= 0:
+            raise ChartingException("The size limit of the cache must be positive.")
+        self.directory = os.fspath(directory)
+        self.max_bytes = max_bytes
+        self.stats = CacheStats()
+        os.makedirs(self.directory, exist_ok=True)
+        # the file name -> the size of it, the usage times are read from the files on eviction only
+        self.__sizes: typing.Dict[str, int] = {
+            entry.name: entry.stat().st_size
+            for entry in os.scandir(self.directory)
+            if entry.name.endswith(_SUFFIX)
+        }
+
+    @property
+    def size_bytes(self) -> int:
+        return sum(self.__sizes.values())
+
+    def __len__(self) -> int:
+        return len(self.__sizes)
+
+    def key(
+        self,
+        structure: "hashlib._Hash",
+        generator_cls: typing.Type["IChartGenerator"],
+    ) -> str:
+        """The key of the text generated by the generator for the diagram of the given `structural_hash`"""
+        from umlcharter import __version__
+
+        digest = structure.copy()
+        _feed(digest, (generator_cls, __version__))
+        return digest.hexdigest()
+
+    def get(self, key: str) -> typing.Optional[str]:
+        path = os.path.join(self.directory, key + _SUFFIX)
+        try:
+            with open(path, "rb") as file:
+                text = file.read().decode()
+            os.utime(path)  # it is the most recently used one now
+        except FileNotFoundError:
+            # it could have been evicted by another process
+            self.__sizes.pop(key + _SUFFIX, None)
+            self.stats.misses += 1
+            return None
+        self.stats.hits += 1
+        return text
+
+    def put(self, key: str, text: str) -> None:
+        name = key + _SUFFIX
+        encoded = text.encode()
+        # nb: the file is replaced at once, so another process never reads the partially written one
+        temporary = os.path.join(self.directory, f"{key}.{os.getpid()}.tmp")
+        with open(temporary, "wb") as file:
+            file.write(encoded)
+        os.replace(temporary, os.path.join(self.directory, name))
+        self.__sizes[name] = len(encoded)
+        self.stats.writes += 1
+        self.__evict()
+
+    def clear(self) -> None:
+        for name in tuple(self.__sizes):
+            self.__remove(name)
+
+    def __remove(self, name: str) -> None:
+        del self.__sizes[name]
+        try:
+            os.remove(os.path.join(self.directory, name))
+        except FileNotFoundError:
+            pass
+
+    def __evict(self) -> None:
+        size = self.size_bytes
+        if size <= self.max_bytes:
+            return
+
+        def last_used(name: str) -> int:
+            try:
+                return os.stat(os.path.join(self.directory, name)).st_mtime_ns
+            except FileNotFoundError:
+                return -1
+
+        for name in sorted(self.__sizes, key=last_used):
+            if size <= self.max_bytes:
+                break
+            size -= self.__sizes[name]
+            self.__remove(name)
+            self.stats.evictions += 1
+
+
+_active: typing.Optional[DiskCache] = None
+
+
+def enable(cache: DiskCache) -> DiskCache:
+    """Use the cache for all the following generations of the diagrams"""
+    global _active
+    _active = cache
+    return cache
+
+
+def disable() -> None:
+    global _active
+    _active = None
+
+
+def active() -> typing.Optional[DiskCache]:
+    return _active
@@ -0,0 +1,374 @@
+"""
+The versioned binary format of the diagrams, little-endian:
+
+- the header: the magic bytes, the version of the format, the kind of the diagram;
+- the table of all the strings of the diagram, every string is stored only once
+  and referred to by its index everywhere else (-1 stands for no string);
+- the fixed-width records of the diagram itself: the groups and the participants of the sequence diagram,
+  the nodes, the notes and the links of the graph diagram;
+- the steps of the sequence diagram, stored column-wise (see `ColumnarSteps`), every column is aligned
+  to 4 bytes, so it can be used straight from the memory-mapped file.
+"""
+
+import importlib
+import mmap
+import os
+import struct
+import sys
+import typing
+from array import array
+
+from umlcharter.charts.common import ChartingException
+from umlcharter.charts.graph_diagram import GraphDiagram
+from umlcharter.charts.sequence_diagram import SequenceDiagram
+from umlcharter.charts.step_storage import ColumnarSteps, NOTHING
+from umlcharter.generators.base import IChartGenerator
+
+MAGIC = b"UMLC"
+VERSION = 2
+
+# NB: the codes are the part of the format, never change the existing ones
+_DIAGRAM_KINDS: typing.Tuple[typing.Type, ...] = (SequenceDiagram, GraphDiagram)
+
+# the generators of the package, imported only once the diagram generated by them is loaded
+_GENERATOR_PATHS = frozenset(
+    (
+        "umlcharter.generators.mermaid.mermaid:Mermaid",
+        "umlcharter.generators.plantuml.plantuml:PlantUML",
+        "umlcharter.generators.d2.d2:D2",
+        "umlcharter.generators.sequencediagramorg.sequencediagramorg:SequenceDiagramOrg",
+        "umlcharter.generators.graphviz.graphviz:Graphviz",
+    )
+)
+
+_HEADER = struct.Struct("<4sHB")
+_COUNT = struct.Struct("<I")
+_STEPS_COUNT = struct.Struct("<Q")
+# title, generator, number of the texts of the steps, auto activation, columnar, inside condition
+_SEQUENCE = struct.Struct("<iiIBBB")
+_GROUP = struct.Struct("<ii")  # title, color
+_PARTICIPANT = struct.Struct("<iiiii")  # title, type, color, group, id
+_INDEX = struct.Struct("<i")
+_CALL = struct.Struct("<ii")  # caller, callee
+_GRAPH = struct.Struct("<iiB")  # title, generator, is vertical
+_NODE = struct.Struct("<Biii")  # kind, group, text, color
+_NOTE = struct.Struct("<ii")  # node, text
+_LINK = struct.Struct("<iii")  # from, to, text
+_ALIGNMENT = 4
+
+Path = typing.Union[str, os.PathLike]
+
+
+class _Writer:
+    def __init__(self, strings: typing.Iterable[str] = ()):
+        self.strings: typing.List[str] = []
+        self.__indexes: typing.Dict[str, int] = {}
+        self.records = bytearray()
+        for string in strings:
+            self.string(string)
+
+    def string(self, string: typing.Optional[str]) -> int:
+        if string is None:
+            return NOTHING
+        try:
+            return self.__indexes[string]
+        except KeyError:
+            self.strings.append(string)
+            return self.__indexes.setdefault(string, len(self.strings) - 1)
+
+    def write(self, record: struct.Struct, *values) -> None:
+        self.records += record.pack(*values)
+
+    def write_many(self, record: struct.Struct, rows: typing.Collection[tuple]) -> None:
+        self.write(_COUNT, len(rows))
+        for row in rows:
+            self.write(record, *row)
+
+
+class _Reader:
+    def __init__(self, buffer: memoryview):
+        self.buffer = buffer
+        self.offset = 0
+        self.strings: typing.List[str] = []
+
+    def read(self, record: struct.Struct) -> tuple:
+        return record.unpack(self.read_block(record.size))
+
+    def read_many(self, record: struct.Struct) -> typing.Iterator[tuple]:
+        (count,) = self.read(_COUNT)
+        block = self.read_block(count * record.size)
+        return record.iter_unpack(block)
+
+    def read_block(self, size: int) -> memoryview:
+        block = self.buffer[self.offset : self.offset + size]
+        if len(block) != size:
+            raise ChartingException("The file of the diagram is truncated.")
+        self.offset += size
+        return block
+
+    def align(self) -> None:
+        self.offset += -self.offset % _ALIGNMENT
+
+    def string(self, index: int) -> typing.Optional[str]:
+        return None if index == NOTHING else self.strings[index]
+
+
+def _little_endian(raw: bytes, typecode: str) -> bytes:
+    """The columns are kept in the native byte order in memory, but always stored in the little-endian one"""
+    if sys.byteorder == "big":  # pragma: nocover
+        column = array(typecode)
+        column.frombytes(raw)
+        column.byteswap()
+        raw = column.tobytes()
+    return raw
+
+
+def _generator_path(generator_cls: typing.Type[IChartGenerator]) -> str:
+    return f"{generator_cls.__module__}:{generator_cls.__qualname__}"
+
+
+def _generator_cls(path: str) -> typing.Type[IChartGenerator]:
+    """
+    The generator by its path stored in the file: one of the generators of the package, or the custom one
+    already defined by the program loading the file. NB: the file is just the data, so it must never make
+    the arbitrary modules imported or the arbitrary callables called.
+    """
+    if path in _GENERATOR_PATHS:
+        module, _, name = path.partition(":")
+        return getattr(importlib.import_module(module), name)
+
+    known = [IChartGenerator]
+    while known:
+        generator_cls = known.pop()
+        if _generator_path(generator_cls) == path:
+            return generator_cls
+        known.extend(generator_cls.__subclasses__())
+    raise ChartingException(f"The generator {path} of the saved diagram is unknown.")
+
+
+def _write_sequence_diagram(packed: tuple) -> typing.Tuple[_Writer, tuple]:
+    (
+        title,
+        generator_cls,
+        auto_activation,
+        columnar,
+        groups,
+        participants,
+        columns,
+        step_participants,
+        strings,
+        auto_activation_stack,
+        inside_condition,
+    ) = packed
+    # NB: the texts of the steps go first, so the indexes stored in the columns stay valid
+    writer = _Writer(strings)
+    writer.write(
+        _SEQUENCE,
+        writer.string(title),
+        writer.string(_generator_path(generator_cls)),
+        len(strings),
+        auto_activation,
+        columnar,
+        inside_condition,
+    )
+    writer.write_many(
+        _GROUP,
+        [
+            (writer.string(group_title), writer.string(color))
+            for group_title, color in groups
+        ],
+    )
+    writer.write_many(
+        _PARTICIPANT,
+        [
+            (
+                writer.string(participant_title),
+                writer.string(type_),
+                writer.string(color),
+                group,
+                participant_id,
+            )
+            for participant_title, type_, color, group, participant_id in participants
+        ],
+    )
+    writer.write_many(_INDEX, [(index,) for index in step_participants])
+    writer.write_many(_CALL, auto_activation_stack)
+    return writer, columns
+
+
+def _read_sequence_diagram(reader: _Reader, mapped: bool) -> SequenceDiagram:
+    (
+        title,
+        generator,
+        number_of_texts,
+        auto_activation,
+        columnar,
+        inside_condition,
+    ) = reader.read(_SEQUENCE)
+    groups = tuple(
+        (reader.string(group_title), reader.string(color))
+        for group_title, color in reader.read_many(_GROUP)
+    )
+    participants = tuple(
+        (
+            reader.string(participant_title),
+            reader.string(type_),
+            reader.string(color),
+            group,
+            participant_id,
+        )
+        for participant_title, type_, color, group, participant_id in reader.read_many(
+            _PARTICIPANT
+        )
+    )
+    step_participants = tuple(index for (index,) in reader.read_many(_INDEX))
+    auto_activation_stack = tuple(reader.read_many(_CALL))
+
+    (count,) = reader.read(_STEPS_COUNT)
+    columns = []
+    for column in ColumnarSteps().columns():
+        reader.align()
+        block = reader.read_block(count * column.itemsize)
+        if mapped and sys.byteorder == "little":
+            columns.append(block)
+        else:
+            columns.append(_little_endian(block.tobytes(), column.typecode))
+
+    return SequenceDiagram.unpack(
+        (
+            reader.string(title),
+            _generator_cls(reader.string(generator)),
+            bool(auto_activation),
+            # NB: the memory-mapped steps are always kept column-wise, otherwise they would be materialized
+            bool(columnar) or mapped,
+            groups,
+            participants,
+            tuple(columns),
+            step_participants,
+            tuple(reader.strings[:number_of_texts]),
+            auto_activation_stack,
+            bool(inside_condition),
+        )
+    )
+
+
+def _write_graph_diagram(packed: tuple) -> typing.Tuple[_Writer, tuple]:
+    title, generator_cls, is_vertical, nodes, links = packed
+    writer = _Writer()
+    writer.write(
+        _GRAPH,
+        writer.string(title),
+        writer.string(_generator_path(generator_cls)),
+        is_vertical,
+    )
+    writer.write_many(
+        _NODE,
+        [
+            (
+                code,
+                NOTHING if group is None else group,
+                writer.string(text),
+                writer.string(color),
+            )
+            for code, group, text, color, _ in nodes
+        ],
+    )
+    writer.write_many(
+        _NOTE,
+        [
+            (index, writer.string(note))
+            for index, (*_, notes) in enumerate(nodes)
+            for note in notes
+        ],
+    )
+    writer.write_many(
+        _LINK,
+        [
+            (from_index, to_index, writer.string(text))
+            for from_index, to_index, text in links
+        ],
+    )
+    return writer, ()
+
+
+def _read_graph_diagram(reader: _Reader, mapped: bool) -> GraphDiagram:
+    title, generator, is_vertical = reader.read(_GRAPH)
+    nodes = [
+        (
+            code,
+            None if group == NOTHING else group,
+            reader.string(text),
+            reader.string(color),
+            [],
+        )
+        for code, group, text, color in reader.read_many(_NODE)
+    ]
+    for index, note in reader.read_many(_NOTE):
+        nodes[index][-1].append(reader.string(note))
+    links = (
+        (from_index, to_index, reader.string(text))
+        for from_index, to_index, text in reader.read_many(_LINK)
+    )
+    return GraphDiagram.unpack(
+        (
+            reader.string(title),
+            _generator_cls(reader.string(generator)),
+            bool(is_vertical),
+            nodes,
+            links,
+        )
+    )
+
+
+_WRITERS = (_write_sequence_diagram, _write_graph_diagram)
+_READERS = (_read_sequence_diagram, _read_graph_diagram)
+
+
+def save(diagram: typing.Union[SequenceDiagram, GraphDiagram], path: Path) -> None:
+    kind = _DIAGRAM_KINDS.index(type(diagram))
+    writer, columns = _WRITERS[kind](diagram.pack())
+
+    # NB: the file is replaced at once, never truncated in place: the diagram loaded from it earlier
+    #  may still be reading its steps straight from the memory-mapped file
+    path = os.fspath(path)
+    temporary = f"{path}.{os.getpid()}.tmp"
+    with open(temporary, "wb") as file:
+        file.write(_HEADER.pack(MAGIC, VERSION, kind))
+        file.write(_COUNT.pack(len(writer.strings)))
+        for string in writer.strings:
+            encoded = string.encode()
+            file.write(_COUNT.pack(len(encoded)))
+            file.write(encoded)
+        file.write(writer.records)
+
+        if columns:
+            file.write(_STEPS_COUNT.pack(len(columns[0])))
+        for column, raw in zip(ColumnarSteps().columns(), columns):
+            file.write(bytes(-file.tell() % _ALIGNMENT))
+            file.write(_little_endian(raw, column.typecode))
+    os.replace(temporary, path)
+
+
+def load(
+    path: Path, mapped: bool = False
+) -> typing.Union[SequenceDiagram, GraphDiagram]:
+    with open(path, "rb") as file:
+        if mapped:
+            buffer = memoryview(mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ))
+        else:
+            buffer = memoryview(file.read())
+
+    reader = _Reader(buffer)
+    magic, version, kind = reader.read(_HEADER)
+    if magic != MAGIC:
+        raise ChartingException(f"The file {path} does not contain the diagram.")
+    if version != VERSION or kind >= len(_READERS):
+        raise ChartingException(
+            f"The diagram in the file {path} is saved in the unsupported version {version} of the format."
+        )
+
+    (count,) = reader.read(_COUNT)
+    for _ in range(count):
+        (size,) = reader.read(_COUNT)
+        reader.strings.append(str(reader.read_block(size), "utf-8"))
+    return _READERS[kind](reader, mapped)
@@ -1,12 +1,39 @@
+import functools
+import inspect
+import os
 import typing
-from dataclasses import dataclass, field
+import weakref
+from dataclasses import dataclass, field, fields
+
+from umlcharter import profiling
+
+if typing.TYPE_CHECKING:  # pragma: nocover
+    from umlcharter.generators.base import IChartGenerator
 
 
 class ChartingException(Exception):
     pass
 
 
-@dataclass
+def slotted(cls: typing.Type) -> typing.Type:
+    """
+    Rebuild the dataclass with `__slots__` instead of the per-instance `__dict__`
+    (the same as `@dataclass(slots=True)`, which is available only since python 3.10).
+
+    NB: all the parents of the dataclass must define `__slots__` as well, otherwise the `__dict__` is still there.
+    """
+    field_names = tuple(_.name for _ in fields(cls))
+    cls_dict = dict(cls.__dict__)
+    cls_dict["__slots__"] = field_names
+    for name in field_names:
+        # the default values are already captured by the generated `__init__`
+        cls_dict.pop(name, None)
+    cls_dict.pop("__dict__", None)
+    cls_dict.pop("__weakref__", None)
+    return type(cls)(cls.__name__, cls.__bases__, cls_dict)
+
+
+@dataclass(frozen=True)
 class Color:
     color: str
 
@@ -28,6 +55,19 @@ class Color:
     def as_hex(self) -> str:
         return f"#{self.color}"
 
+    @classmethod
+    def of(cls, color: str) -> "Color":
+        """
+        The colors are immutable, so the same instance is shared by all the components of the same color
+        """
+        try:
+            return _colors[color]
+        except KeyError:
+            return _colors.setdefault(color, cls(color))
+
+
+_colors: typing.Dict[str, Color] = {}
+
 
 @dataclass
 class __InheritableDataclassAllowingSuperPostInit:
@@ -36,6 +76,8 @@ class __InheritableDataclassAllowingSuperPostInit:
     dataclasses with custom __post_init__'s
     """
 
+    __slots__ = ()
+
     def __post_init__(self):
         pass
 
@@ -46,15 +88,171 @@ class Colored(__InheritableDataclassAllowingSuperPostInit):
     Used to assign the color to the component of the diagram.
     """
 
+    __slots__ = ()
+
     _color: typing.Optional[str]
     color: typing.Optional[Color] = field(init=False)
 
     def __post_init__(self):
         super().__post_init__()
-        self.color = Color(self._color) if self._color else None
+        self.color = Color.of(self._color) if self._color else None
+
+
+@functools.lru_cache(maxsize=None)
+def _accepts_ir(method: typing.Callable) -> bool:
+    """
+    The generators written before the normalized representation was shared by the generators
+    override the rendering methods without the argument, these render the diagram from their reference
+    """
+    return len(inspect.signature(method).parameters) > 1
+
+
+_Chart = typing.TypeVar("_Chart", bound="BaseChart")
 
 
 class BaseChart:
     """
-    Base class for all the charts
+    Base class for all the charts.
+
+    Generates the chart in any DSL, reusing the texts generated earlier, and saves / loads / pickles it.
+    The charts supply only their normalized representation (`to_ir`), the key telling if the chart
+    has been changed since the text was generated (`_revision_key`), the names of the methods of the generator
+    rendering the charts of their kind and their compact representation (`pack` / `unpack`).
     """
+
+    title: str
+    generator_cls: typing.Type["IChartGenerator"]
+
+    # the methods of `IChartGenerator` rendering the chart: at once and chunk by chunk
+    _generate_method: typing.ClassVar[str]
+    _iter_generate_method: typing.ClassVar[str]
+
+    __generator: "IChartGenerator"
+    __generated: typing.Dict[
+        typing.Type["IChartGenerator"], typing.Tuple[typing.Hashable, str]
+    ]
+
+    def __post_init__(self):
+        self.__generator = self.generator_cls(weakref.proxy(self))
+        self.__generated = {}
+
+    def _revision_key(self) -> typing.Hashable:
+        """Changes every time the chart is changed, so the text generated earlier is not valid anymore"""
+        raise NotImplementedError  # pragma: nocover
+
+    def to_ir(self) -> typing.Any:
+        """Normalized representation of the chart shared by all the generators"""
+        raise NotImplementedError  # pragma: nocover
+
+    def pack(self) -> tuple:
+        raise NotImplementedError  # pragma: nocover
+
+    @classmethod
+    def unpack(cls: typing.Type[_Chart], packed: tuple) -> _Chart:
+        raise NotImplementedError  # pragma: nocover
+
+    def generate(self) -> str:
+        """
+        Generate the diagram as a code in the chosen DSL.
+        The generated text is reused for as long as the diagram has not been changed.
+        """
+        return self.generate_all([type(self.__generator)])[type(self.__generator)]
+
+    def generate_all(
+        self, generator_classes: typing.Iterable[typing.Type["IChartGenerator"]]
+    ) -> typing.Dict[typing.Type["IChartGenerator"], str]:
+        """
+        Generate the diagram as a code in every given DSL at once.
+        The diagram is normalized only once and then the same representation is rendered by every generator.
+        If the disk cache is enabled (see `umlcharter.cache`), the texts are looked up there first.
+        """
+        from umlcharter import cache
+
+        key = self._revision_key()
+        ir = None
+        generated = {}
+        disk_cache = cache.active()
+        structure = None
+        for generator_cls in generator_classes:
+            cached = self.__generated.get(generator_cls)
+            if cached is None or cached[0] != key:
+                text = None
+                if disk_cache is not None:
+                    if structure is None:
+                        structure = cache.structural_hash(self)
+                    cache_key = disk_cache.key(structure, generator_cls)
+                    text = disk_cache.get(cache_key)
+                if text is None:
+                    generator = (
+                        self.__generator
+                        if type(self.__generator) is generator_cls
+                        else generator_cls(weakref.proxy(self))
+                    )
+                    with profiling.generation(generator_cls, self.title) as stats:
+                        if ir is None:
+                            with profiling.phase("ir"):
+                                ir = self.to_ir()
+                        method = getattr(generator_cls, self._generate_method)
+                        if _accepts_ir(method):
+                            text = method(generator, ir)
+                        else:
+                            text = method(generator)
+                        if stats:
+                            stats.count(ir.kinds())
+                            stats.output_bytes = len(text.encode())
+                    if disk_cache is not None:
+                        disk_cache.put(cache_key, text)
+                cached = key, text
+                self.__generated[generator_cls] = cached
+            generated[generator_cls] = cached[1]
+        return generated
+
+    def iter_generate(self) -> typing.Iterator[str]:
+        """
+        Generate the diagram chunk by chunk, so the big diagrams can be processed without holding
+        the whole generated text in memory
+        """
+        return getattr(self.__generator, self._iter_generate_method)()
+
+    def generate_to(self, stream: typing.TextIO) -> None:
+        """
+        Write the generated diagram straight to the given text stream (file, pipe of a subprocess, etc.)
+        """
+        stream.writelines(self.iter_generate())
+
+    def save(self, path: typing.Union[str, os.PathLike]) -> None:
+        """
+        Save the diagram to the file in the compact binary format (see `umlcharter.charts.binary`)
+        """
+        from umlcharter.charts.binary import save
+
+        save(self, path)
+
+    @classmethod
+    def load(
+        cls: typing.Type[_Chart],
+        path: typing.Union[str, os.PathLike],
+        mmap: bool = False,
+    ) -> _Chart:
+        """
+        Load the diagram saved by `save`.
+        With `mmap`, the file is memory-mapped and the steps of the sequence diagram are read straight from it
+        while the diagram is generated, instead of loading all of them to memory at once (saving another diagram
+        to the same file later does not affect the loaded one, the file is replaced, not overwritten).
+        """
+        from umlcharter.charts.binary import load
+
+        diagram = load(path, mapped=mmap)
+        if not isinstance(diagram, cls):
+            raise ChartingException(
+                f"The file {path} contains the {type(diagram).__name__}, not the {cls.__name__}."
+            )
+        return diagram
+
+    def __reduce__(self):
+        # NB: the weak back-references the diagram is full of cannot be pickled (or copied),
+        # so the diagram is pickled in its packed form and all the references are rebuilt on load
+        return type(self).unpack, (self.pack(),)
+
+    def __str__(self):
+        return self.generate()
@@ -1,14 +1,28 @@
+import itertools
 import typing
 import weakref
 from dataclasses import dataclass, field
 
+from umlcharter import cache
 from umlcharter.charts.common import BaseChart, Colored, ChartingException
+from umlcharter.charts.ir import GraphDiagramIR, GraphEntry, GraphNodeKind
 from umlcharter.generators.base import IChartGenerator
 
 
 @dataclass
 class BaseNode:
     _graph_ref: typing.Optional["Node"]
+    # identities of the nodes this one already has the established links to
+    __targets: typing.Set[int] = field(init=False, default_factory=set)
+    # the number of the links leading to this node, kept up to date as the links are established
+    _incoming: int = field(init=False, default=0)
+    # the dense id of the node in the graph, in the order of creation; the aliases in the generated diagrams
+    # are made of it, so they stay the same no matter where the node ends up being rendered
+    _id: int = field(init=False, default=-1)
+
+    # NB: the nodes are the keys of the graphs and the aliases, so they are hashed by their identity,
+    #  which costs nothing; every dataclass inheriting it must restate it, otherwise it is reset to None
+    __hash__ = object.__hash__
 
     @property
     def __graph_belongs_to(
@@ -21,12 +35,14 @@ class BaseNode:
             raise ChartingException(
                 "You cannot define a link from a node to another one outside of the same level / group"
             )
+        self.__check_if_link_is_allowed(to)
 
-        for already_existing_routes in self.__graph_belongs_to[self]:
-            if already_existing_routes[0] is to:
-                raise ChartingException(
-                    f"There is already an established link from {self} to {to}."
-                )
+    def __check_if_link_is_allowed(self, to: "BaseNode"):
+        """The checks of the link between the nodes already known to be on the same level"""
+        if id(to) in self.__targets:
+            raise ChartingException(
+                f"There is already an established link from {self} to {to}."
+            )
 
         if isinstance(self, Start) and isinstance(to, Finish):
             raise ChartingException(
@@ -44,58 +60,105 @@ class BaseNode:
                 "The 'start' node can only be the starting point and not the destination"
             )
 
+    def _touch(self) -> None:
+        """Mark the whole graph the node belongs to as changed"""
+        node = self
+        while node._graph_ref is not None:
+            node = node._graph_ref
+        node._Node__revision += 1  # noqa
+
     def go_to(self, to: "BaseNode", text: str = "") -> "BaseNode":
         self.__check_if_interaction_is_allowed(to)
         self.__graph_belongs_to[self].append((to, text))
+        self.__targets.add(id(to))
+        to._incoming += 1
+        self._graph_ref._Node__changes.add(("link", self._id, to._id, text))  # noqa
+        self._touch()
         return to
 
+    def go_to_many(
+        self,
+        targets: typing.Iterable["BaseNode"],
+        texts: typing.Optional[typing.Iterable[str]] = None,
+    ) -> typing.List["BaseNode"]:
+        """
+        Define the links to all the given nodes at once (e.g. the fan-out of a condition).
+        The whole batch is validated first, so either all the links are established or none of them.
+        """
+        targets = list(targets)
+        texts = [""] * len(targets) if texts is None else list(texts)
+        if len(texts) != len(targets):
+            raise ChartingException(
+                "The number of the texts must match the number of the target nodes."
+            )
+
+        batch = set()
+        for to in targets:
+            self.__check_if_interaction_is_allowed(to)
+            if id(to) in batch:
+                raise ChartingException(
+                    f"There is already an established link from {self} to {to}."
+                )
+            batch.add(id(to))
+
+        self.__graph_belongs_to[self].extend(zip(targets, texts))
+        self.__targets.update(batch)
+        changes = self._graph_ref._Node__changes  # noqa
+        for to, text in zip(targets, texts):
+            to._incoming += 1
+            changes.add(("link", self._id, to._id, text))
+        self._touch()
+        return targets
+
 
 @dataclass
 class Fork(BaseNode):
     _notes: list[str] = field(default_factory=list)
 
-    def __hash__(self):
-        return hash(f"{id(self)}")
+    __hash__ = object.__hash__
 
     def __repr__(self):
         return "Fork"  # pragma: nocover
 
     def note(self, text: str) -> None:
         self._notes.append(text)
+        self._graph_ref._Node__changes.add(("note", self._id, text))  # noqa
+        self._touch()
 
 
 @dataclass
 class Join(BaseNode):
     _notes: list[str] = field(default_factory=list)
 
-    def __hash__(self):
-        return hash(f"{id(self)}")
+    __hash__ = object.__hash__
 
     def __repr__(self):
         return "Join"  # pragma: nocover
 
     def note(self, text: str) -> None:
         self._notes.append(text)
+        self._graph_ref._Node__changes.add(("note", self._id, text))  # noqa
+        self._touch()
 
 
 @dataclass
 class Condition(BaseNode):
     _notes: list[str] = field(default_factory=list)
 
-    def __hash__(self):
-        return hash(f"{id(self)}")
+    __hash__ = object.__hash__
 
     def __repr__(self):
         return "Condition"  # pragma: nocover
 
     def note(self, text: str) -> None:
         self._notes.append(text)
+        self._graph_ref._Node__changes.add(("note", self._id, text))  # noqa
+        self._touch()
 
 
 @dataclass
 class Start(BaseNode):
-    def __hash__(self):
-        return hash(f"{id(self)}")
+    __hash__ = object.__hash__
 
     def __repr__(self):
         return "Start"  # pragma: nocover
@@ -103,8 +166,7 @@ class Start(BaseNode):
 
 @dataclass
 class Finish(BaseNode):
-    def __hash__(self):
-        return hash(f"{id(self)}")
+    __hash__ = object.__hash__
 
     def __repr__(self):
         return "Finish"  # pragma: nocover
@@ -114,23 +176,83 @@ class Finish(BaseNode):
 class Node(BaseNode, Colored):
     text: str
     _notes: list[str] = field(default_factory=list)
-    start: Start = field(init=False)
-    finish: Finish = field(init=False)
-    __inner_graph: typing.Dict[BaseNode, typing.List[typing.Tuple[BaseNode, str]]] = (
-        field(init=False)
+    # NB: the start, the finish and the level of the nested nodes are created only once they are needed
+    #  (see `__open`), most of the nodes never become the groups
+    __start: typing.Optional[Start] = field(init=False, default=None)
+    __finish: typing.Optional[Finish] = field(init=False, default=None)
+    __inner_graph: typing.Optional[
+        typing.Dict[BaseNode, typing.List[typing.Tuple[BaseNode, str]]]
+    ] = field(init=False, default=None)
+    __nodes_by_title: typing.Optional[typing.Dict[str, "Node"]] = field(
+        init=False, default=None
     )
+    # the source of the ids of the nodes, shared by the whole graph
+    __ids: typing.Iterator[int] = field(init=False)
+    # if any of the nodes inside this one is a group, kept up to date as the nodes are added
+    __contains_groups: bool = field(init=False, default=False)
+    # the number of changes applied to the graph, tracked by the top level node only
+    __revision: int = field(init=False, default=0)
+    # the running hash of the nodes, the links and the notes of the graph, shared by the whole graph
+    # (see `cache.structural_hash`)
+    __changes: cache.RunningHash = field(init=False)
+
+    @property
+    def start(self) -> Start:
+        self.__open()
+        return self.__start
+
+    @property
+    def finish(self) -> Finish:
+        self.__open()
+        return self.__finish
 
     def is_group(self) -> bool:
         """The node can be a representation of a group / composite state if it contains the other nodes inside it."""
         return (
-            len(self.__inner_graph) > 2
+            self.__inner_graph is not None and len(self.__inner_graph) > 2
         )  # contains anything besides the default start and end nodes
 
     def is_top_level(self) -> bool:
         return not self._graph_ref
 
-    def __hash__(self):
-        return hash(f"{id(self)}")
+    def contains_groups(self) -> bool:
+        """If any of the nodes inside this one is a group itself"""
+        return self.__contains_groups
+
+    def __open(
+        self,
+    ) -> typing.Dict[BaseNode, typing.List[typing.Tuple[BaseNode, str]]]:
+        """The level of the nested nodes, created along with the start and the finish of it once it is needed"""
+        if self.__inner_graph is None:
+            graph_ref = weakref.proxy(self)
+            self.__start = Start(_graph_ref=graph_ref)
+            self.__finish = Finish(_graph_ref=graph_ref)
+            self.__inner_graph = {self.__start: [], self.__finish: []}
+            self.__nodes_by_title = {}
+        return self.__inner_graph
+
+    def __add(self, node: BaseNode) -> None:
+        inner_graph = self.__open()
+        if self.__start._id < 0:
+            # nb: the first nested node makes this node the group, so its start and its finish are rendered
+            #  from now on; they get their ids before the nested node does, however the nodes are added
+            self.__start._id = next(self.__ids)
+            self.__finish._id = next(self.__ids)
+        node._id = next(self.__ids)
+        inner_graph[node] = []
+        self.__changes.add(
+            (
+                type(node).__name__,
+                self._id,
+                getattr(node, "text", None),
+                getattr(node, "_color", None),
+            )
+        )
+        # this node is the group now, so the one it belongs to contains the groups
+        if self._graph_ref is not None:
+            self._graph_ref._Node__contains_groups = True  # noqa
+
+    __hash__ = object.__hash__
 
     def __repr__(self):
         return (
@@ -139,44 +261,194 @@ class Node(BaseNode, Colored):
 
     def __post_init__(self):
         super().__post_init__()
-        self.start = Start(_graph_ref=weakref.proxy(self))
-        self.finish = Finish(_graph_ref=weakref.proxy(self))
-        self.__inner_graph = {
-            self.start: [],
-            self.finish: [],
-        }
-        self._notes = []
+        if self._graph_ref is None:
+            # the most top level node itself is never rendered, so it does not need the id
+            self.__ids = itertools.count()
+            self.__changes = cache.RunningHash()
+            self.__open()
+            self.__start._id = next(self.__ids)
+            self.__finish._id = next(self.__ids)
+        else:
+            # nb: the nested node gets its id once it is added to the group, see `__add`
+            self.__ids = self._graph_ref._Node__ids  # noqa
+            self.__changes = self._graph_ref._Node__changes  # noqa
 
     def __check_if_adding_new_element_is_allowed(self, title: str):
-        for nodes in self.__inner_graph:
-            if getattr(nodes, "text", None) == title:
-                raise ChartingException(
-                    f"There must be no nodes in the graph in the same group with the same title '{title}'."
-                )
+        if self.__nodes_by_title is not None and title in self.__nodes_by_title:
+            raise ChartingException(
+                f"There must be no nodes in the graph in the same group with the same title '{title}'."
+            )
 
     def node(self, title: str, color: typing.Optional[str] = None) -> "Node":
         self.__check_if_adding_new_element_is_allowed(title)
         node = Node(_graph_ref=weakref.proxy(self), text=title, _color=color)
-        self.__inner_graph[node] = []
+        self.__add(node)
+        self.__nodes_by_title[title] = node
+        self._touch()
+        return node
+
+    def find(self, title: str) -> typing.Optional["Node"]:
+        """Look up the node with the given title on the level of this group; `None` if there is no such."""
+        if self.__nodes_by_title is None:
+            return None
+        return self.__nodes_by_title.get(title)
+
+    def add_nodes(
+        self,
+        titles: typing.Iterable[str],
+        colors: typing.Optional[typing.Iterable[typing.Optional[str]]] = None,
+    ) -> typing.List["Node"]:
+        """
+        Add the nodes with the given titles (and colors) to this group at once.
+        The whole batch is validated first, so either all the nodes are added or none of them.
+        """
+        titles = list(titles)
+        colors = [None] * len(titles) if colors is None else list(colors)
+        if len(colors) != len(titles):
+            raise ChartingException(
+                "The number of the colors must match the number of the titles of the nodes."
+            )
+
+        batch = set()
+        for title in titles:
+            self.__check_if_adding_new_element_is_allowed(title)
+            if title in batch:
+                raise ChartingException(
+                    f"There must be no nodes in the graph in the same group with the same title '{title}'."
+                )
+            batch.add(title)
+
+        graph_ref = weakref.proxy(self)
+        nodes = []
+        for title, color in zip(titles, colors):
+            node = Node(_graph_ref=graph_ref, text=title, _color=color)
+            self.__add(node)
+            self.__nodes_by_title[title] = node
+            nodes.append(node)
+        self._touch()
+        return nodes
+
+    def __edge_node(self, node: typing.Union[BaseNode, str]) -> BaseNode:
+        if isinstance(node, str):
+            try:
+                return self.__nodes_by_title[node]
+            except KeyError:
+                raise ChartingException(
+                    f"There is no node with the title '{node}' in the group."
+                )
+        if node not in self.__inner_graph:
+            raise ChartingException(
+                "You cannot define a link from a node to another one outside of the same level / group"
+            )
         return node
 
+    def add_edges(
+        self,
+        edges: typing.Iterable[
+            typing.Tuple[
+                typing.Union[BaseNode, str, None],
+                typing.Union[BaseNode, str, None],
+                str,
+            ]
+        ],
+    ) -> None:
+        """
+        Define the links `(from, to, text)` between the nodes of this group at once.
+        The nodes are referred to by the objects or by their titles,
+        `None` stands for the start of the group as the source and for the finish of the group as the destination.
+        The whole batch is validated first, so either all the links are established or none of them.
+        """
+        inner_graph = self.__open()
+        nodes_by_title = self.__nodes_by_title
+        # NB: the links are validated first and established only once the whole batch is valid; the links
+        #  of the batch are registered as the targets right away (so the duplicates within the batch are caught
+        #  the same way as the already established ones) and unregistered again if the batch is invalid
+        from_nodes: typing.List[BaseNode] = []
+        to_nodes: typing.List[BaseNode] = []
+        texts: typing.List[str] = []
+        try:
+            for from_, to_, text in edges:
+                if from_ is None:
+                    from_node = self.__start
+                elif type(from_) is str and from_ in nodes_by_title:
+                    from_node = nodes_by_title[from_]
+                else:
+                    from_node = self.__edge_node(from_)
+                if to_ is None:
+                    to_node = self.__finish
+                elif type(to_) is str and to_ in nodes_by_title:
+                    to_node = nodes_by_title[to_]
+                else:
+                    to_node = self.__edge_node(to_)
+                # the start, the finish and the links between the nodes can be checked only as a whole
+                if type(from_node) is not Node or type(to_node) is not Node:
+                    from_node._BaseNode__check_if_link_is_allowed(to_node)  # noqa
+                targets = from_node._BaseNode__targets  # noqa
+                if id(to_node) in targets:
+                    raise ChartingException(
+                        f"There is already an established link from {from_node} to {to_node}."
+                    )
+                targets.add(id(to_node))
+                from_nodes.append(from_node)
+                to_nodes.append(to_node)
+                texts.append(text)
+        except BaseException:
+            for from_node, to_node in zip(from_nodes, to_nodes):
+                from_node._BaseNode__targets.discard(id(to_node))  # noqa
+            raise
+
+        changes = self.__changes
+        for from_node, to_node, text in zip(from_nodes, to_nodes, texts):
+            inner_graph[from_node].append((to_node, text))
+            to_node._incoming += 1
+            changes.add(("link", from_node._id, to_node._id, text))
+        self._touch()
+
     def fork(self) -> "Fork":
         fork = Fork(_graph_ref=weakref.proxy(self))
-        self.__inner_graph[fork] = []
+        self.__add(fork)
+        self._touch()
         return fork
 
     def join(self) -> "Join":
         join = Join(_graph_ref=weakref.proxy(self))
-        self.__inner_graph[join] = []
+        self.__add(join)
+        self._touch()
         return join
 
     def condition(self) -> "Condition":
         condition = Condition(_graph_ref=weakref.proxy(self))
-        self.__inner_graph[condition] = []
+        self.__add(condition)
+        self._touch()
         return condition
 
     def note(self, text: str) -> None:
         self._notes.append(text)
+        self.__changes.add(("note", self._id, text))
+        self._touch()
+
+
+_KINDS: typing.Dict[typing.Type[BaseNode], GraphNodeKind] = {
+    Start: GraphNodeKind.START,
+    Finish: GraphNodeKind.FINISH,
+    Fork: GraphNodeKind.FORK,
+    Join: GraphNodeKind.JOIN,
+    Condition: GraphNodeKind.CONDITION,
+    Node: GraphNodeKind.NODE,
+}
+
+# NB: the codes are the part of the packed representation of the graphs, never change the existing ones
+_PACKED_KINDS: typing.Tuple[typing.Type[BaseNode], ...] = (
+    Start,
+    Finish,
+    Node,
+    Fork,
+    Join,
+    Condition,
+)
+_PACKED_KIND_CODES: typing.Dict[typing.Type[BaseNode], int] = {
+    kind: code for code, kind in enumerate(_PACKED_KINDS)
+}
 
 
 @dataclass
@@ -192,16 +464,18 @@ class GraphDiagram(BaseChart):
         True by default (renders from top to bottom)
     """
 
+    _generate_method = "generate_graph_diagram"
+    _iter_generate_method = "iter_generate_graph_diagram"
+
     title: str
     generator_cls: typing.Type[IChartGenerator]
     is_vertical: bool = True
 
-    __generator: IChartGenerator = field(init=False)
     __base_node: Node = field(init=False)
 
     def __post_init__(self):
-        self.__generator = self.generator_cls(weakref.proxy(self))
         self.__base_node = Node(_graph_ref=None, text="", _color=None)
+        super().__post_init__()
 
     @property
     def start(self) -> Start:
@@ -214,6 +488,49 @@ class GraphDiagram(BaseChart):
     def node(self, title: str, color: typing.Optional[str] = None) -> Node:
         return self.__base_node.node(title, color)
 
+    def find(self, title: str) -> typing.Optional[Node]:
+        return self.__base_node.find(title)
+
+    def add_nodes(
+        self,
+        titles: typing.Iterable[str],
+        colors: typing.Optional[typing.Iterable[typing.Optional[str]]] = None,
+    ) -> typing.List[Node]:
+        return self.__base_node.add_nodes(titles, colors)
+
+    def add_edges(
+        self,
+        edges: typing.Iterable[
+            typing.Tuple[
+                typing.Union[BaseNode, str, None],
+                typing.Union[BaseNode, str, None],
+                str,
+            ]
+        ],
+    ) -> None:
+        self.__base_node.add_edges(edges)
+
+    @classmethod
+    def from_edges(
+        cls,
+        title: str,
+        generator_cls: typing.Type[IChartGenerator],
+        nodes: typing.Iterable[str],
+        edges: typing.Iterable[
+            typing.Tuple[typing.Optional[str], typing.Optional[str], str]
+        ],
+        colors: typing.Optional[typing.Iterable[typing.Optional[str]]] = None,
+        is_vertical: bool = True,
+    ) -> "GraphDiagram":
+        """
+        Build the flat graph at once from the titles (and colors) of its nodes and the links `(from, to, text)`
+        between them (see `Node.add_edges`)
+        """
+        gd = cls(title, generator_cls, is_vertical=is_vertical)
+        gd.add_nodes(nodes, colors)
+        gd.add_edges(edges)
+        return gd
+
     def fork(self) -> Fork:
         return self.__base_node.fork()
 
@@ -223,11 +540,167 @@ class GraphDiagram(BaseChart):
     def condition(self) -> Condition:
         return self.__base_node.condition()
 
-    def generate(self) -> str:
-        return self.__generator.generate_graph_diagram()
+    def to_ir(self) -> GraphDiagramIR:
+        """
+        Normalized representation of the diagram shared by all the generators
+        """
+        entries: typing.List[GraphEntry] = []
+        size = 0
+        # nb: the levels are walked with the explicit stack, so the depth of the nesting is not limited
+        #  by the recursion limit; every level is entered with the iterator over its nodes, resumed once
+        #  the nested group is walked through
+        base_graph = self.__base_node._Node__inner_graph  # noqa
+        stack = [(self.__base_node, 0, iter(base_graph.items()))]
+        while stack:
+            group, depth, items = stack[-1]
+            for node, routes in items:
+                # nb: the nodes are not walked in the order of their ids
+                if node._id >= size:
+                    size = node._id + 1
+                if isinstance(node, Node) and node.is_group():
+                    entries.append(GraphEntry(GraphNodeKind.GROUP, node, depth, routes))
+                    inner_graph = node._Node__inner_graph  # noqa
+                    stack.append((node, depth + 1, iter(inner_graph.items())))
+                    break
+                entries.append(GraphEntry(_KINDS[type(node)], node, depth, routes))
+            else:
+                entries.append(
+                    GraphEntry(
+                        GraphNodeKind.LEVEL_END,
+                        group,
+                        depth,
+                        group._Node__inner_graph,  # noqa
+                    )
+                )
+                stack.pop()
+
+        return GraphDiagramIR(
+            title=self.title,
+            is_vertical=self.is_vertical,
+            entries=entries,
+            size=size,
+            contains_groups=self.__base_node.contains_groups(),
+        )
+
+    def pack(self) -> tuple:
+        """
+        Compact representation of the diagram made of the plain values only, without any back-references,
+        so it can be pickled and sent to another process. The nodes are listed in the order of their creation
+        (so restoring them one by one gives them the same ids), referring to the group they belong to by its index,
+        the links refer to the nodes by their indexes. Restored by `unpack`.
+        """
+        # the nodes with the groups they belong to and their routes, walked with the explicit stack (see `to_ir`)
+        walked: typing.List[tuple] = []
+        stack = [(self.__base_node, iter(self.__base_node._Node__inner_graph.items()))]  # noqa
+        while stack:
+            group, items = stack[-1]
+            for node, routes in items:
+                walked.append((node, group, routes))
+                if isinstance(node, Node) and node.is_group():
+                    stack.append((node, iter(node._Node__inner_graph.items())))  # noqa
+                    break
+            else:
+                stack.pop()
+        walked.sort(key=lambda _: _[0]._id)
+
+        # nb: the most top level node goes first
+        indexes = {id(self.__base_node): 0}
+        for index, (node, _, _) in enumerate(walked, start=1):
+            indexes[id(node)] = index
+        nodes = [(_PACKED_KIND_CODES[Node], None, "", None, ())]
+        nodes += (
+            (
+                _PACKED_KIND_CODES[type(node)],
+                indexes[id(group)],
+                getattr(node, "text", None),
+                getattr(node, "_color", None),
+                tuple(getattr(node, "_notes", ())),
+            )
+            for node, group, _ in walked
+        )
+        links = [
+            (indexes[id(node)], indexes[id(to_node)], text)
+            for node, _, routes in walked
+            for to_node, text in routes
+            if id(to_node) in indexes
+        ]
+        return (
+            self.title,
+            self.generator_cls,
+            self.is_vertical,
+            tuple(nodes),
+            tuple(links),
+        )
+
+    @classmethod
+    def unpack(cls, packed: tuple) -> "GraphDiagram":
+        """
+        Restore the diagram from its compact representation built by `pack`.
+        The packed diagram has been valid, so the nodes and the links are put straight to their levels,
+        without validating every one of them again
+        """
+        title, generator_cls, is_vertical, nodes, links = packed
+        gd = cls(title, generator_cls, is_vertical=is_vertical)
+
+        restored: typing.List[BaseNode] = []
+        # the level (the nodes of the group with their routes) every restored node belongs to
+        levels: typing.List[
+            typing.Optional[
+                typing.Dict[BaseNode, typing.List[typing.Tuple[BaseNode, str]]]
+            ]
+        ] = []
+        # the weak references to the groups, shared by all their nested nodes
+        graph_refs: typing.Dict[int, Node] = {}
+        changes = gd.__base_node._Node__changes  # noqa
+        for code, group_index, text, color, notes in nodes:
+            kind = _PACKED_KINDS[code]
+            if group_index is None:
+                node, level = gd.__base_node, None
+            else:
+                group = restored[group_index]
+                level = group._Node__open()  # noqa
+                if kind is Start:
+                    node = group._Node__start  # noqa
+                elif kind is Finish:
+                    node = group._Node__finish  # noqa
+                else:
+                    graph_ref = graph_refs.get(group_index)
+                    if graph_ref is None:
+                        graph_ref = graph_refs[group_index] = weakref.proxy(group)
+                    if kind is Node:
+                        node = Node(_graph_ref=graph_ref, text=text, _color=color)
+                        group._Node__nodes_by_title[text] = node  # noqa
+                    else:
+                        node = kind(_graph_ref=graph_ref)
+                    # nb: the nodes are restored in the order of their ids, so they get the same ids again
+                    group._Node__add(node)  # noqa
+            for note in notes:
+                node._notes.append(note)
+                changes.add(("note", node._id, note))
+            restored.append(node)
+            levels.append(level)
+
+        for from_index, to_index, text in links:
+            from_node, to_node = restored[from_index], restored[to_index]
+            levels[from_index][from_node].append((to_node, text))
+            from_node._BaseNode__targets.add(id(to_node))  # noqa
+            to_node._incoming += 1
+            changes.add(("link", from_node._id, to_node._id, text))
+        return gd
+
+    def _structure(self) -> typing.Tuple[cache.RunningHash, tuple]:
+        """
+        The running hash of the nodes, the links and the notes and the plain values of everything else
+        defining the diagram, see `cache.structural_hash`
+        """
+        return self.__base_node._Node__changes, (self.title, self.is_vertical)  # noqa
+
+    def _revision_key(self) -> typing.Hashable:
+        return (
+            self.__base_node._Node__revision,  # noqa
+            self.title,
+            self.is_vertical,
+        )
 
     def __repr__(self):
         return f"'{self.title}', {self.generator_cls.__name__}"  # pragma: nocover
-
-    def __str__(self):
-        return self.generate()
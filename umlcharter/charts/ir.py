@@ -0,0 +1,99 @@
+import enum
+import typing
+from dataclasses import dataclass
+
+if typing.TYPE_CHECKING:  # pragma: nocover
+    from umlcharter.charts.graph_diagram import BaseNode
+    from umlcharter.charts.sequence_diagram import (
+        SequenceDiagramParticipant,
+        SequenceDiagramParticipantGroup,
+        Step,
+    )
+
+
+@dataclass
+class SequenceDiagramIR:
+    """
+    Normalized representation of the sequence diagram, built once and shared by all the generators.
+
+    :title: The title of the diagram
+    :groups: The groups of the participants in the order they must be rendered
+    :aliases: The alias of every participant, by the id of the participant
+    :steps: The flat sequence of the steps
+    """
+
+    title: str
+    groups: typing.List[
+        typing.Tuple[
+            "SequenceDiagramParticipantGroup",
+            typing.List["SequenceDiagramParticipant"],
+        ]
+    ]
+    aliases: typing.List[str]
+    steps: typing.Sequence["Step"]
+
+    @property
+    def first_participant(self) -> typing.Optional["SequenceDiagramParticipant"]:
+        for _, participants in self.groups:
+            for participant in participants:
+                return participant
+        return None
+
+    def kinds(self) -> typing.Iterator[str]:
+        """The kind of every rendered element, counted by the profiling"""
+        return (type(step).__name__ for step in self.steps)
+
+
+class GraphNodeKind(enum.Enum):
+    START = "start"
+    FINISH = "finish"
+    NODE = "node"
+    GROUP = "group"
+    FORK = "fork"
+    JOIN = "join"
+    CONDITION = "condition"
+    # not a node, but the marker of the end of the level (the group or the whole graph)
+    LEVEL_END = "level_end"
+
+
+@dataclass
+class GraphEntry:
+    """
+    :kind: The kind of the node
+    :node: The node itself
+    :depth: The nesting level of the node, 0 for the nodes on the most top level of the graph
+    :routes: The outgoing routes of the node.
+        For the `LEVEL_END` entries these are the routes of all the nodes of the level that has just ended.
+    """
+
+    kind: GraphNodeKind
+    node: "BaseNode"
+    depth: int
+    routes: typing.Union[
+        typing.List[typing.Tuple["BaseNode", str]],
+        typing.Dict["BaseNode", typing.List[typing.Tuple["BaseNode", str]]],
+    ]
+
+
+@dataclass
+class GraphDiagramIR:
+    """
+    Normalized representation of the graph diagram, built once and shared by all the generators.
+
+    :title: The title of the diagram
+    :is_vertical: The orientation of the diagram
+    :entries: The nodes of the graph flattened in the order of rendering: every group is followed by its nested
+        nodes and the `LEVEL_END` entry closing the group. The last entry closes the most top level of the graph.
+    :size: The number of the nodes, the ids of the nodes are in `range(size)`
+    :contains_groups: If there is at least one group (composite state) in the graph
+    """
+
+    title: str
+    is_vertical: bool
+    entries: typing.List[GraphEntry]
+    size: int
+    contains_groups: bool
+
+    def kinds(self) -> typing.Iterator[str]:
+        """The kind of every rendered element, counted by the profiling"""
+        return (entry.kind.value for entry in self.entries)
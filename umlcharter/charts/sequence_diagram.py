@@ -1,48 +1,60 @@
 import typing
 import weakref
-from collections import Counter
 from contextlib import contextmanager
 from dataclasses import dataclass, field
-from itertools import chain
 
-from umlcharter.charts.common import BaseChart, ChartingException, Colored
+from umlcharter import cache
+from umlcharter.charts.common import BaseChart, ChartingException, Colored, slotted
+from umlcharter.charts.ir import SequenceDiagramIR
 from umlcharter.generators.base import IChartGenerator
 
+if typing.TYPE_CHECKING:  # pragma: nocover
+    from umlcharter.charts.step_storage import ColumnarSteps
+
 
 class Step:
-    pass
+    # NB: there can be millions of the steps in the diagram, so all of them are slotted to keep the memory footprint low
+    __slots__ = ()
 
 
 @dataclass
 class Control(Step):
+    __slots__ = ()
+
     is_active: bool
 
 
+@slotted
 @dataclass
 class LoopControl(Colored, Control):
     how_many_iterations: typing.Union[str, None] = None
 
 
+@slotted
 @dataclass
 class GroupControl(Colored, Control):
     text: typing.Union[str, None] = None
 
 
+@slotted
 @dataclass
 class CaseControl(Colored, Control):
     text: typing.Union[str, None] = None
 
 
+@slotted
 @dataclass
 class ConditionControl(Colored, Control):
     pass
 
 
+@slotted
 @dataclass
 class ParticipantActivationControl(Colored, Control):
     participant: "SequenceDiagramParticipant"
 
 
+@slotted
 @dataclass
 class ForwardStep(Step):
     text: str
@@ -50,6 +62,7 @@ class ForwardStep(Step):
     to_participant: "SequenceDiagramParticipant"
 
 
+@slotted
 @dataclass
 class ReturnStep(Step):
     text: str
@@ -57,6 +70,7 @@ class ReturnStep(Step):
     to_participant: "SequenceDiagramParticipant"
 
 
+@slotted
 @dataclass
 class NoteStep(Colored, Step):
     text: str
@@ -69,6 +83,9 @@ class SequenceDiagramParticipant(Colored):
     type_: typing.Literal["actor", "boundary", "control", "entity", "default"] = field(
         init=False, default="default"
     )
+    # the dense id of the participant in the diagram, in the order of creation; the aliases in the generated
+    # diagrams are made of it, so they stay the same no matter which group the participant ends up in
+    _id: int = field(init=False, default=-1)
 
     def __check_can_set_type(self):
         if self.type_ != "default":
@@ -79,21 +96,25 @@ class SequenceDiagramParticipant(Colored):
     def as_actor(self):
         self.__check_can_set_type()
         self.type_ = "actor"
+        self.__touch()
         return self
 
     def as_boundary(self):
         self.__check_can_set_type()
         self.type_ = "boundary"
+        self.__touch()
         return self
 
     def as_control(self):
         self.__check_can_set_type()
         self.type_ = "control"
+        self.__touch()
         return self
 
     def as_entity(self):
         self.__check_can_set_type()
         self.type_ = "entity"
+        self.__touch()
         return self
 
     def __check_if_interaction_is_possible(self, to: "SequenceDiagramParticipant"):
@@ -136,6 +157,9 @@ class SequenceDiagramParticipant(Colored):
                 f"if you do not really care about it."
             )
 
+    def __touch(self):
+        self._sequence_ref._SequenceDiagram__touch()  # noqa
+
     def __add_step(
         self, step: typing.Union[ForwardStep, ReturnStep, ParticipantActivationControl]
     ):
@@ -190,6 +214,17 @@ class SequenceDiagramParticipantGroup(Colored):
         return hash(self.title)
 
 
+# the compact description of the step: (kind, from participant, to participant, text, color),
+# the participants are referred to either by the objects or by their titles
+Event = typing.Tuple[
+    str,
+    typing.Union[SequenceDiagramParticipant, str, None],
+    typing.Union[SequenceDiagramParticipant, str, None],
+    typing.Optional[str],
+    typing.Optional[str],
+]
+
+
 @dataclass
 class SequenceDiagram(BaseChart):
     """
@@ -202,42 +237,75 @@ class SequenceDiagram(BaseChart):
         Once the control flow has returned back and the initial active participant was the target of the action, the
         active participant must be deactivated.
         True by default.
+    :columnar: The flag used to store the steps column-wise in the compact arrays instead of the list of the objects
+        (see `ColumnarSteps`), suitable for the huge diagrams, like the traces of millions of steps.
+        False by default.
     """
 
+    _generate_method = "generate_sequence_diagram"
+    _iter_generate_method = "iter_generate_sequence_diagram"
+
     title: str
     generator_cls: typing.Type[IChartGenerator]
     auto_activation: bool = True
+    columnar: bool = False
 
     __participants: typing.Dict[
         SequenceDiagramParticipantGroup, typing.List[SequenceDiagramParticipant]
     ] = field(init=False)
-    __sequence: typing.List[Step] = field(init=False)
+    __participants_by_title: typing.Dict[str, SequenceDiagramParticipant] = field(
+        init=False
+    )
+    __participant_groups: typing.Dict[str, SequenceDiagramParticipantGroup] = field(
+        init=False
+    )
+    __group_titles: typing.Set[str] = field(init=False)
+    __sequence: typing.Union[typing.List[Step], "ColumnarSteps"] = field(init=False)
+    __activations: typing.Dict[SequenceDiagramParticipant, int] = field(init=False)
     __auto_activation_stack: typing.List[
         typing.Union[
             typing.Tuple[SequenceDiagramParticipant, SequenceDiagramParticipant],
             typing.Tuple[None, SequenceDiagramParticipant],
         ]
     ] = field(init=False)
-    __generator: IChartGenerator = field(init=False)
+    # the number of changes applied to the diagram, used to tell if the previously generated text is still valid
+    __revision: int = field(init=False)
     __inside_condition: bool = field(init=False)
+    # the running hash of the steps in the list, see `_structure`
+    __changes: typing.Optional[cache.RunningHash] = field(init=False)
     __default_group: SequenceDiagramParticipantGroup = field(init=False)
 
     def __post_init__(self):
         self.__default_group = SequenceDiagramParticipantGroup(title=None, _color=None)
         self.__participants = {self.__default_group: []}
-        self.__sequence = []
+        self.__participants_by_title = {}
+        self.__participant_groups = {}
+        self.__group_titles = set()
+        if self.columnar:
+            from umlcharter.charts.step_storage import ColumnarSteps
+
+            self.__sequence = ColumnarSteps()
+            # nb: the steps stored column-wise are hashed as they are, it is cheap
+            self.__changes = None
+        else:
+            from umlcharter.charts.step_storage import step_values
+
+            self.__sequence = []
+            self.__changes = cache.RunningHash(step_values)
+        self.__activations = {}
         self.__inside_condition = False
         self.__auto_activation_stack = []
-        self.__generator = self.generator_cls(weakref.proxy(self))
+        self.__revision = 0
+        super().__post_init__()
+
+    def __touch(self):
+        self.__revision += 1
 
     def participant(
         self, title: str, color: typing.Optional[str] = None
     ) -> SequenceDiagramParticipant:
         # NB: every participant must have a unique name
-        all_registered_participant_titles = [
-            _.title for _ in chain.from_iterable(self.__participants.values())
-        ]
-        if title in all_registered_participant_titles:
+        if title in self.__participants_by_title:
             raise ChartingException(
                 f"Sequence diagram already contains participant {title}. "
                 f"All participants must have unique titles."
@@ -245,12 +313,27 @@ class SequenceDiagram(BaseChart):
         participant = SequenceDiagramParticipant(
             title=title, _sequence_ref=weakref.proxy(self), _color=color
         )
+        participant._id = len(self.__participants_by_title)
         # add the participant to the default group
         if self.__default_group not in self.__participants:
             self.__participants[self.__default_group] = []
         self.__participants[self.__default_group].append(participant)
+        self.__participants_by_title[title] = participant
+        self.__participant_groups[title] = self.__default_group
+        self.__touch()
         return participant
 
+    def get_participant(self, title: str) -> SequenceDiagramParticipant:
+        """
+        Look up the already registered participant by its title
+        """
+        try:
+            return self.__participants_by_title[title]
+        except KeyError:
+            raise ChartingException(
+                f"Sequence diagram does not contain participant {title}."
+            )
+
     def group_participants(
         self,
         title: str,
@@ -263,33 +346,177 @@ class SequenceDiagram(BaseChart):
         NB 1: the name of this new group must be unique.
         NB 2: every participant can participate in one group only
         """
-        all_registered_groups = [_.title for _ in self.__participants]
-        if not title or title in all_registered_groups:
+        if not title or title in self.__group_titles:
             raise ChartingException(
                 "The given name of the named group of joint participants "
                 "must be unique and not empty."
             )
 
         for participant in participants:
-            if participant not in self.__participants.get(self.__default_group, []):
+            if (
+                self.__participants_by_title.get(participant.title) is not participant
+                or self.__participant_groups[participant.title]
+                is not self.__default_group
+            ):
                 raise ChartingException(
                     f"The participant {participant.title} does not belong to the default group "
                     "and therefor cannot be moved to the named one."
                 )
 
+        group = SequenceDiagramParticipantGroup(title=title, _color=color)
+        for participant in participants:
+            self.__participant_groups[participant.title] = group
+
         # remove the mentioned participants from the default group and put them to the new one
         self.__participants[self.__default_group] = [
             participant
             for participant in self.__participants.get(self.__default_group, [])
-            if participant not in participants
+            if self.__participant_groups[participant.title] is self.__default_group
         ]
         # there must be no empty groups
         if not self.__participants.get(self.__default_group):
             self.__participants.pop(self.__default_group, None)
 
-        self.__participants[
-            SequenceDiagramParticipantGroup(title=title, _color=color)
-        ] = list(participants)
+        self.__participants[group] = list(participants)
+        self.__group_titles.add(title)
+        self.__touch()
+
+    @classmethod
+    def from_events(
+        cls,
+        title: str,
+        generator_cls: typing.Type[IChartGenerator],
+        events: typing.Iterable[Event],
+        auto_activation: bool = True,
+        columnar: bool = False,
+    ) -> "SequenceDiagram":
+        """
+        Build the diagram from the events (see `extend`), e.g. streamed straight from the log of the traces
+        """
+        sd = cls(
+            title, generator_cls, auto_activation=auto_activation, columnar=columnar
+        )
+        sd.extend(events)
+        return sd
+
+    def __event_participant(
+        self,
+        kind: str,
+        participant: typing.Union[SequenceDiagramParticipant, str, None],
+    ) -> SequenceDiagramParticipant:
+        if participant is None:
+            raise ChartingException(f"The event '{kind}' requires the participant.")
+        if isinstance(participant, SequenceDiagramParticipant):
+            if self.__participants_by_title.get(participant.title) is not participant:
+                raise ChartingException(
+                    f"The participant {participant.title} does not belong to the diagram."
+                )
+            return participant
+        return self.__participants_by_title.get(participant) or self.participant(
+            participant
+        )
+
+    def extend(self, events: typing.Iterable[Event]) -> None:
+        """
+        Add the steps described by the events `(kind, from participant, to participant, text, color)` in bulk,
+        checked and auto-activated exactly the same way as if they were added one by one.
+        The events are consumed lazily, so they can be streamed from the generator without building the list.
+
+        The participants are referred to by the objects or by their titles,
+        the participants with the unknown titles are registered on the fly.
+        The missing texts of the events are the empty ones.
+        The kinds of the events:
+
+        - "forward", "return": the interaction from one participant to another one with the text,
+        - "activate", "deactivate": the explicit (de)activation of the "from" participant,
+        - "note": the note with the text,
+        - "loop", "group", "condition", "case": the start of the block with the text (if the block has any),
+        - "end_loop", "end_group", "end_condition", "end_case": the end of the block.
+
+        Every block opened by the events must be closed by the same events, the last opened block first.
+        """
+        participant = self.__event_participant
+        add_step = self.__add_step
+        track_block = self.__track_block
+        # the kinds of the blocks opened by the events and not closed yet, the last opened one on the top
+        open_blocks: typing.List[str] = []
+        for kind, from_, to_, text, color in events:
+            if kind == "forward" or kind == "return":
+                from_participant = participant(kind, from_)
+                to_participant = participant(kind, to_)
+                from_participant._SequenceDiagramParticipant__check_if_interaction_is_possible(  # noqa
+                    to_participant
+                )
+                add_step(
+                    (ForwardStep if kind == "forward" else ReturnStep)(
+                        text or "",
+                        from_participant=from_participant,
+                        to_participant=to_participant,
+                    )
+                )
+            elif kind == "note":
+                add_step(NoteStep(text=text or "", _color=color))
+            elif kind == "activate" or kind == "deactivate":
+                add_step(
+                    ParticipantActivationControl(
+                        is_active=kind == "activate",
+                        participant=participant(kind, from_),
+                        _color=color,
+                    )
+                )
+            elif kind == "loop" or kind == "end_loop":
+                is_active = track_block(open_blocks, kind)
+                add_step(
+                    LoopControl(
+                        is_active=is_active,
+                        # nb: the ends of the blocks carry no text, exactly as the ones added one by one
+                        how_many_iterations=(text or "") if is_active else None,
+                        _color=color,
+                    )
+                )
+            elif kind == "group" or kind == "end_group":
+                is_active = track_block(open_blocks, kind)
+                add_step(
+                    GroupControl(
+                        is_active=is_active,
+                        text=(text or "") if is_active else None,
+                        _color=color,
+                    )
+                )
+            elif kind == "case" or kind == "end_case":
+                is_active = track_block(open_blocks, kind)
+                add_step(
+                    CaseControl(
+                        is_active=is_active,
+                        text=(text or "") if is_active else None,
+                        _color=color,
+                    )
+                )
+            elif kind == "condition" or kind == "end_condition":
+                is_active = track_block(open_blocks, kind)
+                add_step(ConditionControl(is_active=is_active, _color=color))
+                self.__inside_condition = is_active
+            else:
+                raise ChartingException(f"Unknown kind of the event '{kind}'.")
+        if open_blocks:
+            raise ChartingException(
+                f"The block '{open_blocks[-1]}' is not closed by the end of the events."
+            )
+
+    @staticmethod
+    def __track_block(open_blocks: typing.List[str], kind: str) -> bool:
+        """Open the block of the event or close the last opened one; True if the block is opened"""
+        if not kind.startswith("end_"):
+            open_blocks.append(kind)
+            return True
+        if not open_blocks:
+            raise ChartingException(f"The event '{kind}' closes no opened block.")
+        if open_blocks[-1] != kind[4:]:
+            raise ChartingException(
+                f"The event '{kind}' does not close the last opened block '{open_blocks[-1]}'."
+            )
+        open_blocks.pop()
+        return False
 
     def note(self, text: str, color: typing.Optional[str] = None) -> None:
         """
@@ -363,16 +590,38 @@ class SequenceDiagram(BaseChart):
         yield
         self.__add_step(CaseControl(is_active=False, _color=color))
 
-    def __active_participants(self) -> typing.List[SequenceDiagramParticipant]:
+    @property
+    def active_participants(self) -> typing.Tuple[SequenceDiagramParticipant, ...]:
         """
+        The participants being active at the current point of the sequence.
+
         If the number of activation `ParticipantActivationControl` associated with the registered participant
         is above of the number of deactivation ones, then the participant is active
         """
-        c = Counter()
-        for step in self.__sequence:
-            if isinstance(step, ParticipantActivationControl):
-                c[step.participant] += 1 if step.is_active else -1
-        return list(+c)
+        return tuple(
+            participant
+            for participant, activations in self.__activations.items()
+            if activations > 0
+        )
+
+    def __append(self, step: Step):
+        """
+        Put the step to the sequence, keeping track of the activations of the participants along the way
+        """
+        if isinstance(step, ParticipantActivationControl):
+            activations = self.__activations.get(step.participant, 0) + (
+                1 if step.is_active else -1
+            )
+            # nb: the balance is kept signed, so the participant deactivated before being activated
+            #  is not active after the following activation either
+            if activations:
+                self.__activations[step.participant] = activations
+            else:
+                self.__activations.pop(step.participant, None)
+        self.__sequence.append(step)
+        if self.__changes is not None:
+            self.__changes.add(step)
+        self.__touch()
 
     def __add_step(self, step: Step):
         if self.__inside_condition:
@@ -406,17 +655,17 @@ class SequenceDiagram(BaseChart):
                     # self and deactivate self right after the call.
                     # Also, for simplicity of auto-activation interpretation, the participant must not be activated if
                     # it is already activated
-                    if step.to_participant in self.__active_participants():
-                        self.__sequence.append(step)
+                    if self.__activations.get(step.to_participant, 0) > 0:
+                        self.__append(step)
                     else:
                         with step.to_participant.activate():
-                            self.__sequence.append(step)
+                            self.__append(step)
                     return
 
                 if not self.__auto_activation_stack:
                     # If stack is empty, the very first participant starting the flow must be activated as well.
                     self.__auto_activation_stack.append((None, step.from_participant))
-                    self.__sequence.append(
+                    self.__append(
                         ParticipantActivationControl(
                             is_active=True,
                             participant=step.from_participant,
@@ -424,7 +673,7 @@ class SequenceDiagram(BaseChart):
                         )
                     )
 
-                self.__sequence.append(step)
+                self.__append(step)
 
                 if (
                     self.__auto_activation_stack
@@ -435,14 +684,14 @@ class SequenceDiagram(BaseChart):
                     self.__auto_activation_stack.append(
                         (step.from_participant, step.to_participant)
                     )
-                    self.__sequence.append(
+                    self.__append(
                         ParticipantActivationControl(
                             is_active=True, participant=step.to_participant, _color=None
                         )
                     )
 
             elif isinstance(step, ReturnStep):
-                self.__sequence.append(step)
+                self.__append(step)
 
                 if (
                     self.__auto_activation_stack
@@ -453,7 +702,7 @@ class SequenceDiagram(BaseChart):
                     # that previously has passed the control to us -
                     # deactivate the current participant.
                     self.__auto_activation_stack.pop()
-                    self.__sequence.append(
+                    self.__append(
                         ParticipantActivationControl(
                             is_active=False,
                             participant=step.from_participant,
@@ -465,7 +714,7 @@ class SequenceDiagram(BaseChart):
                     # If we have returned back to the very first participant
                     # that has started the stack of the calls, then also deactivate it.
                     self.__auto_activation_stack.pop()
-                    self.__sequence.append(
+                    self.__append(
                         ParticipantActivationControl(
                             is_active=False,
                             participant=step.to_participant,
@@ -473,15 +722,184 @@ class SequenceDiagram(BaseChart):
                         )
                     )
             else:
-                self.__sequence.append(step)
+                self.__append(step)
+        else:
+            self.__append(step)
+
+    def to_ir(self) -> SequenceDiagramIR:
+        """
+        Normalized representation of the diagram shared by all the generators
+        """
+        groups = list(self.__participants.items())
+        aliases = [
+            f"p{index + 1}" for index in range(len(self.__participants_by_title))
+        ]
+        return SequenceDiagramIR(
+            title=self.title, groups=groups, aliases=aliases, steps=self.__sequence
+        )
+
+    def pack(self) -> tuple:
+        """
+        Compact representation of the diagram made of the plain values only, without any back-references,
+        so it can be pickled and sent to another process. The participants are referenced by their indexes
+        (and keep their ids, see `SequenceDiagramParticipant`) and the steps are stored column-wise (see `ColumnarSteps`). Restored by `unpack`.
+        """
+        from umlcharter.charts.step_storage import ColumnarSteps
+
+        groups, participants, auto_activation_stack, indexes = self.__plain_values()
+        steps = self.__sequence
+        if not isinstance(steps, ColumnarSteps):
+            steps = ColumnarSteps()
+            steps.extend(self.__sequence)
+
+        return (
+            self.title,
+            self.generator_cls,
+            self.auto_activation,
+            self.columnar,
+            groups,
+            participants,
+            tuple(column.tobytes() for column in steps.columns()),
+            tuple(indexes[id(participant)] for participant in steps.participants),
+            tuple(steps.strings),
+            auto_activation_stack,
+            self.__inside_condition,
+        )
+
+    def __plain_values(
+        self,
+    ) -> typing.Tuple[tuple, tuple, tuple, typing.Dict[int, int]]:
+        """
+        The groups, the participants and the stack of the auto-activated participants as the plain values
+        (see `pack`), with the indexes of the participants they refer to
+        """
+        from umlcharter.charts.step_storage import NOTHING
+
+        groups = list(self.__participants.items())
+        participants = [
+            participant
+            for _, group_participants in groups
+            for participant in group_participants
+        ]
+        indexes = {
+            id(participant): index for index, participant in enumerate(participants)
+        }
+        return (
+            tuple((group.title, group._color) for group, _ in groups),
+            tuple(
+                (
+                    participant.title,
+                    participant.type_,
+                    participant._color,
+                    group_index,
+                    participant._id,
+                )
+                for group_index, (_, group_participants) in enumerate(groups)
+                for participant in group_participants
+            ),
+            tuple(
+                (
+                    NOTHING if caller is None else indexes[id(caller)],
+                    indexes[id(callee)],
+                )
+                for caller, callee in self.__auto_activation_stack
+            ),
+            indexes,
+        )
+
+    def _structure(self) -> typing.Tuple[cache.RunningHash, tuple]:
+        """
+        The running hash of the steps and the plain values of everything else defining the diagram,
+        see `cache.structural_hash`
+        """
+        changes = self.__changes
+        if changes is None:
+            changes = cache.RunningHash()
+            changes.feed(self.__sequence.plain_values())
+        groups, participants, auto_activation_stack, _ = self.__plain_values()
+        return changes, (
+            self.title,
+            self.auto_activation,
+            self.columnar,
+            groups,
+            participants,
+            auto_activation_stack,
+            self.__inside_condition,
+        )
+
+    @classmethod
+    def unpack(cls, packed: tuple) -> "SequenceDiagram":
+        """
+        Restore the diagram from its compact representation built by `pack`
+        """
+        from umlcharter.charts.step_storage import ColumnarSteps, NOTHING
+
+        (
+            title,
+            generator_cls,
+            auto_activation,
+            columnar,
+            groups,
+            participants,
+            columns,
+            step_participants,
+            strings,
+            auto_activation_stack,
+            inside_condition,
+        ) = packed
+        sd = cls(
+            title, generator_cls, auto_activation=auto_activation, columnar=columnar
+        )
+
+        sd.__participants = {}
+        restored_groups = []
+        for group_title, color in groups:
+            if group_title is None:
+                group = sd.__default_group
+            else:
+                group = SequenceDiagramParticipantGroup(title=group_title, _color=color)
+                sd.__group_titles.add(group_title)
+            sd.__participants[group] = []
+            restored_groups.append(group)
+
+        restored = []
+        for (
+            participant_title,
+            type_,
+            color,
+            group_index,
+            participant_id,
+        ) in participants:
+            participant = SequenceDiagramParticipant(
+                title=participant_title, _sequence_ref=weakref.proxy(sd), _color=color
+            )
+            participant.type_ = type_
+            participant._id = participant_id
+            group = restored_groups[group_index]
+            sd.__participants[group].append(participant)
+            sd.__participants_by_title[participant_title] = participant
+            sd.__participant_groups[participant_title] = group
+            restored.append(participant)
+
+        steps = ColumnarSteps.from_columns(
+            columns, [restored[index] for index in step_participants], strings
+        )
+        if columnar:
+            sd.__sequence = steps
         else:
-            self.__sequence.append(step)
+            sd.__sequence = list(steps)
+            sd.__changes.feed(steps.plain_values())
+        sd.__activations = steps.activations()
 
-    def generate(self) -> str:
-        return self.__generator.generate_sequence_diagram()
+        sd.__auto_activation_stack = [
+            (None if caller == NOTHING else restored[caller], restored[callee])
+            for caller, callee in auto_activation_stack
+        ]
+        sd.__inside_condition = inside_condition
+        return sd
+
+    def _revision_key(self) -> typing.Hashable:
+        return self.__revision, self.title
 
     def __repr__(self):
         return f"'{self.title}', {self.generator_cls.__name__}"  # pragma: nocover
-
-    def __str__(self):
-        return self.generate()
@@ -0,0 +1,301 @@
+import typing
+from array import array
+
+from umlcharter.charts.sequence_diagram import (
+    Step,
+    LoopControl,
+    GroupControl,
+    CaseControl,
+    ConditionControl,
+    ParticipantActivationControl,
+    ForwardStep,
+    ReturnStep,
+    NoteStep,
+    SequenceDiagramParticipant,
+)
+
+# NB: the codes are the part of the serialized representation of the diagrams, never change the existing ones
+STEP_KINDS: typing.Tuple[typing.Type[Step], ...] = (
+    ForwardStep,
+    ReturnStep,
+    NoteStep,
+    ParticipantActivationControl,
+    LoopControl,
+    GroupControl,
+    CaseControl,
+    ConditionControl,
+)
+STEP_KIND_CODES: typing.Dict[typing.Type[Step], int] = {
+    kind: code for code, kind in enumerate(STEP_KINDS)
+}
+
+# the activity flag, the participants the step goes from and to, the text and the color of the step
+_Encoded = typing.Tuple[
+    bool,
+    typing.Optional[SequenceDiagramParticipant],
+    typing.Optional[SequenceDiagramParticipant],
+    typing.Optional[str],
+    typing.Optional[str],
+]
+
+
+def _encode_call(step: typing.Union[ForwardStep, ReturnStep]) -> _Encoded:
+    return False, step.from_participant, step.to_participant, step.text, None
+
+
+def _encode_text(step: typing.Union[GroupControl, CaseControl]) -> _Encoded:
+    return step.is_active, None, None, step.text, step._color
+
+
+# the function picking the values of the columns from the step of every kind
+_STEP_ENCODERS: typing.Dict[
+    typing.Type[Step], typing.Callable[[typing.Any], _Encoded]
+] = {
+    ForwardStep: _encode_call,
+    ReturnStep: _encode_call,
+    NoteStep: lambda step: (False, None, None, step.text, step._color),
+    ParticipantActivationControl: lambda step: (
+        step.is_active,
+        step.participant,
+        None,
+        None,
+        step._color,
+    ),
+    LoopControl: lambda step: (
+        step.is_active,
+        None,
+        None,
+        step.how_many_iterations,
+        step._color,
+    ),
+    GroupControl: _encode_text,
+    CaseControl: _encode_text,
+    ConditionControl: lambda step: (step.is_active, None, None, None, step._color),
+}
+# the same together with the code of the kind of the step, shifted to leave the room for the activity flag
+_ENCODERS = {
+    kind: (STEP_KIND_CODES[kind] << 1, encode)
+    for kind, encode in _STEP_ENCODERS.items()
+}
+
+
+def step_values(step: Step) -> tuple:
+    """
+    The plain values of the step: the code of its kind together with the activity flag,
+    the ids of the participants it goes from and to, its text and color
+    """
+    kind, encode = _ENCODERS[type(step)]
+    is_active, from_participant, to_participant, text, color = encode(step)
+    return (
+        kind | is_active,
+        NOTHING if from_participant is None else from_participant._id,
+        NOTHING if to_participant is None else to_participant._id,
+        text,
+        color,
+    )
+
+
+_COLUMNS = ("kinds", "from_participants", "to_participants", "texts", "colors")
+
+NOTHING = -1  # the index used when there is no participant, text or color for the step
+
+
+class ColumnarSteps(typing.Sequence[Step]):
+    """
+    The sequence of the steps stored column-wise in the compact arrays instead of the list of the step objects:
+
+    - the code of the kind of the step (see `STEP_KINDS`) together with the activity flag of the controls,
+    - the index of the participant the step goes from (or the participant being (de)activated),
+    - the index of the participant the step goes to,
+    - the index of the text of the step in the table of the interned strings,
+    - the index of the color of the step in the same table.
+
+    Every step takes ~17 bytes this way, the step objects are created on the fly only when they are accessed,
+    so even the multi-million step traces can be kept in memory.
+    """
+
+    def __init__(self):
+        self.kinds = array("B")
+        self.from_participants = array("i")
+        self.to_participants = array("i")
+        self.texts = array("i")
+        self.colors = array("i")
+        self.participants: typing.List[SequenceDiagramParticipant] = []
+        self.strings: typing.List[str] = []
+        self.__participant_indexes: typing.Dict[int, int] = {}
+        self.__string_indexes: typing.Dict[str, int] = {}
+        self.__mapped = False
+
+    @classmethod
+    def from_columns(
+        cls,
+        columns: typing.Iterable[typing.Union[bytes, memoryview]],
+        participants: typing.Iterable[SequenceDiagramParticipant],
+        strings: typing.Iterable[str],
+    ) -> "ColumnarSteps":
+        """
+        Restore the steps from the raw content of the columns (see `columns`) and the tables they refer to.
+
+        The memory views (e.g. of the memory-mapped file) are used as the columns as is, without copying,
+        the content is copied to memory only on the first change of the steps.
+        """
+        steps = cls()
+        for name, column, raw in zip(_COLUMNS, steps.columns(), columns):
+            if isinstance(raw, memoryview):
+                setattr(steps, name, raw.cast(column.typecode))
+                steps.__mapped = True
+            else:
+                column.frombytes(raw)
+        for participant in participants:
+            steps.__participant_index(participant)
+        for string in strings:
+            steps.__string_index(string)
+        return steps
+
+    def columns(self) -> typing.Tuple[typing.Union[array, memoryview], ...]:
+        return (
+            self.kinds,
+            self.from_participants,
+            self.to_participants,
+            self.texts,
+            self.colors,
+        )
+
+    def plain_values(self) -> tuple:
+        """The content of the columns with the ids of the participants and the strings they refer to"""
+        return (
+            tuple(column.tobytes() for column in self.columns()),
+            tuple(participant._id for participant in self.participants),
+            tuple(self.strings),
+        )
+
+    def __participant_index(
+        self, participant: typing.Optional[SequenceDiagramParticipant]
+    ) -> int:
+        if participant is None:
+            return NOTHING
+        try:
+            return self.__participant_indexes[id(participant)]
+        except KeyError:
+            self.participants.append(participant)
+            return self.__participant_indexes.setdefault(
+                id(participant), len(self.participants) - 1
+            )
+
+    def __string_index(self, string: typing.Optional[str]) -> int:
+        if string is None:
+            return NOTHING
+        try:
+            return self.__string_indexes[string]
+        except KeyError:
+            self.strings.append(string)
+            return self.__string_indexes.setdefault(string, len(self.strings) - 1)
+
+    def activations(self) -> typing.Dict[SequenceDiagramParticipant, int]:
+        """
+        The balance of the activations and the deactivations of every participant (the participants with
+        the positive one are active), counted straight from the columns without creating the step objects
+        """
+        activation = STEP_KIND_CODES[ParticipantActivationControl]
+        counts: typing.Dict[int, int] = {}
+        for kind, index in zip(self.kinds, self.from_participants):
+            if kind >> 1 == activation:
+                count = counts.get(index, 0) + (1 if kind & 1 else -1)
+                if count:
+                    counts[index] = count
+                else:
+                    counts.pop(index, None)
+        return {self.participants[index]: count for index, count in counts.items()}
+
+    def append(self, step: Step) -> None:
+        self.extend((step,))
+
+    def extend(self, steps: typing.Iterable[Step]) -> None:
+        if self.__mapped:
+            for name, column in zip(_COLUMNS, self.columns()):
+                copied = array(column.format)
+                copied.frombytes(column.cast("B"))
+                setattr(self, name, copied)
+            self.__mapped = False
+
+        # nb: bound once, there can be millions of the steps
+        encoders = _ENCODERS
+        participant_index = self.__participant_index
+        string_index = self.__string_index
+        add_kind = self.kinds.append
+        add_from_participant = self.from_participants.append
+        add_to_participant = self.to_participants.append
+        add_text = self.texts.append
+        add_color = self.colors.append
+        for step in steps:
+            kind, encode = encoders[type(step)]
+            is_active, from_participant, to_participant, text, color = encode(step)
+            add_kind(kind | is_active)
+            add_from_participant(participant_index(from_participant))
+            add_to_participant(participant_index(to_participant))
+            add_text(string_index(text))
+            add_color(string_index(color))
+
+    def __make_step(
+        self,
+        kind: int,
+        from_index: int,
+        to_index: int,
+        text_index: int,
+        color_index: int,
+    ) -> Step:
+        step_cls = STEP_KINDS[kind >> 1]
+        text = self.strings[text_index] if text_index != NOTHING else None
+        color = self.strings[color_index] if color_index != NOTHING else None
+        if step_cls is ForwardStep or step_cls is ReturnStep:
+            return step_cls(
+                text,
+                from_participant=self.participants[from_index],
+                to_participant=self.participants[to_index],
+            )
+        if step_cls is NoteStep:
+            return NoteStep(text=text, _color=color)
+        if step_cls is ParticipantActivationControl:
+            return ParticipantActivationControl(
+                is_active=bool(kind & 1),
+                participant=self.participants[from_index],
+                _color=color,
+            )
+        if step_cls is LoopControl:
+            return LoopControl(
+                is_active=bool(kind & 1), how_many_iterations=text, _color=color
+            )
+        if step_cls is ConditionControl:
+            return ConditionControl(is_active=bool(kind & 1), _color=color)
+        return step_cls(is_active=bool(kind & 1), text=text, _color=color)
+
+    def __len__(self) -> int:
+        return len(self.kinds)
+
+    @typing.overload
+    def __getitem__(self, index: int) -> Step: ...  # pragma: nocover
+
+    @typing.overload
+    def __getitem__(self, index: slice) -> typing.List[Step]: ...  # pragma: nocover
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[_] for _ in range(*index.indices(len(self)))]
+        return self.__make_step(
+            self.kinds[index],
+            self.from_participants[index],
+            self.to_participants[index],
+            self.texts[index],
+            self.colors[index],
+        )
+
+    def __iter__(self) -> typing.Iterator[Step]:
+        make_step = self.__make_step
+        for columns in zip(
+            self.kinds,
+            self.from_participants,
+            self.to_participants,
+            self.texts,
+            self.colors,
+        ):
+            yield make_step(*columns)
@@ -0,0 +1,265 @@
+"""
+The command-line renderer of the diagrams.
+
+    umlcharter diagrams.py flows.umlc [-g mermaid -g plantuml] [-o docs/diagrams] [-j 4] [--watch]
+
+Every source is either a Python module, and then every diagram assigned to a public name on the top level of it
+is rendered, or a diagram saved by `save()`. The diagrams are rendered with their own generators,
+or with the given ones (if the generator does not support the kind of the diagram, it is skipped).
+
+The outputs are named `<module>.<name><extension>` / `<file><extension>` and placed next to the sources,
+or to the given directory. The outputs whose content has not changed are not rewritten, so the tools building
+the documentation out of them do not see them as changed either.
+
+In the watch mode, the sources are polled for the changes, and only the diagrams of the changed sources
+are rendered again.
+"""
+
+import argparse
+import hashlib
+import runpy
+import sys
+import time
+import typing
+from pathlib import Path
+
+from umlcharter.charts import binary
+from umlcharter.charts.graph_diagram import GraphDiagram
+from umlcharter.charts.sequence_diagram import SequenceDiagram
+from umlcharter.generators.base import IChartGenerator
+from umlcharter.generators.d2.d2 import D2
+from umlcharter.generators.graphviz.graphviz import Graphviz
+from umlcharter.generators.mermaid.mermaid import Mermaid
+from umlcharter.generators.plantuml.plantuml import PlantUML
+from umlcharter.generators.sequencediagramorg.sequencediagramorg import (
+    SequenceDiagramOrg,
+)
+from umlcharter.rendering import Diagram, render_many
+
+GENERATORS: typing.Dict[str, typing.Type[IChartGenerator]] = {
+    "mermaid": Mermaid,
+    "plantuml": PlantUML,
+    "d2": D2,
+    "sequencediagramorg": SequenceDiagramOrg,
+    "graphviz": Graphviz,
+}
+
+EXTENSIONS: typing.Dict[typing.Type[IChartGenerator], str] = {
+    Mermaid: ".mmd",
+    PlantUML: ".puml",
+    D2: ".d2",
+    SequenceDiagramOrg: ".txt",
+    Graphviz: ".dot",
+}
+
+SUPPORTED: typing.Dict[type, typing.Tuple[typing.Type[IChartGenerator], ...]] = {
+    SequenceDiagram: (Mermaid, PlantUML, D2, SequenceDiagramOrg),
+    GraphDiagram: (Mermaid, PlantUML, Graphviz),
+}
+
+
+def load_diagrams(source: Path) -> typing.Dict[str, Diagram]:
+    """The diagrams of the source, by the names of their outputs without the extensions"""
+    if source.suffix != ".py":
+        return {source.stem: binary.load(source, mapped=False)}
+
+    # NB: the module runs under its own name, so its `if __name__ == "__main__"` block is not executed
+    namespace = runpy.run_path(str(source), run_name=f"umlcharter_{source.stem}")
+    return {
+        f"{source.stem}.{name}": value
+        for name, value in namespace.items()
+        if isinstance(value, (SequenceDiagram, GraphDiagram))
+        and not name.startswith("_")
+    }
+
+
+def write(path: Path, text: str, digests: typing.Dict[Path, bytes]) -> bool:
+    """
+    Write the text to the file, unless the file already has the same content.
+
+    :digests: The content hashes of the files known so far, updated in place;
+        the file is read to hash it only if it is not known yet
+    :return: If the file has been written
+    """
+    encoded = text.encode()
+    digest = hashlib.sha256(encoded).digest()
+    if path not in digests and path.is_file():
+        digests[path] = hashlib.sha256(path.read_bytes()).digest()
+    if digests.get(path) == digest:
+        return False
+
+    path.write_bytes(encoded)
+    digests[path] = digest
+    return True
+
+
+def render(
+    sources: typing.Iterable[Path],
+    generators: typing.Sequence[typing.Type[IChartGenerator]],
+    output: typing.Optional[Path],
+    workers: typing.Optional[int],
+    digests: typing.Dict[Path, bytes],
+) -> typing.Tuple[int, int]:
+    """
+    Render all the diagrams of the sources and write the outputs.
+
+    :return: The number of the written outputs and the number of the outputs left as they are
+    """
+    # the diagrams are rendered in the worker processes in batches, one batch per the set of the generators
+    batches: typing.Dict[
+        typing.Tuple[typing.Type[IChartGenerator], ...],
+        typing.List[typing.Tuple[Path, Diagram]],
+    ] = {}
+    for source in sources:
+        for name, diagram in load_diagrams(source).items():
+            if generators:
+                generator_classes = tuple(
+                    generator_cls
+                    for generator_cls in generators
+                    if generator_cls in SUPPORTED[type(diagram)]
+                )
+            else:
+                generator_classes = (diagram.generator_cls,)
+            if generator_classes:
+                target = (output or source.parent) / name
+                batches.setdefault(generator_classes, []).append((target, diagram))
+
+    written = unchanged = 0
+    for generator_classes, batch in batches.items():
+        generated = render_many(
+            (diagram for _, diagram in batch),
+            generator_classes,
+            # nb: spawning the workers costs more than rendering the single diagram
+            workers=1 if len(batch) == 1 else workers,
+        )
+        # the outputs are written as soon as they are rendered, while the workers are rendering the rest
+        for (target, _), texts in zip(batch, generated):
+            for generator_cls, text in texts.items():
+                path = target.with_name(
+                    target.name
+                    + EXTENSIONS.get(
+                        generator_cls, f".{generator_cls.__name__.lower()}"
+                    )
+                )
+                if write(path, text, digests):
+                    print(f"Written {path}")
+                    written += 1
+                else:
+                    unchanged += 1
+    return written, unchanged
+
+
+def watch(
+    sources: typing.Sequence[Path],
+    generators: typing.Sequence[typing.Type[IChartGenerator]],
+    output: typing.Optional[Path],
+    workers: typing.Optional[int],
+    digests: typing.Dict[Path, bytes],
+    interval: float,
+    polls: typing.Optional[int] = None,
+) -> None:
+    """
+    Poll the sources for the changes every `interval` seconds (`polls` times, or forever)
+    and render the diagrams of the changed ones
+    """
+
+    def modified(source: Path) -> int:
+        try:
+            return source.stat().st_mtime_ns
+        except FileNotFoundError:
+            return 0
+
+    known = {source: modified(source) for source in sources}
+    while polls is None or polls > 0:
+        if polls is not None:
+            polls -= 1
+        time.sleep(interval)
+
+        changed = [source for source in sources if modified(source) != known[source]]
+        if not changed:
+            continue
+        known.update((source, modified(source)) for source in changed)
+        try:
+            render(changed, generators, output, workers, digests)
+        except Exception as e:
+            # the source can be broken while it is being edited, keep watching until it is fixed
+            print(
+                f"Failed to render {', '.join(map(str, changed))}: {e}", file=sys.stderr
+            )
+
+
+def main(argv: typing.Optional[typing.Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="umlcharter", description="Render the diagrams into the DSLs."
+    )
+    parser.add_argument(
+        "sources",
+        nargs="+",
+        type=Path,
+        help="the Python modules defining the diagrams, or the files with the saved diagrams",
+    )
+    parser.add_argument(
+        "-g",
+        "--generator",
+        dest="generators",
+        action="append",
+        choices=GENERATORS,
+        default=[],
+        help="the DSL to render the diagrams into, can be given multiple times; "
+        "the generators of the diagrams themselves by default",
+    )
+    parser.add_argument(
+        "-o",
+        "--output",
+        type=Path,
+        help="the directory to write the outputs to; next to the sources by default",
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        help="the number of the worker processes, the number of the CPUs by default",
+    )
+    parser.add_argument(
+        "-w",
+        "--watch",
+        action="store_true",
+        help="keep rendering the diagrams of the sources once they change",
+    )
+    parser.add_argument(
+        "--interval",
+        type=float,
+        default=1.0,
+        help="the interval of polling the sources for the changes in the watch mode, in seconds",
+    )
+    args = parser.parse_args(argv)
+
+    for source in args.sources:
+        if not source.is_file():
+            parser.error(f"the source {source} does not exist")
+    if args.output:
+        args.output.mkdir(parents=True, exist_ok=True)
+    generators = [GENERATORS[name] for name in args.generators]
+
+    digests: typing.Dict[Path, bytes] = {}
+    written, unchanged = render(
+        args.sources, generators, args.output, args.jobs, digests
+    )
+    print(f"{written} written, {unchanged} unchanged")
+    if args.watch:
+        try:
+            watch(
+                args.sources,
+                generators,
+                args.output,
+                args.jobs,
+                digests,
+                args.interval,
+            )
+        except KeyboardInterrupt:
+            pass
+    return 0
+
+
+if __name__ == "__main__":  # pragma: nocover
+    sys.exit(main())
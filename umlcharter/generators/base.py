@@ -1,11 +1,21 @@
+import typing
 from abc import ABC
 
 from umlcharter.charts.common import BaseChart
 
+if typing.TYPE_CHECKING:  # pragma: nocover
+    from umlcharter.charts.ir import GraphDiagramIR, SequenceDiagramIR
+
 
 class IChartGenerator(ABC):
     """
     Abstract parent class for the generators. Defines the interfaces.
+
+    Every method accepts the optional normalized representation of the diagram, so the same representation can be
+    shared by multiple generators. If it is not given, it is built from the referenced diagram.
+
+    The renderers of the sequence diagrams render the steps one by one, the handler of every step is looked up
+    by the class of the step in their `_handlers`.
     """
 
     ref: BaseChart
@@ -13,8 +23,24 @@ class IChartGenerator(ABC):
     def __init__(self, ref: BaseChart):
         self.ref = ref
 
-    def generate_sequence_diagram(self) -> str:
+    def generate_sequence_diagram(
+        self, ir: typing.Optional["SequenceDiagramIR"] = None
+    ) -> str:
+        return "".join(self.iter_generate_sequence_diagram(ir))
+
+    def generate_graph_diagram(
+        self, ir: typing.Optional["GraphDiagramIR"] = None
+    ) -> str:
+        return "".join(self.iter_generate_graph_diagram(ir))
+
+    def iter_generate_sequence_diagram(
+        self, ir: typing.Optional["SequenceDiagramIR"] = None
+    ) -> typing.Iterator[str]:
+        """Generate the sequence diagram chunk by chunk, without holding the whole generated text in memory"""
         raise NotImplementedError  # pragma: nocover
 
-    def generate_graph_diagram(self) -> str:
+    def iter_generate_graph_diagram(
+        self, ir: typing.Optional["GraphDiagramIR"] = None
+    ) -> typing.Iterator[str]:
+        """Generate the graph diagram chunk by chunk, without holding the whole generated text in memory"""
         raise NotImplementedError  # pragma: nocover
@@ -1,12 +1,19 @@
+import typing
+
+from umlcharter.charts.ir import GraphDiagramIR, SequenceDiagramIR
 from umlcharter.generators.base import IChartGenerator
 from umlcharter.generators.d2.sequence_diagram import D2SequenceDiagram
 
 
 class D2(IChartGenerator):
-    def generate_sequence_diagram(self) -> str:
-        return D2SequenceDiagram.generate(self.ref)  # noqa
+    def iter_generate_sequence_diagram(
+        self, ir: typing.Optional[SequenceDiagramIR] = None
+    ) -> typing.Iterator[str]:
+        return D2SequenceDiagram.iter_generate(ir or self.ref.to_ir())  # noqa
 
-    def generate_graph_diagram(self) -> str:
+    def iter_generate_graph_diagram(
+        self, ir: typing.Optional[GraphDiagramIR] = None
+    ) -> typing.Iterator[str]:
         raise NotImplementedError(
             "This generator does not have a graph diagram support"
         )  # pragma: nocover
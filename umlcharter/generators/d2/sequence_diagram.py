@@ -1,9 +1,11 @@
 import typing
 
+from umlcharter import profiling
+from umlcharter.generators import escaping
+from umlcharter.charts.common import Colored
+from umlcharter.charts.ir import SequenceDiagramIR
 from umlcharter.charts.sequence_diagram import (
-    SequenceDiagram,
     SequenceDiagramParticipant,
-    SequenceDiagramParticipantGroup,
     Step,
     ParticipantActivationControl,
     ForwardStep,
@@ -17,143 +19,171 @@ from umlcharter.charts.sequence_diagram import (
 
 
 class D2SequenceDiagram:
-    @staticmethod
-    def _line_break(string: str) -> str:
-        """Some places allow line break as \n"""
-        return string.replace("\n", "\\n") or "''"
+    """
+    D2 has no activation steps, the activations are drawn as the spans instead: while the participant is active,
+    its alias is suffixed with the id of the span, so the steps of the participant are attached to the span.
+    """
+
+    participant_types_map = {
+        "default": "",
+        "actor": "person",
+        "boundary": "",
+        "control": "",
+        "entity": "",
+    }
+
+    _line_break = staticmethod(escaping.d2_line_break)
+    _label = staticmethod(escaping.d2_label)
+    _quoted = staticmethod(escaping.d2_quoted)
 
-    @classmethod
-    def generate(cls, sequence_diagram: SequenceDiagram) -> str:
-        participants: typing.Dict[
-            SequenceDiagramParticipantGroup, typing.List[SequenceDiagramParticipant]
-        ] = sequence_diagram._SequenceDiagram__participants  # noqa
-        sequence: typing.List[Step] = sequence_diagram._SequenceDiagram__sequence  # noqa
-
-        last_targeted_participant: SequenceDiagramParticipant | None = None
-        aliases: typing.Dict[SequenceDiagramParticipant, str] = {}
-        aliases_counter: int = 1
-
-        participant_types_map = {
-            "default": "",
-            "actor": "person",
-            "boundary": "",
-            "control": "",
-            "entity": "",
-        }
-
-        generated = f"title: {cls._line_break(sequence_diagram.title)} {{\nshape: sequence_diagram\n"
-        for _, group_participants in participants.items():
-            for participant in group_participants:
-                # define initial last targeted participant
-                if not last_targeted_participant:
-                    last_targeted_participant = participant
-
-                aliases[participant] = f"p{aliases_counter}"
-                aliases_counter += 1
-
-                generated += (
-                    f"{aliases[participant]}: {cls._line_break(participant.title)} "
-                )
-                if participant.color or participant_types_map[participant.type_]:
-                    generated += "{\n"
-                    if participant.color:
-                        generated += (
-                            f'style: {{fill: "{participant.color.as_hex()}" \n'
-                            f'stroke:"{participant.color.as_hex()}" }}\n'
-                        )
-                    if participant_types_map[participant.type_]:
-                        generated += (
-                            f"shape: {participant_types_map[participant.type_]}\n"
-                        )
-                    generated += "}"
-                generated += "\n"
-
-        # NB! In D2 the logic of "activation" phases or "spans" works a bit differently, compared to the other DSLs.
-        # You have to know that the participant will be activated
-        # BEFORE the flow goes under the new participant control.
-        # To align the activation representation with the other DSLs, we have to
-        # 1. Check if the step is `ForwardStep` to the participant X
-        # 2. If right after the `ForwardStep` participant X is activated -
-        #   swap these `ForwardStep` & `ParticipantActivationControl`
-        new_seq = sequence.copy()
-        len_sequence = len(new_seq)
-        for index, step in enumerate(new_seq):
-            if (
-                isinstance(step, ForwardStep)
-                and (index + 1) < len_sequence
-                and isinstance(new_seq[index + 1], ParticipantActivationControl)
-                and new_seq[index + 1].is_active is True
-                and step.to_participant is new_seq[index + 1].participant
-            ):
-                new_seq[index], new_seq[index + 1] = new_seq[index + 1], new_seq[index]
-
-        activation_counter = 0
-        custom_element_counter = 1
-        for step in new_seq:
-            if isinstance(step, ParticipantActivationControl):
-                if step.is_active:
-                    aliases[step.participant] += f".{activation_counter}"
-                    activation_counter += 1
-                else:
-                    aliases[step.participant] = ".".join(
-                        aliases[step.participant].split(".")[:-1]
-                    )
+    @staticmethod
+    def _activations_before_forward_steps(
+        sequence: typing.Iterable[Step],
+    ) -> typing.Iterator[Step]:
+        """
+        NB! In D2 the logic of "activation" phases or "spans" works a bit differently, compared to the other DSLs.
+        You have to know that the participant will be activated
+        BEFORE the flow goes under the new participant control.
+        To align the activation representation with the other DSLs, we have to
+        1. Check if the step is `ForwardStep` to the participant X
+        2. If right after the `ForwardStep` participant X is activated -
+          swap these `ForwardStep` & `ParticipantActivationControl`
+
+        The `ForwardStep` is held back only until the next step is known, so the sequence is never copied.
+        """
+        pending: typing.Optional[ForwardStep] = None
+        for step in sequence:
+            if pending is not None:
+                if (
+                    isinstance(step, ParticipantActivationControl)
+                    and step.is_active is True
+                    and step.participant is pending.to_participant
+                ):
+                    yield step
+                    continue
+                yield pending
+                pending = None
 
             if isinstance(step, ForwardStep):
-                generated += (
-                    f"{aliases[step.from_participant]} -> "
-                    f"{aliases[step.to_participant]}: {cls._line_break(step.text)}\n"
-                )
-                last_targeted_participant = step.to_participant
-
-            if isinstance(step, ReturnStep):
-                generated += (
-                    f"{aliases[step.from_participant]} -> "
-                    f"{aliases[step.to_participant]}: {cls._line_break(step.text)} {{style.stroke-dash: 3}}\n"
-                )
-                last_targeted_participant = step.to_participant
-
-            if isinstance(step, NoteStep):
-                generated += f'{aliases[last_targeted_participant]}."{cls._line_break(step.text)}"\n'
-
-            if isinstance(step, GroupControl):
-                if step.is_active:
-                    generated += rf"group{custom_element_counter}: \[GROUP\] {cls._line_break(step.text)}: {{"
-                    if step.color:
-                        generated += f'\nstyle: {{\nfill: "{step.color.as_hex()}" \n}}'
-                    generated += "\n"
-                    custom_element_counter += 1
-                else:
-                    generated += "}\n"
-
-            if isinstance(step, LoopControl):
-                if step.is_active:
-                    generated += rf"loop{custom_element_counter}: \[LOOP\] {cls._line_break(step.how_many_iterations)}: {{"
-                    if step.color:
-                        generated += f'\nstyle: {{\nfill: "{step.color.as_hex()}" \n}}'
-                    generated += "\n"
-                    custom_element_counter += 1
-                else:
-                    generated += "}\n"
-
-            if isinstance(step, ConditionControl):
-                if step.is_active:
-                    generated += rf"alt{custom_element_counter}: \[ALT\] {{"
-                    if step.color:
-                        generated += f'\nstyle: {{\nfill: "{step.color.as_hex()}" \n}}'
-                    generated += "\n"
-                    custom_element_counter += 1
-                else:
-                    generated += "}\n"
-
-            if isinstance(step, CaseControl):
-                if step.is_active:
-                    generated += rf"case{custom_element_counter}: \[CASE\] {cls._line_break(step.text)}: {{"
-                    if step.color:
-                        generated += f'\nstyle: {{\nfill: "{step.color.as_hex()}" \n}}'
-                    generated += "\n"
-                    custom_element_counter += 1
-                else:
-                    generated += "}\n"
-
-        return generated + "}\n"
+                pending = step
+            else:
+                yield step
+
+        if pending is not None:
+            yield pending
+
+    def __init__(self, sequence_diagram: SequenceDiagramIR):
+        self.last_targeted_participant: SequenceDiagramParticipant | None = (
+            sequence_diagram.first_participant
+        )
+        # NB: the aliases are changed along the way, reflecting the activations of the participants
+        self.aliases: typing.List[str] = list(sequence_diagram.aliases)
+        self.activation_counter: int = 0
+        self.custom_element_counter: int = 1
+
+    @classmethod
+    def iter_generate(cls, sequence_diagram: SequenceDiagramIR) -> typing.Iterator[str]:
+        renderer = cls(sequence_diagram)
+        aliases = renderer.aliases
+
+        with profiling.phase("header"):
+            yield f"title: {cls._label(sequence_diagram.title)} {{\nshape: sequence_diagram\n"
+            for _, group_participants in sequence_diagram.groups:
+                for participant in group_participants:
+                    yield f"{aliases[participant._id]}: {cls._label(participant.title)} "
+                    shape = cls.participant_types_map[participant.type_]
+                    if participant.color or shape:
+                        yield "{\n"
+                        if participant.color:
+                            yield (
+                                f'style: {{fill: "{participant.color.as_hex()}" \n'
+                                f'stroke:"{participant.color.as_hex()}" }}\n'
+                            )
+                        if shape:
+                            yield f"shape: {shape}\n"
+                        yield "}"
+                    yield "\n"
+
+        handlers = cls._handlers
+        with profiling.phase("steps"):
+            for step in cls._activations_before_forward_steps(sequence_diagram.steps):
+                yield handlers[type(step)](renderer, step)
+
+        yield "}\n"
+
+    def _container(self, label: str, step: Colored) -> str:
+        """The opening of the custom element encompassing the following steps"""
+        generated = label + "{"
+        if step.color:
+            generated += f'\nstyle: {{\nfill: "{step.color.as_hex()}" \n}}'
+        self.custom_element_counter += 1
+        return generated + "\n"
+
+    def _activation(self, step: ParticipantActivationControl) -> str:
+        if step.is_active:
+            self.aliases[step.participant._id] += f".{self.activation_counter}"
+            self.activation_counter += 1
+        else:
+            self.aliases[step.participant._id] = ".".join(
+                self.aliases[step.participant._id].split(".")[:-1]
+            )
+        return ""
+
+    def _forward(self, step: ForwardStep) -> str:
+        self.last_targeted_participant = step.to_participant
+        return (
+            f"{self.aliases[step.from_participant._id]} -> "
+            f"{self.aliases[step.to_participant._id]}: {self._label(step.text)}\n"
+        )
+
+    def _return(self, step: ReturnStep) -> str:
+        self.last_targeted_participant = step.to_participant
+        return (
+            f"{self.aliases[step.from_participant._id]} -> "
+            f"{self.aliases[step.to_participant._id]}: {self._label(step.text)} {{style.stroke-dash: 3}}\n"
+        )
+
+    def _note(self, step: NoteStep) -> str:
+        return f'{self.aliases[self.last_targeted_participant._id]}."{self._quoted(step.text)}"\n'
+
+    def _group(self, step: GroupControl) -> str:
+        if step.is_active:
+            return self._container(
+                rf"group{self.custom_element_counter}: \[GROUP\] {self._line_break(step.text)}: ",
+                step,
+            )
+        return "}\n"
+
+    def _loop(self, step: LoopControl) -> str:
+        if step.is_active:
+            return self._container(
+                rf"loop{self.custom_element_counter}: \[LOOP\] {self._line_break(step.how_many_iterations)}: ",
+                step,
+            )
+        return "}\n"
+
+    def _condition(self, step: ConditionControl) -> str:
+        if step.is_active:
+            return self._container(rf"alt{self.custom_element_counter}: \[ALT\] ", step)
+        return "}\n"
+
+    def _case(self, step: CaseControl) -> str:
+        if step.is_active:
+            return self._container(
+                rf"case{self.custom_element_counter}: \[CASE\] {self._line_break(step.text)}: ",
+                step,
+            )
+        return "}\n"
+
+    _handlers: typing.Dict[
+        typing.Type[Step], typing.Callable[["D2SequenceDiagram", Step], str]
+    ] = {
+        ParticipantActivationControl: _activation,
+        ForwardStep: _forward,
+        ReturnStep: _return,
+        GroupControl: _group,
+        LoopControl: _loop,
+        ConditionControl: _condition,
+        CaseControl: _case,
+        NoteStep: _note,
+    }
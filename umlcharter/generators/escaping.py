@@ -0,0 +1,137 @@
+"""
+The escaping of the texts for every DSL, shared by the generators of the same DSL.
+
+The same texts are repeated over and over in the big diagrams (e.g. the same "200 OK" returned by every call),
+so every transformation is memoized: the repeated text is escaped only once, and then it is just looked up.
+"""
+
+import functools
+
+# the number of the distinct texts remembered by every transformation
+CACHE_SIZE = 2**14
+
+# the characters that make D2 parse the unquoted label as something else (a map, a key, a string)
+_D2_SPECIAL = frozenset('"{}:')
+
+
+def cache_clear() -> None:
+    """Forget all the escaped texts"""
+    for transform in _TRANSFORMS:
+        transform.cache_clear()
+
+
+# Mermaid
+
+
+@functools.lru_cache(maxsize=CACHE_SIZE)
+def mermaid_line_break(string: str) -> str:
+    """Some places allow line break as <br/>"""
+    return string.replace("\n", "<br/>")
+
+
+@functools.lru_cache(maxsize=CACHE_SIZE)
+def mermaid_single_line(string: str) -> str:
+    """Some places do not allow line breaks, replace these with just a plane space"""
+    return string.replace("\n", " ")
+
+
+@functools.lru_cache(maxsize=CACHE_SIZE)
+def mermaid_state_label(string: str) -> str:
+    """
+    The labels of the states and the routes do not allow line breaks, replace these with just a plane space.
+    Also, these places do not allow ':' symbol
+    """
+    return string.replace("\n", " ").replace(":", "")
+
+
+@functools.lru_cache(maxsize=CACHE_SIZE)
+def mermaid_quoted(string: str) -> str:
+    """The text in the double quotes, without line breaks; the quotes in it are replaced by their entity code"""
+    return string.replace("\n", " ").replace('"', "#quot;")
+
+
+# PlantUML
+
+
+@functools.lru_cache(maxsize=CACHE_SIZE)
+def plantuml_line_break(string: str) -> str:
+    """Some places allow line break as \n"""
+    return string.replace("\n", "\\n")
+
+
+@functools.lru_cache(maxsize=CACHE_SIZE)
+def plantuml_quoted(string: str) -> str:
+    """The text in the double quotes; the quotes in it are replaced by their HTML code"""
+    return string.replace("\n", "\\n").replace('"', "&#34;")
+
+
+# D2
+
+
+@functools.lru_cache(maxsize=CACHE_SIZE)
+def d2_label(string: str) -> str:
+    """
+    The label allows line break as \n, the empty one is '' and the one with the special characters is quoted,
+    otherwise e.g. the braces would open the map
+    """
+    if not string:
+        return "''"
+    if _D2_SPECIAL.isdisjoint(string):
+        return string.replace("\n", "\\n")
+    escaped = string.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return f'"{escaped}"'
+
+
+@functools.lru_cache(maxsize=CACHE_SIZE)
+def d2_line_break(string: str) -> str:
+    """Some places allow line break as \n"""
+    return string.replace("\n", "\\n") or "''"
+
+
+@functools.lru_cache(maxsize=CACHE_SIZE)
+def d2_quoted(string: str) -> str:
+    """The text in the double quotes allows line break as \n, the backslashes and the quotes in it are escaped"""
+    return string.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+# SequenceDiagram.org
+
+
+@functools.lru_cache(maxsize=CACHE_SIZE)
+def sequencediagramorg_line_break(string: str) -> str:
+    """Some places allow line break as \n"""
+    return string.replace("\n", "\\n")
+
+
+@functools.lru_cache(maxsize=CACHE_SIZE)
+def sequencediagramorg_single_line(string: str) -> str:
+    """Some places do not allow line breaks, replace these with just a plane space"""
+    return string.replace("\n", " ")
+
+
+# Graphviz
+
+
+@functools.lru_cache(maxsize=CACHE_SIZE)
+def graphviz_quoted(string: str) -> str:
+    """
+    All the texts are in the double quotes, allowing line break as \n; the backslashes and the quotes in them
+    are escaped
+    """
+    return string.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") or "''"
+
+
+_TRANSFORMS = (
+    mermaid_line_break,
+    mermaid_single_line,
+    mermaid_state_label,
+    mermaid_quoted,
+    plantuml_line_break,
+    plantuml_quoted,
+    d2_label,
+    d2_line_break,
+    d2_quoted,
+    sequencediagramorg_line_break,
+    sequencediagramorg_single_line,
+    graphviz_quoted,
+)
@@ -1,80 +1,78 @@
-from umlcharter.charts.graph_diagram import (
-    Node,
-    Start,
-    Finish,
-    Condition,
-    Join,
-    Fork,
-    GraphDiagram,
-)
+import typing
+
+from umlcharter import profiling
+from umlcharter.generators import escaping
+from umlcharter.charts.ir import GraphDiagramIR, GraphNodeKind
 
 
 class MermaidGraphDiagram:
-    @staticmethod
-    def _remove_line_breaks(string: str) -> str:
-        """
-        Some places do not allow line breaks, replace these with just a plane space.
-        Also, these places do not allow ':' symbol
-        """
-        return string.replace("\n", " ").replace(":", "")
+    _remove_line_breaks = staticmethod(escaping.mermaid_state_label)
+    _quoted = staticmethod(escaping.mermaid_quoted)
 
     @classmethod
-    def generate(cls, graph_diagram: GraphDiagram) -> str:
-        aliases = {}
+    def iter_generate(cls, graph_diagram: GraphDiagramIR) -> typing.Iterator[str]:
+        # the aliases of the nodes by their ids, filled in as the nodes are rendered
+        aliases = [""] * graph_diagram.size
+
+        with profiling.phase("header"):
+            yield f"---\ntitle: {cls._remove_line_breaks(graph_diagram.title)}\n---\nstateDiagram-v2\n"
+            if not graph_diagram.is_vertical:
+                # default direction is top -> bottom, specify if it is not default
+                yield "direction LR\n"
+
+        def node_details(node, node_alias: str, depth: int) -> typing.Iterator[str]:
+            ident = " " * (depth * 2)
+            if depth == 0 and node.color:
+                # NB: mermaid does not support styling for the nodes inside composite states ("groups") yet.
+                # So the styling will be applied ONLY to the nodes on the most top level of the graph
+                class_def = f"cd_{node_alias}"
+                yield (
+                    f"{ident}classDef {class_def} fill:{node.color.as_hex()}\n"
+                    f"{ident}class {node_alias} {class_def}\n"
+                )
+            for note in node._notes:
+                yield f"{ident}note right of {node_alias}\n{note}\n{ident}end note\n"
 
-        generated = f"---\ntitle: {cls._remove_line_breaks(graph_diagram.title)}\n---\nstateDiagram-v2\n"
-        if not graph_diagram.is_vertical:
-            # default direction is top -> bottom, specify if it is not default
-            generated += "direction LR\n"
+        with profiling.phase("entries"):
+            for entry in graph_diagram.entries:
+                node = entry.node
+                ident = " " * (entry.depth * 2)
 
-        def recursive_graph_generation(
-            generated_dsl: str, node_to_process: Node, depth: int
-        ) -> str:
-            ident = " " * depth
-            inner_graph = node_to_process._Node__inner_graph  # noqa
-            # iterate once to define the states first...
-            for node, routes in inner_graph.items():
-                if isinstance(node, Start) or isinstance(node, Finish):
-                    aliases[node] = "[*]"
-                else:
-                    node_alias = f"n{len(aliases)}"
-                    aliases[node] = node_alias
-                    if isinstance(node, Condition):
-                        generated_dsl += f"{ident}state {node_alias} <<choice>>\n"
-                    if isinstance(node, Join):
-                        generated_dsl += f"{ident}state {node_alias} <<join>>\n"
-                    if isinstance(node, Fork):
-                        generated_dsl += f"{ident}state {node_alias} <<fork>>\n"
-                    if isinstance(node, Node):
-                        node_text = node.text.replace("\n", " ")
-                        if node.is_group():
-                            generated_dsl += (
-                                f'{ident}state "{node_text}" as {node_alias} '
-                                f'{{\n{recursive_graph_generation("", node, depth + 2)}{ident}}}\n'
-                            )
-                        else:
-                            generated_dsl += (
-                                f'{ident}state "{node_text}" as {node_alias}\n'
-                            )
-                        if node_to_process.is_top_level() and node.color:
-                            # NB: mermaid does not support styling for the nodes inside composite states ("groups") yet.
-                            # So the styling will be applied ONLY to the nodes on the most top level of the graph
-                            class_def = f"cd_{node_alias}"
-                            generated_dsl += (
-                                f"{ident}classDef {class_def} fill:{node.color.as_hex()}\n"
-                                f"{ident}class {node_alias} {class_def}\n"
-                            )
-                    notes: list[str] = getattr(node, "_notes", [])
-                    for note in notes:
-                        generated_dsl += f"{ident}note right of {node_alias}\n{note}\n{ident}end note\n"
+                if entry.kind is GraphNodeKind.LEVEL_END:
+                    # all the states of the level are defined, so define the routes between them...
+                    for from_node, routes in entry.routes.items():
+                        for to_node, route_text in routes:
+                            yield f"{ident}{aliases[from_node._id]} --> {aliases[to_node._id]} : {cls._remove_line_breaks(route_text)}\n"
+                    # ...and close the group, if it is not the most top level of the graph
+                    if entry.depth:
+                        yield f"{' ' * ((entry.depth - 1) * 2)}}}\n"
+                        yield from node_details(
+                            node, aliases[node._id], entry.depth - 1
+                        )
+                    continue
 
-            # ...second run is to define the routes between the nodes
-            for node, routes in inner_graph.items():
-                for route in routes:
-                    to_node, route_text = route
-                    generated_dsl += f"{ident}{aliases[node]} --> {aliases[to_node]} : {cls._remove_line_breaks(route_text)}\n"
+                if entry.kind in (GraphNodeKind.START, GraphNodeKind.FINISH):
+                    aliases[node._id] = "[*]"
+                    continue
 
-            return generated_dsl
+                node_alias = f"n{node._id}"
+                aliases[node._id] = node_alias
+                if entry.kind is GraphNodeKind.CONDITION:
+                    yield f"{ident}state {node_alias} <<choice>>\n"
+                if entry.kind is GraphNodeKind.JOIN:
+                    yield f"{ident}state {node_alias} <<join>>\n"
+                if entry.kind is GraphNodeKind.FORK:
+                    yield f"{ident}state {node_alias} <<fork>>\n"
+                if entry.kind is GraphNodeKind.GROUP:
+                    # the nested states follow, the styling and notes are added once the group is closed
+                    node_text = cls._quoted(node.text)
+                    yield f'{ident}state "{node_text}" as {node_alias} {{\n'
+                    continue
+                if entry.kind is GraphNodeKind.NODE:
+                    node_text = cls._quoted(node.text)
+                    yield f'{ident}state "{node_text}" as {node_alias}\n'
+                    yield from node_details(node, node_alias, entry.depth)
+                    continue
 
-        base_node: Node = graph_diagram._GraphDiagram__base_node  # noqa
-        return recursive_graph_generation(generated, base_node, 0)
+                for note in node._notes:
+                    yield f"{ident}note right of {node_alias}\n{note}\n{ident}end note\n"
@@ -1,11 +1,18 @@
+import typing
+
+from umlcharter.charts.ir import GraphDiagramIR, SequenceDiagramIR
 from umlcharter.generators.base import IChartGenerator
 from umlcharter.generators.mermaid.sequence_diagram import MermaidSequenceDiagram
 from umlcharter.generators.mermaid.graph_diagram import MermaidGraphDiagram
 
 
 class Mermaid(IChartGenerator):
-    def generate_sequence_diagram(self) -> str:
-        return MermaidSequenceDiagram.generate(self.ref)  # noqa
+    def iter_generate_sequence_diagram(
+        self, ir: typing.Optional[SequenceDiagramIR] = None
+    ) -> typing.Iterator[str]:
+        return MermaidSequenceDiagram.iter_generate(ir or self.ref.to_ir())  # noqa
 
-    def generate_graph_diagram(self) -> str:
-        return MermaidGraphDiagram.generate(self.ref)  # noqa
+    def iter_generate_graph_diagram(
+        self, ir: typing.Optional[GraphDiagramIR] = None
+    ) -> typing.Iterator[str]:
+        return MermaidGraphDiagram.iter_generate(ir or self.ref.to_ir())  # noqa
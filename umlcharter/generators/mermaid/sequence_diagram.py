@@ -1,9 +1,10 @@
 import typing
 
+from umlcharter import profiling
+from umlcharter.generators import escaping
+from umlcharter.charts.ir import SequenceDiagramIR
 from umlcharter.charts.sequence_diagram import (
-    SequenceDiagram,
     SequenceDiagramParticipant,
-    SequenceDiagramParticipantGroup,
     Step,
     ParticipantActivationControl,
     ForwardStep,
@@ -17,109 +18,107 @@ from umlcharter.charts.sequence_diagram import (
 
 
 class MermaidSequenceDiagram:
-    @staticmethod
-    def _line_break(string: str) -> str:
-        """Some places allow line break as <br/>"""
-        return string.replace("\n", "<br/>")
-
-    @staticmethod
-    def _remove_line_breaks(string: str) -> str:
-        """Some places do not allow line breaks, replace these with just a plane space"""
-        return string.replace("\n", " ")
+    participant_types_map = {
+        "default": "participant",
+        "actor": "actor",
+        "boundary": "participant",
+        "control": "participant",
+        "entity": "participant",
+    }
+
+    _line_break = staticmethod(escaping.mermaid_line_break)
+    _remove_line_breaks = staticmethod(escaping.mermaid_single_line)
+
+    def __init__(self, sequence_diagram: SequenceDiagramIR):
+        self.first_case: bool = False
+        self.last_targeted_participant: SequenceDiagramParticipant | None = (
+            sequence_diagram.first_participant
+        )
+        self.aliases: typing.List[str] = sequence_diagram.aliases
 
     @classmethod
-    def generate(cls, sequence_diagram: SequenceDiagram) -> str:
-        participants: typing.Dict[
-            SequenceDiagramParticipantGroup, typing.List[SequenceDiagramParticipant]
-        ] = sequence_diagram._SequenceDiagram__participants  # noqa
-        sequence: typing.List[Step] = sequence_diagram._SequenceDiagram__sequence  # noqa
-
-        first_case: bool = False
-        last_targeted_participant: SequenceDiagramParticipant | None = None
-        aliases: typing.Dict[SequenceDiagramParticipant, str] = {}
-        aliases_counter: int = 1
-
-        participant_types_map = {
-            "default": "participant",
-            "actor": "actor",
-            "boundary": "participant",
-            "control": "participant",
-            "entity": "participant",
-        }
-
-        generated = f"sequenceDiagram\nTitle: {cls._remove_line_breaks(sequence_diagram.title)}\n"
-        for group, group_participants in participants.items():
-            if group.title:
-                generated += f"box {cls._remove_line_breaks(group.title)}\n"
-
-            for participant in group_participants:
-                # define initial last targeted participant
-                if not last_targeted_participant:
-                    last_targeted_participant = participant
-
-                aliases[participant] = f"p{aliases_counter}"
-                aliases_counter += 1
-
-                generated += (
-                    f"{participant_types_map[participant.type_]} {aliases[participant]} as "
-                    f"{cls._line_break(participant.title)}\n"
-                )
-
-            if group.title:
-                generated += "end\n"
-
-        for step in sequence:
-            if isinstance(step, ParticipantActivationControl):
-                if step.is_active:
-                    generated += f"activate {aliases[step.participant]}\n"
-                else:
-                    generated += f"deactivate {aliases[step.participant]}\n"
-
-            if isinstance(step, ForwardStep):
-                generated += (
-                    f"{aliases[step.from_participant]}->>{aliases[step.to_participant]}: "
-                    f"{cls._line_break(step.text)}\n"
-                )
-                last_targeted_participant = step.to_participant
-
-            if isinstance(step, ReturnStep):
-                generated += (
-                    f"{aliases[step.from_participant]}-->>{aliases[step.to_participant]}: "
-                    f"{cls._line_break(step.text)}\n"
-                )
-                last_targeted_participant = step.to_participant
-
-            if isinstance(step, GroupControl):
-                # NB: the Mermaid does not have the native "group" as Plant UML does, for example,
-                # so the reasonable workaround would be here creation of the background rectangle + some note
-                if step.is_active:
-                    generated += "rect rgb(230, 230, 240, 0.5)\n"
-                    generated += f"note right of {aliases[last_targeted_participant]}: {cls._line_break(step.text)}\n"
-                else:
-                    generated += "end\n"
-
-            if isinstance(step, LoopControl):
-                if step.is_active:
-                    generated += f"loop {cls._line_break(step.how_many_iterations)}\n"
-                else:
-                    generated += "end\n"
-
-            if isinstance(step, ConditionControl):
-                if step.is_active:
-                    first_case = True
-                else:
-                    generated += "end\n"
-                    first_case = False
-
-            if isinstance(step, CaseControl):
-                if step.is_active:
-                    if first_case:
-                        generated += f"alt {cls._line_break(step.text)}\n"
-                        first_case = False
-                    else:
-                        generated += f"else {cls._line_break(step.text)}\n"
-
-            if isinstance(step, NoteStep):
-                generated += f"note right of {aliases[last_targeted_participant]}: {cls._line_break(step.text)}\n"
-
-        return generated
+    def iter_generate(cls, sequence_diagram: SequenceDiagramIR) -> typing.Iterator[str]:
+        renderer = cls(sequence_diagram)
+        aliases = renderer.aliases
+
+        with profiling.phase("header"):
+            yield f"sequenceDiagram\nTitle: {cls._remove_line_breaks(sequence_diagram.title)}\n"
+            for group, group_participants in sequence_diagram.groups:
+                if group.title:
+                    yield f"box {cls._remove_line_breaks(group.title)}\n"
+
+                for participant in group_participants:
+                    yield (
+                        f"{cls.participant_types_map[participant.type_]} {aliases[participant._id]} as "
+                        f"{cls._line_break(participant.title)}\n"
+                    )
+
+                if group.title:
+                    yield "end\n"
+
+        handlers = cls._handlers
+        with profiling.phase("steps"):
+            for step in sequence_diagram.steps:
+                yield handlers[type(step)](renderer, step)
+
+    def _activation(self, step: ParticipantActivationControl) -> str:
+        if step.is_active:
+            return f"activate {self.aliases[step.participant._id]}\n"
+        return f"deactivate {self.aliases[step.participant._id]}\n"
+
+    def _forward(self, step: ForwardStep) -> str:
+        self.last_targeted_participant = step.to_participant
+        return (
+            f"{self.aliases[step.from_participant._id]}->>{self.aliases[step.to_participant._id]}: "
+            f"{self._line_break(step.text)}\n"
+        )
+
+    def _return(self, step: ReturnStep) -> str:
+        self.last_targeted_participant = step.to_participant
+        return (
+            f"{self.aliases[step.from_participant._id]}-->>{self.aliases[step.to_participant._id]}: "
+            f"{self._line_break(step.text)}\n"
+        )
+
+    def _group(self, step: GroupControl) -> str:
+        # NB: the Mermaid does not have the native "group" as Plant UML does, for example,
+        # so the reasonable workaround would be here creation of the background rectangle + some note
+        if step.is_active:
+            return (
+                "rect rgb(230, 230, 240, 0.5)\n"
+                f"note right of {self.aliases[self.last_targeted_participant._id]}: {self._line_break(step.text)}\n"
+            )
+        return "end\n"
+
+    def _loop(self, step: LoopControl) -> str:
+        if step.is_active:
+            return f"loop {self._line_break(step.how_many_iterations)}\n"
+        return "end\n"
+
+    def _condition(self, step: ConditionControl) -> str:
+        self.first_case = step.is_active
+        return "" if step.is_active else "end\n"
+
+    def _case(self, step: CaseControl) -> str:
+        if not step.is_active:
+            return ""
+        if self.first_case:
+            self.first_case = False
+            return f"alt {self._line_break(step.text)}\n"
+        return f"else {self._line_break(step.text)}\n"
+
+    def _note(self, step: NoteStep) -> str:
+        return f"note right of {self.aliases[self.last_targeted_participant._id]}: {self._line_break(step.text)}\n"
+
+    _handlers: typing.Dict[
+        typing.Type[Step], typing.Callable[["MermaidSequenceDiagram", Step], str]
+    ] = {
+        ParticipantActivationControl: _activation,
+        ForwardStep: _forward,
+        ReturnStep: _return,
+        GroupControl: _group,
+        LoopControl: _loop,
+        ConditionControl: _condition,
+        CaseControl: _case,
+        NoteStep: _note,
+    }
@@ -1,69 +1,66 @@
-from umlcharter.charts.graph_diagram import (
-    Node,
-    Start,
-    Finish,
-    Condition,
-    Join,
-    Fork,
-    GraphDiagram,
-)
+import typing
+
+from umlcharter import profiling
+from umlcharter.generators import escaping
+from umlcharter.charts.ir import GraphDiagramIR, GraphNodeKind
 
 
 class PlantUMLGraphDiagram:
-    @staticmethod
-    def _line_break(string: str) -> str:
-        """Some places allow line break as \n"""
-        return string.replace("\n", "\\n")
+    _line_break = staticmethod(escaping.plantuml_line_break)
+    _quoted = staticmethod(escaping.plantuml_quoted)
 
     @classmethod
-    def generate(cls, graph_diagram: GraphDiagram) -> str:
-        aliases = {}
-        generated = f"@startuml\ntitle {cls._line_break(graph_diagram.title)}\nhide empty description\n"
+    def iter_generate(cls, graph_diagram: GraphDiagramIR) -> typing.Iterator[str]:
+        aliases = [""] * graph_diagram.size
+        with profiling.phase("header"):
+            yield f"@startuml\ntitle {cls._line_break(graph_diagram.title)}\nhide empty description\n"
+
+        def notes(node, node_alias: str, ident: str) -> typing.Iterator[str]:
+            for note in getattr(node, "_notes", []):
+                yield (
+                    f"{ident}note {'right' if graph_diagram.is_vertical else 'bottom'} "
+                    f"of {node_alias} : {cls._line_break(note)}\n"
+                )
+
+        with profiling.phase("entries"):
+            for entry in graph_diagram.entries:
+                node = entry.node
+                ident = "  " * entry.depth
 
-        def recursive_graph_generation(
-            generated_dsl: str, node_to_process: Node, depth: int
-        ) -> str:
-            ident = " " * depth
-            inner_graph = node_to_process._Node__inner_graph  # noqa
-            # iterate once to define the states first...
-            for node, routes in inner_graph.items():
-                if isinstance(node, Start) or isinstance(node, Finish):
-                    aliases[node] = "[*]"
-                else:
-                    node_alias = f"n{len(aliases)}"
-                    aliases[node] = node_alias
-                    if isinstance(node, Condition):
-                        generated_dsl += f"{ident}state {node_alias} <<choice>>\n"
-                    if isinstance(node, Join):
-                        generated_dsl += f"{ident}state {node_alias} <<join>>\n"
-                    if isinstance(node, Fork):
-                        generated_dsl += f"{ident}state {node_alias} <<fork>>\n"
-                    if isinstance(node, Node):
-                        if node.is_group():
-                            generated_dsl += (
-                                f'{ident}state "{cls._line_break(node.text)}" as {node_alias}{" " + node.color.as_hex() if node.color else ""} '
-                                f'{{\n{recursive_graph_generation("", node, depth + 2)}{ident}}}\n'
+                if entry.kind is GraphNodeKind.LEVEL_END:
+                    # all the states of the level are defined, so define the routes between them...
+                    for from_node, routes in entry.routes.items():
+                        for to_node, route_text in routes:
+                            yield (
+                                f"{ident}{aliases[from_node._id]} {'-->' if graph_diagram.is_vertical else '->'} "
+                                f"{aliases[to_node._id]}{' : ' + cls._line_break(route_text) if route_text else ''}\n"
                             )
-                        else:
-                            generated_dsl += f'{ident}state "{cls._line_break(node.text)}" as {node_alias}{" " + node.color.as_hex() if node.color else ""}\n'
+                    # ...and close the group, if it is not the most top level of the graph
+                    if entry.depth:
+                        ident = "  " * (entry.depth - 1)
+                        yield f"{ident}}}\n"
+                        yield from notes(node, aliases[node._id], ident)
+                    continue
 
-                    notes: list[str] = getattr(node, "_notes", [])
-                    for note in notes:
-                        generated_dsl += (
-                            f"{ident}note {'right' if graph_diagram.is_vertical else 'bottom'} "
-                            f"of {node_alias} : {cls._line_break(note)}\n"
-                        )
+                if entry.kind in (GraphNodeKind.START, GraphNodeKind.FINISH):
+                    aliases[node._id] = "[*]"
+                    continue
 
-            # ...second run is to define the routes between the nodes
-            for node, routes in inner_graph.items():
-                for route in routes:
-                    to_node, route_text = route
-                    generated_dsl += (
-                        f"{ident}{aliases[node]} {'-->' if graph_diagram.is_vertical else '->'} "
-                        f"{aliases[to_node]}{' : ' + cls._line_break(route_text) if route_text else ''}\n"
-                    )
+                node_alias = f"n{node._id}"
+                aliases[node._id] = node_alias
+                if entry.kind is GraphNodeKind.CONDITION:
+                    yield f"{ident}state {node_alias} <<choice>>\n"
+                if entry.kind is GraphNodeKind.JOIN:
+                    yield f"{ident}state {node_alias} <<join>>\n"
+                if entry.kind is GraphNodeKind.FORK:
+                    yield f"{ident}state {node_alias} <<fork>>\n"
+                if entry.kind is GraphNodeKind.GROUP:
+                    # the nested states follow, the notes are added once the group is closed
+                    yield f'{ident}state "{cls._quoted(node.text)}" as {node_alias}{" " + node.color.as_hex() if node.color else ""} {{\n'
+                    continue
+                if entry.kind is GraphNodeKind.NODE:
+                    yield f'{ident}state "{cls._quoted(node.text)}" as {node_alias}{" " + node.color.as_hex() if node.color else ""}\n'
 
-            return generated_dsl
+                yield from notes(node, node_alias, ident)
 
-        base_node: Node = graph_diagram._GraphDiagram__base_node  # noqa
-        return recursive_graph_generation(generated, base_node, 0) + "@enduml\n"
+        yield "@enduml\n"
@@ -1,11 +1,18 @@
+import typing
+
+from umlcharter.charts.ir import GraphDiagramIR, SequenceDiagramIR
 from umlcharter.generators.base import IChartGenerator
 from umlcharter.generators.plantuml.sequence_diagram import PlantUMLSequenceDiagram
 from umlcharter.generators.plantuml.graph_diagram import PlantUMLGraphDiagram
 
 
 class PlantUML(IChartGenerator):
-    def generate_sequence_diagram(self) -> str:
-        return PlantUMLSequenceDiagram.generate(self.ref)  # noqa
+    def iter_generate_sequence_diagram(
+        self, ir: typing.Optional[SequenceDiagramIR] = None
+    ) -> typing.Iterator[str]:
+        return PlantUMLSequenceDiagram.iter_generate(ir or self.ref.to_ir())  # noqa
 
-    def generate_graph_diagram(self) -> str:
-        return PlantUMLGraphDiagram.generate(self.ref)  # noqa
+    def iter_generate_graph_diagram(
+        self, ir: typing.Optional[GraphDiagramIR] = None
+    ) -> typing.Iterator[str]:
+        return PlantUMLGraphDiagram.iter_generate(ir or self.ref.to_ir())  # noqa
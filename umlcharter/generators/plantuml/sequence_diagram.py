@@ -1,9 +1,10 @@
 import typing
 
+from umlcharter import profiling
+from umlcharter.generators import escaping
+from umlcharter.charts.ir import SequenceDiagramIR
 from umlcharter.charts.sequence_diagram import (
-    SequenceDiagram,
     SequenceDiagramParticipant,
-    SequenceDiagramParticipantGroup,
     Step,
     ParticipantActivationControl,
     ForwardStep,
@@ -17,142 +18,152 @@ from umlcharter.charts.sequence_diagram import (
 
 
 class PlantUMLSequenceDiagram:
-    @staticmethod
-    def _line_break(string: str) -> str:
-        """Some places allow line break as \n"""
-        return string.replace("\n", "\\n")
+    participant_types_map = {
+        "default": "participant",
+        "actor": "actor",
+        "boundary": "boundary",
+        "control": "control",
+        "entity": "entity",
+    }
+
+    _line_break = staticmethod(escaping.plantuml_line_break)
+    _quoted = staticmethod(escaping.plantuml_quoted)
+
+    def __init__(self, sequence_diagram: SequenceDiagramIR):
+        self.first_case: bool = False
+        self.deactivation_just_has_happened_for_step: (
+            SequenceDiagramParticipant | None
+        ) = None
+        self.group_ended_recently: bool = False
+        self.last_targeted_participant: SequenceDiagramParticipant | None = (
+            sequence_diagram.first_participant
+        )
+        self.aliases: typing.List[str] = sequence_diagram.aliases
 
     @classmethod
-    def generate(cls, sequence_diagram: SequenceDiagram) -> str:
-        participants: typing.Dict[
-            SequenceDiagramParticipantGroup, typing.List[SequenceDiagramParticipant]
-        ] = sequence_diagram._SequenceDiagram__participants  # noqa
-        sequence: typing.List[Step] = sequence_diagram._SequenceDiagram__sequence  # noqa
-
-        first_case: bool = False
-        deactivation_just_has_happened_for_step: SequenceDiagramParticipant | None = (
-            None
-        )
-        group_ended_recently: bool = False
-        last_targeted_participant: SequenceDiagramParticipant | None = None
-        aliases: typing.Dict[SequenceDiagramParticipant, str] = {}
-        aliases_counter: int = 1
-
-        participant_types_map = {
-            "default": "participant",
-            "actor": "actor",
-            "boundary": "boundary",
-            "control": "control",
-            "entity": "entity",
-        }
-
-        generated = f"@startuml\ntitle: {cls._line_break(sequence_diagram.title)}\n"
-        for group, group_participants in participants.items():
-            if group.title:
-                generated += f"box \"{cls._line_break(group.title)}\" {group.color.as_hex() if group.color else ''}\n"
-
-            for participant in group_participants:
-                # define initial last targeted participant
-                if not last_targeted_participant:
-                    last_targeted_participant = participant
-
-                aliases[participant] = f"p{aliases_counter}"
-                aliases_counter += 1
-
-                generated += (
-                    f'{participant_types_map[participant.type_]} "{cls._line_break(participant.title)}" as '
-                    f"{aliases[participant]} {participant.color.as_hex() if participant.color else ''}\n"
-                )
-
-            if group.title:
-                generated += "end box\n"
-
-        for step in sequence:
-            if isinstance(step, ParticipantActivationControl):
-                if step.is_active:
-                    # NB! The magic of PlantUML:
-                    # you cannot activate the participant right after you have deactivated it,
-                    # so you have to place something in between.
-                    # Also, there is known ancient bug that the activation does not also work properly if used
-                    # after the end of the group (any kind of group)
-                    # (https://forum.plantuml.net/8228/activation-after-group-end-does-not-work)
-                    # Luckily, PlantUML supports invisible messages we can use as separator to split the sequence.
-                    # This invisible messages somehow "restarts" the activation logic (?) and it renders correctly.
-                    # NB 2: this dirty magic is needed for the default Puma architecture,
-                    # it seems the Teoz does not have this issue, but Teoz is not stable (https://plantuml.com/teoz)
-                    if (
-                        deactivation_just_has_happened_for_step
-                        and step.participant == deactivation_just_has_happened_for_step
-                    ) or group_ended_recently:
-                        generated += f"{aliases[step.participant]} -[hidden]-> {aliases[step.participant]}\n"
-                    generated += f"activate {aliases[step.participant]} {step.color.as_hex() if step.color else ''}\n"
-                    deactivation_just_has_happened_for_step = None
-                    group_ended_recently = False
-                else:
-                    generated += f"deactivate {aliases[step.participant]}\n"
-                    deactivation_just_has_happened_for_step = step.participant
-
-            if isinstance(step, ForwardStep):
-                generated += (
-                    f"{aliases[step.from_participant]}->{aliases[step.to_participant]}: "
-                    f"{cls._line_break(step.text)}\n"
-                )
-                last_targeted_participant = step.to_participant
-
-            if isinstance(step, ReturnStep):
-                generated += (
-                    f"{aliases[step.from_participant]}-->{aliases[step.to_participant]}: "
-                    f"{cls._line_break(step.text)}\n"
-                )
-                last_targeted_participant = step.to_participant
-
-            if isinstance(step, GroupControl):
-                if step.is_active:
-                    generated += (
-                        f"group{step.color.as_hex() if step.color else ''} "
-                        f"{step.color.as_hex() if step.color else ''} {cls._line_break(step.text)}\n"
+    def iter_generate(cls, sequence_diagram: SequenceDiagramIR) -> typing.Iterator[str]:
+        renderer = cls(sequence_diagram)
+        aliases = renderer.aliases
+
+        with profiling.phase("header"):
+            yield f"@startuml\ntitle: {cls._line_break(sequence_diagram.title)}\n"
+            for group, group_participants in sequence_diagram.groups:
+                if group.title:
+                    yield f"box \"{cls._quoted(group.title)}\" {group.color.as_hex() if group.color else ''}\n"
+
+                for participant in group_participants:
+                    yield (
+                        f'{cls.participant_types_map[participant.type_]} "{cls._quoted(participant.title)}" as '
+                        f"{aliases[participant._id]} {participant.color.as_hex() if participant.color else ''}\n"
                     )
-                else:
-                    generated += "end\n"
-                    group_ended_recently = True
-
-            if isinstance(step, LoopControl):
-                if step.is_active:
-                    generated += (
-                        f"loop{step.color.as_hex() if step.color else ''} "
-                        f"{step.color.as_hex() if step.color else ''} {cls._line_break(step.how_many_iterations)}\n"
-                    )
-                else:
-                    generated += "end\n"
-                    group_ended_recently = True
-
-            if isinstance(step, ConditionControl):
-                if step.is_active:
-                    generated += f"alt{step.color.as_hex() if step.color else ''}"
-                    first_case = True
-                else:
-                    generated += "end\n"
-                    first_case = False
-                    group_ended_recently = True
-
-            if isinstance(step, CaseControl):
-                if step.is_active:
-                    if first_case:
-                        generated += (
-                            f" {step.color.as_hex() if step.color else '#FFFFFF'} "
-                            f"{cls._line_break(step.text)}\n"
-                        )
-                        first_case = False
-                    else:
-                        generated += (
-                            f"else {step.color.as_hex() if step.color else '#FFFFFF'} "
-                            f"{cls._line_break(step.text)}\n"
-                        )
-
-            if isinstance(step, NoteStep):
-                generated += (
-                    f"note right of {aliases[last_targeted_participant]} "
-                    f"{step.color.as_hex() if step.color else ''}: {cls._line_break(step.text)}\n"
-                )
-
-        return generated + "@enduml\n"
+
+                if group.title:
+                    yield "end box\n"
+
+        handlers = cls._handlers
+        with profiling.phase("steps"):
+            for step in sequence_diagram.steps:
+                yield handlers[type(step)](renderer, step)
+
+        yield "@enduml\n"
+
+    def _activation(self, step: ParticipantActivationControl) -> str:
+        alias = self.aliases[step.participant._id]
+        if not step.is_active:
+            self.deactivation_just_has_happened_for_step = step.participant
+            return f"deactivate {alias}\n"
+
+        generated = ""
+        # NB! The magic of PlantUML:
+        # you cannot activate the participant right after you have deactivated it,
+        # so you have to place something in between.
+        # Also, there is known ancient bug that the activation does not also work properly if used
+        # after the end of the group (any kind of group)
+        # (https://forum.plantuml.net/8228/activation-after-group-end-does-not-work)
+        # Luckily, PlantUML supports invisible messages we can use as separator to split the sequence.
+        # This invisible messages somehow "restarts" the activation logic (?) and it renders correctly.
+        # NB 2: this dirty magic is needed for the default Puma architecture,
+        # it seems the Teoz does not have this issue, but Teoz is not stable (https://plantuml.com/teoz)
+        if (
+            self.deactivation_just_has_happened_for_step
+            and step.participant == self.deactivation_just_has_happened_for_step
+        ) or self.group_ended_recently:
+            generated += f"{alias} -[hidden]-> {alias}\n"
+        self.deactivation_just_has_happened_for_step = None
+        self.group_ended_recently = False
+        return (
+            generated
+            + f"activate {alias} {step.color.as_hex() if step.color else ''}\n"
+        )
+
+    def _forward(self, step: ForwardStep) -> str:
+        self.last_targeted_participant = step.to_participant
+        return (
+            f"{self.aliases[step.from_participant._id]}->{self.aliases[step.to_participant._id]}: "
+            f"{self._line_break(step.text)}\n"
+        )
+
+    def _return(self, step: ReturnStep) -> str:
+        self.last_targeted_participant = step.to_participant
+        return (
+            f"{self.aliases[step.from_participant._id]}-->{self.aliases[step.to_participant._id]}: "
+            f"{self._line_break(step.text)}\n"
+        )
+
+    def _group(self, step: GroupControl) -> str:
+        if step.is_active:
+            return (
+                f"group{step.color.as_hex() if step.color else ''} "
+                f"{step.color.as_hex() if step.color else ''} {self._line_break(step.text)}\n"
+            )
+        self.group_ended_recently = True
+        return "end\n"
+
+    def _loop(self, step: LoopControl) -> str:
+        if step.is_active:
+            return (
+                f"loop{step.color.as_hex() if step.color else ''} "
+                f"{step.color.as_hex() if step.color else ''} {self._line_break(step.how_many_iterations)}\n"
+            )
+        self.group_ended_recently = True
+        return "end\n"
+
+    def _condition(self, step: ConditionControl) -> str:
+        self.first_case = step.is_active
+        if step.is_active:
+            return f"alt{step.color.as_hex() if step.color else ''}"
+        self.group_ended_recently = True
+        return "end\n"
+
+    def _case(self, step: CaseControl) -> str:
+        if not step.is_active:
+            return ""
+        if self.first_case:
+            self.first_case = False
+            return (
+                f" {step.color.as_hex() if step.color else '#FFFFFF'} "
+                f"{self._line_break(step.text)}\n"
+            )
+        return (
+            f"else {step.color.as_hex() if step.color else '#FFFFFF'} "
+            f"{self._line_break(step.text)}\n"
+        )
+
+    def _note(self, step: NoteStep) -> str:
+        return (
+            f"note right of {self.aliases[self.last_targeted_participant._id]} "
+            f"{step.color.as_hex() if step.color else ''}: {self._line_break(step.text)}\n"
+        )
+
+    _handlers: typing.Dict[
+        typing.Type[Step], typing.Callable[["PlantUMLSequenceDiagram", Step], str]
+    ] = {
+        ParticipantActivationControl: _activation,
+        ForwardStep: _forward,
+        ReturnStep: _return,
+        GroupControl: _group,
+        LoopControl: _loop,
+        ConditionControl: _condition,
+        CaseControl: _case,
+        NoteStep: _note,
+    }
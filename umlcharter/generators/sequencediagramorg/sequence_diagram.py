@@ -1,9 +1,10 @@
 import typing
 
+from umlcharter import profiling
+from umlcharter.generators import escaping
+from umlcharter.charts.ir import SequenceDiagramIR
 from umlcharter.charts.sequence_diagram import (
-    SequenceDiagram,
     SequenceDiagramParticipant,
-    SequenceDiagramParticipantGroup,
     Step,
     ParticipantActivationControl,
     ForwardStep,
@@ -17,122 +18,118 @@ from umlcharter.charts.sequence_diagram import (
 
 
 class SequenceDiagramOrgSequenceDiagram:
-    @staticmethod
-    def _line_break(string: str) -> str:
-        """Some places allow line break as \n"""
-        return string.replace("\n", "\\n")
-
-    @staticmethod
-    def _remove_line_breaks(string: str) -> str:
-        """Some places do not allow line breaks, replace these with just a plane space"""
-        return string.replace("\n", " ")
+    participant_types_map = {
+        "default": "participant",
+        "actor": "actor",
+        "boundary": "boundary",
+        "control": "control",
+        "entity": "entity",
+    }
+
+    _line_break = staticmethod(escaping.sequencediagramorg_line_break)
+    _remove_line_breaks = staticmethod(escaping.sequencediagramorg_single_line)
+
+    def __init__(self, sequence_diagram: SequenceDiagramIR):
+        self.first_case: bool = False
+        self.last_targeted_participant: SequenceDiagramParticipant | None = (
+            sequence_diagram.first_participant
+        )
+        self.aliases: typing.List[str] = sequence_diagram.aliases
 
     @classmethod
-    def generate(cls, sequence_diagram: SequenceDiagram) -> str:
-        participants: typing.Dict[
-            SequenceDiagramParticipantGroup, typing.List[SequenceDiagramParticipant]
-        ] = sequence_diagram._SequenceDiagram__participants  # noqa
-        sequence: typing.List[Step] = sequence_diagram._SequenceDiagram__sequence  # noqa
-
-        first_case: bool = False
-        last_targeted_participant: SequenceDiagramParticipant | None = None
-        aliases: typing.Dict[SequenceDiagramParticipant, str] = {}
-        aliases_counter: int = 1
-
-        participant_types_map = {
-            "default": "participant",
-            "actor": "actor",
-            "boundary": "boundary",
-            "control": "control",
-            "entity": "entity",
-        }
-
-        generated = f"title {cls._line_break(sequence_diagram.title)}\n"
-        for group, group_participants in participants.items():
-            if group.title:
-                generated += (
-                    f"participantgroup{group.color.as_hex() if group.color else ''} "
-                    f"**{cls._line_break(group.title)}**\n"
-                )
-
-            for participant in group_participants:
-                # define initial last targeted participant
-                if not last_targeted_participant:
-                    last_targeted_participant = participant
-
-                aliases[participant] = f"p{aliases_counter}"
-                aliases_counter += 1
-
-                generated += (
-                    f'{participant_types_map[participant.type_]} "{cls._line_break(participant.title)}" as '
-                    f"{aliases[participant]}"
-                )
-                generated += (
-                    f"{participant.color.as_hex() if participant.color else ''}\n"
-                )
-
-            if group.title:
-                generated += "end\n"
-
-        for step in sequence:
-            if isinstance(step, ParticipantActivationControl):
-                if step.is_active:
-                    generated += f"activate {aliases[step.participant]}{step.color.as_hex() if step.color else ''}\n"
-                else:
-                    generated += f"deactivate {aliases[step.participant]}\n"
-
-            if isinstance(step, ForwardStep):
-                generated += (
-                    f"{aliases[step.from_participant]}->{aliases[step.to_participant]}: "
-                    f"{cls._line_break(step.text)}\n"
-                )
-                last_targeted_participant = step.to_participant
-
-            if isinstance(step, ReturnStep):
-                generated += (
-                    f"{aliases[step.from_participant]}-->{aliases[step.to_participant]}: "
-                    f"{cls._line_break(step.text)}\n"
-                )
-                last_targeted_participant = step.to_participant
-
-            if isinstance(step, GroupControl):
-                if step.is_active:
-                    generated += (
-                        f"group{step.color.as_hex() if step.color else ''} "
-                        f"[{cls._remove_line_breaks(step.text)}]\n"
+    def iter_generate(cls, sequence_diagram: SequenceDiagramIR) -> typing.Iterator[str]:
+        renderer = cls(sequence_diagram)
+        aliases = renderer.aliases
+
+        with profiling.phase("header"):
+            yield f"title {cls._line_break(sequence_diagram.title)}\n"
+            for group, group_participants in sequence_diagram.groups:
+                if group.title:
+                    yield (
+                        f"participantgroup{group.color.as_hex() if group.color else ''} "
+                        f"**{cls._line_break(group.title)}**\n"
                     )
-                else:
-                    generated += "end\n"
-
-            if isinstance(step, LoopControl):
-                if step.is_active:
-                    generated += (
-                        f"loop{step.color.as_hex() if step.color else ''} "
-                        f"{cls._remove_line_breaks(step.how_many_iterations)}\n"
+
+                for participant in group_participants:
+                    yield (
+                        f'{cls.participant_types_map[participant.type_]} "{cls._line_break(participant.title)}" as '
+                        f"{aliases[participant._id]}"
+                        f"{participant.color.as_hex() if participant.color else ''}\n"
                     )
-                else:
-                    generated += "end\n"
-
-            if isinstance(step, ConditionControl):
-                if step.is_active:
-                    generated += f"alt{step.color.as_hex() if step.color else ''}"
-                    first_case = True
-                else:
-                    generated += "end\n"
-                    first_case = False
-
-            if isinstance(step, CaseControl):
-                if step.is_active:
-                    if first_case:
-                        generated += f" {cls._remove_line_breaks(step.text)}\n"
-                        first_case = False
-                    else:
-                        generated += f"else {cls._remove_line_breaks(step.text)}\n"
-
-            if isinstance(step, NoteStep):
-                generated += (
-                    f"note right of {aliases[last_targeted_participant]}{step.color.as_hex() if step.color else ''}: "
-                    f"{cls._line_break(step.text)}\n"
-                )
-
-        return generated
+
+                if group.title:
+                    yield "end\n"
+
+        handlers = cls._handlers
+        with profiling.phase("steps"):
+            for step in sequence_diagram.steps:
+                yield handlers[type(step)](renderer, step)
+
+    def _activation(self, step: ParticipantActivationControl) -> str:
+        if step.is_active:
+            return f"activate {self.aliases[step.participant._id]}{step.color.as_hex() if step.color else ''}\n"
+        return f"deactivate {self.aliases[step.participant._id]}\n"
+
+    def _forward(self, step: ForwardStep) -> str:
+        self.last_targeted_participant = step.to_participant
+        return (
+            f"{self.aliases[step.from_participant._id]}->{self.aliases[step.to_participant._id]}: "
+            f"{self._line_break(step.text)}\n"
+        )
+
+    def _return(self, step: ReturnStep) -> str:
+        self.last_targeted_participant = step.to_participant
+        return (
+            f"{self.aliases[step.from_participant._id]}-->{self.aliases[step.to_participant._id]}: "
+            f"{self._line_break(step.text)}\n"
+        )
+
+    def _group(self, step: GroupControl) -> str:
+        if step.is_active:
+            return (
+                f"group{step.color.as_hex() if step.color else ''} "
+                f"[{self._remove_line_breaks(step.text)}]\n"
+            )
+        return "end\n"
+
+    def _loop(self, step: LoopControl) -> str:
+        if step.is_active:
+            return (
+                f"loop{step.color.as_hex() if step.color else ''} "
+                f"{self._remove_line_breaks(step.how_many_iterations)}\n"
+            )
+        return "end\n"
+
+    def _condition(self, step: ConditionControl) -> str:
+        self.first_case = step.is_active
+        if step.is_active:
+            return f"alt{step.color.as_hex() if step.color else ''}"
+        return "end\n"
+
+    def _case(self, step: CaseControl) -> str:
+        if not step.is_active:
+            return ""
+        if self.first_case:
+            self.first_case = False
+            return f" {self._remove_line_breaks(step.text)}\n"
+        return f"else {self._remove_line_breaks(step.text)}\n"
+
+    def _note(self, step: NoteStep) -> str:
+        return (
+            f"note right of {self.aliases[self.last_targeted_participant._id]}{step.color.as_hex() if step.color else ''}: "
+            f"{self._line_break(step.text)}\n"
+        )
+
+    _handlers: typing.Dict[
+        typing.Type[Step],
+        typing.Callable[["SequenceDiagramOrgSequenceDiagram", Step], str],
+    ] = {
+        ParticipantActivationControl: _activation,
+        ForwardStep: _forward,
+        ReturnStep: _return,
+        GroupControl: _group,
+        LoopControl: _loop,
+        ConditionControl: _condition,
+        CaseControl: _case,
+        NoteStep: _note,
+    }
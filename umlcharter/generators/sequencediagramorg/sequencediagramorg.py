@@ -1,3 +1,6 @@
+import typing
+
+from umlcharter.charts.ir import GraphDiagramIR, SequenceDiagramIR
 from umlcharter.generators.base import IChartGenerator
 from umlcharter.generators.sequencediagramorg.sequence_diagram import (
     SequenceDiagramOrgSequenceDiagram,
@@ -5,10 +8,14 @@ from umlcharter.generators.sequencediagramorg.sequence_diagram import (
 
 
 class SequenceDiagramOrg(IChartGenerator):
-    def generate_sequence_diagram(self) -> str:
-        return SequenceDiagramOrgSequenceDiagram.generate(self.ref)  # noqa
+    def iter_generate_sequence_diagram(
+        self, ir: typing.Optional[SequenceDiagramIR] = None
+    ) -> typing.Iterator[str]:
+        return SequenceDiagramOrgSequenceDiagram.iter_generate(ir or self.ref.to_ir())  # noqa
 
-    def generate_graph_diagram(self) -> str:
+    def iter_generate_graph_diagram(
+        self, ir: typing.Optional[GraphDiagramIR] = None
+    ) -> typing.Iterator[str]:
         raise NotImplementedError(
             "This generator does not have a graph diagram support"
         )  # pragma: nocover
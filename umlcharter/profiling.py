@@ -0,0 +1,118 @@
+"""
+Opt-in instrumentation of the generation of the diagrams.
+
+Every generation of the diagram by the generator (`generate()` / `generate_all()` of the diagrams) is reported
+to the registered hooks as `GenerationStats`: the wall time spent in every phase of the generation,
+the number of the steps / nodes of every kind and the size of the generated text.
+
+    with profiling.profile() as stats:
+        diagram.generate_all([Mermaid, PlantUML])
+    for generation in stats:
+        print(generation)
+
+As long as there are no hooks registered, the generation is not instrumented at all.
+"""
+
+import time
+import typing
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+
+if typing.TYPE_CHECKING:  # pragma: nocover
+    from umlcharter.generators.base import IChartGenerator
+
+
+@dataclass
+class GenerationStats:
+    """
+    The statistics of the generation of the single diagram by the single generator.
+
+    :generator: The name of the generator class
+    :title: The title of the diagram
+    :phases: The wall time (seconds) spent in every phase of the generation, in the order of the phases:
+        "ir" - the normalization of the diagram (assignment of the aliases, flattening of the graph),
+        "header" - the title, the participants and the other preamble of the diagram,
+        "steps" / "entries" - the steps of the sequence diagram / the nodes and links of the graph diagram
+    :counts: The number of the steps of every class / the graph entries of every kind
+    :output_bytes: The size of the generated text, UTF-8 encoded
+    """
+
+    generator: str
+    title: str
+    phases: typing.Dict[str, float] = field(default_factory=dict)
+    counts: typing.Dict[str, int] = field(default_factory=dict)
+    output_bytes: int = 0
+
+    @property
+    def total_seconds(self) -> float:
+        return sum(self.phases.values())
+
+    def count(self, kinds: typing.Iterable[str]) -> None:
+        self.counts.update(Counter(kinds))
+
+
+Hook = typing.Callable[[GenerationStats], None]
+
+_hooks: typing.List[Hook] = []
+_current: ContextVar[typing.Optional[GenerationStats]] = ContextVar(
+    "umlcharter_generation_stats", default=None
+)
+
+
+def add_hook(hook: Hook) -> None:
+    """Report the statistics of every following generation to the hook"""
+    _hooks.append(hook)
+
+
+def remove_hook(hook: Hook) -> None:
+    _hooks.remove(hook)
+
+
+@contextmanager
+def profile() -> typing.Iterator[typing.List[GenerationStats]]:
+    """Collect the statistics of all the generations happening inside the block"""
+    collected: typing.List[GenerationStats] = []
+    add_hook(collected.append)
+    try:
+        yield collected
+    finally:
+        remove_hook(collected.append)
+
+
+@contextmanager
+def generation(
+    generator_cls: typing.Type["IChartGenerator"], title: str
+) -> typing.Iterator[typing.Optional[GenerationStats]]:
+    """
+    Track the generation of the diagram by the generator, reported to the hooks once it is completed.
+    Gives `None` if there are no hooks, so there is nothing to track.
+    """
+    if not _hooks:
+        yield None
+        return
+
+    stats = GenerationStats(generator=generator_cls.__name__, title=title)
+    token = _current.set(stats)
+    try:
+        yield stats
+    finally:
+        _current.reset(token)
+    for hook in tuple(_hooks):
+        hook(stats)
+
+
+@contextmanager
+def phase(name: str) -> typing.Iterator[None]:
+    """Add the wall time spent inside the block to the phase of the generation being tracked, if any"""
+    stats = _current.get()
+    if stats is None:
+        yield
+        return
+
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        stats.phases[name] = stats.phases.get(name, 0.0) + time.perf_counter() - started
@@ -0,0 +1,69 @@
+import collections
+import itertools
+import os
+import typing
+from concurrent.futures import Future, ProcessPoolExecutor
+
+from umlcharter.charts.graph_diagram import GraphDiagram
+from umlcharter.charts.sequence_diagram import SequenceDiagram
+from umlcharter.generators.base import IChartGenerator
+
+Diagram = typing.Union[SequenceDiagram, GraphDiagram]
+Generated = typing.Dict[typing.Type[IChartGenerator], str]
+
+
+def _render_packed(
+    tasks: typing.List[typing.Tuple[typing.Type[Diagram], tuple]],
+    generator_classes: typing.Tuple[typing.Type[IChartGenerator], ...],
+) -> typing.List[Generated]:
+    return [
+        diagram_cls.unpack(packed).generate_all(generator_classes)
+        for diagram_cls, packed in tasks
+    ]
+
+
+def render_many(
+    diagrams: typing.Iterable[Diagram],
+    generators: typing.Iterable[typing.Type[IChartGenerator]],
+    workers: typing.Optional[int] = None,
+    chunksize: int = 64,
+) -> typing.Iterator[Generated]:
+    """
+    Generate every given diagram in every given DSL, spreading the work across the worker processes.
+
+    The diagrams cannot be sent to another process as is (they are full of the weak back-references),
+    so they are shipped in their compact packed form (see `pack` / `unpack` of the diagrams),
+    `chunksize` of them per task to keep the overhead of the communication with the workers low.
+    The diagrams are taken from the given iterable and packed only shortly before they are sent:
+    at most two tasks per worker are in flight at once, so the memory stays bounded however many diagrams there are.
+
+    NB: packing the sequence diagram costs more than generating it in a couple of DSLs, unless its steps
+    are already stored column-wise (see `columnar` of `SequenceDiagram`), so spreading such diagrams
+    across the workers pays off only when every diagram is generated in many DSLs.
+
+    :diagrams: The diagrams to generate
+    :generators: The classes of the generators to generate every diagram with
+    :workers: The number of the worker processes, the number of the CPUs by default.
+        If it is 1, the diagrams are generated one by one in the current process, without packing them.
+    :chunksize: The number of the diagrams sent to a worker at once
+    :return: The generated diagrams (the generator class -> the generated text),
+        in the same order as the given diagrams
+    """
+    generator_classes = tuple(generators)
+    if workers == 1:
+        for diagram in diagrams:
+            yield diagram.generate_all(generator_classes)
+        return
+
+    workers = workers or os.cpu_count() or 1
+    diagrams = iter(diagrams)
+    chunks = iter(lambda: list(itertools.islice(diagrams, chunksize)), [])
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending: typing.Deque[Future] = collections.deque()
+        for chunk in chunks:
+            tasks = [(type(diagram), diagram.pack()) for diagram in chunk]
+            pending.append(executor.submit(_render_packed, tasks, generator_classes))
+            if len(pending) >= 2 * workers:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()